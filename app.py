@@ -13,6 +13,8 @@ from information_collector_agent import InformationCollectorAgent
 
 # Import pro Database Search Agent
 from database_search_agent import DatabaseSearchAgent
+from people_analytics import AggregateTable
+from people_database import PeopleCursor
 
 # Import pro Webpage Assistant
 from webpage_assistant import WebpageAssistant
@@ -20,6 +22,9 @@ from webpage_content import WEBPAGE_CONTENT
 
 # Nový import pro Law Expert Agenta
 from law_expert_agent import LawExpertAgent
+from metrics import PerformanceMetrics
+from metrics_registry import registry
+from usage import ledger as usage_ledger
 
 
 def main():
@@ -55,6 +60,72 @@ def main():
     else:
         render_welcome_screen()
 
+    st.markdown("---")
+    render_metrics_panel()
+
+
+def render_metrics_panel():
+    """Panel s metrikami procesu (metrics_registry) a výstupem /metrics z Flask API"""
+    with st.expander("📈 Metriky výkonu"):
+        rows = registry.snapshot()
+
+        def value(metric: str, **labels) -> float:
+            return sum(
+                row.get("value", 0.0) for row in rows
+                if row["metric"] == metric and all(row["labels"].get(k) == v for k, v in labels.items())
+            )
+
+        hits = value("semantic_cache_lookups_total", result="hit")
+        lookups = value("semantic_cache_lookups_total")
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Volání embeddingů", f"{value('embedding_calls_total'):.0f}")
+        col2.metric("Tokeny in / out",
+                    f"{value('llm_tokens_total', direction='in'):.0f} / {value('llm_tokens_total', direction='out'):.0f}")
+        col3.metric("Cache hit rate", f"{hits / lookups * 100:.0f}%" if lookups else "N/A")
+        col4.metric("Paměť indexů", f"{value('faiss_index_memory_bytes') / 1024 ** 2:.1f} MB")
+
+        durations = [
+            {
+                "metrika": row["metric"],
+                "label": ", ".join(f"{k}={v}" for k, v in row["labels"].items()),
+                "počet": row["count"],
+                "průměr (s)": round(row["avg"], 4),
+                "p50 (s)": round(row["p50"], 4),
+                "p90 (s)": round(row["p90"], 4),
+                "p99 (s)": round(row["p99"], 4),
+            }
+            for row in rows if row["type"] == "histogram" and row["count"]
+        ]
+        if durations:
+            st.markdown("**Doby fází a požadavků**")
+            st.dataframe(durations, use_container_width=True, hide_index=True)
+        else:
+            st.caption("Zatím žádná měření - položte agentovi otázku.")
+
+        usage_rows = [
+            {
+                "agent / fáze": key,
+                "volání": totals.calls,
+                "tokeny in": totals.prompt_tokens,
+                "z toho historie": totals.history_tokens,
+                "tokeny out": totals.completion_tokens,
+                "cena (USD)": round(totals.cost_usd, 4),
+            }
+            for key, totals in sorted(usage_ledger.by("agent/stage").items())
+        ]
+        if usage_rows:
+            st.markdown(f"**Spotřeba API** (celkem ${usage_ledger.totals().cost_usd:.4f})")
+            st.dataframe(usage_rows, use_container_width=True, hide_index=True)
+
+        if st.session_state.get("flask_running") and st.checkbox("Zobrazit /metrics z Flask API"):
+            try:
+                import requests
+
+                st.code(requests.get("http://localhost:5000/metrics", timeout=2).text, language="text")
+            except Exception as e:
+                st.error(f"❌ Metriky Flask API nejsou dostupné: {str(e)}")
+
 
 def render_agent_selector():
     """Výběr typu agenta"""
@@ -320,9 +391,35 @@ Po spuštění backendu (zelený status výše) můžete otevřít ukázkovou we
 - Body: `{"message": "text"}`
 - Vrací: `{"response": "odpověď", "status": "success"}`
 
+**POST /api/chat/stream**
+- Stejné body jako /api/chat
+- Odpověď se streamuje jako Server-Sent Events: `data: {"token": "..."}`
+- Na konci událost `done`, při chybě událost `error`
+
 **POST /api/reset**
 - Resetuje konverzaci
 
+**Session**
+- Každý návštěvník má vlastní konverzaci
+- ID session se předává hlavičkou `X-Session-ID` nebo cookie `chat_session_id`
+
+**Async režim (ASGI)**
+- `chatbot_api_async.py` - stejné endpointy na Starlette/uvicorn s AsyncOpenAI
+- Spuštění: `python chatbot_api_async.py` nebo `CHAT_API_SERVER=asgi python run.py`
+- Zátěžový test: `python -m benchmarks.load_test_api --url http://localhost:5000 --concurrency 200`
+- Offline bez OpenAI: `python -m benchmarks.mock_llm_server` a `API_BASE=http://localhost:8100/v1`
+
+**Tracing**
+- Každá odpověď nese hlavičku `X-Trace-ID` (lze poslat vlastní a navázat na trace klienta)
+- Export spanů: `TRACE_EXPORT_PATH=traces.jsonl`, percentily po fázích: `python tracing.py traces.jsonl`
+
+**GET /metrics**
+- Metriky procesu ve formátu Prometheus (požadavky, tokeny, náklady, embeddingy, cache, FAISS, session, paměť indexu)
+
+**Spotřeba a rozpočet API**
+- Tokeny a cena každého volání se počítají po session, agentovi a fázi (ceník: `USAGE_PRICES`)
+- `USAGE_SESSION_BUDGET_USD` / `USAGE_BUDGET_USD` - po dosažení rozpočtu se zkracuje historie a odpovídá se nejdřív z cache
+
 ### Backend Management
 - **Spustit**: Klikněte na "🚀 Spustit Flask API"
 - **Zastavit**: Klikněte na "🛑 Zastavit Flask API"
@@ -512,6 +609,16 @@ def render_law_expert_sidebar():
             st.metric("Počet částí", metadata.get("parts_count", 0))
             st.metric("Počet paragrafů", len(metadata.get("laws_list", [])))
 
+        # Výkon odpovědí
+        if "law_metrics" in st.session_state:
+            perf = st.session_state.law_metrics.get_stats()
+            if perf:
+                st.metric("První token (průměr)", perf.get("avg_time_to_first_token", "N/A"))
+                st.metric("Odpověď (průměr)", perf["avg_response_time"])
+                recent = st.session_state.law_metrics.get_stats(window_seconds=300)
+                if recent:
+                    st.metric("Odpověď p90 (5 min)", recent["p90_response_time"])
+
     st.markdown("---")
 
     # Navigace strukturou
@@ -837,30 +944,55 @@ def handle_law_question(prompt: str):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Zpracování odpovědi
-    with st.chat_message("assistant"):
-        with st.spinner("🤔 Analyzuji..."):
-            response = agent.ask(prompt)
+    if "law_metrics" not in st.session_state:
+        st.session_state.law_metrics = PerformanceMetrics()
 
-            st.markdown(response["answer"])
+    # Zpracování odpovědi - tokeny se zobrazují průběžně
+    metadata = {}
 
-            # Metadata
-            st.caption(f"🔧 Metoda: {response.get('method', 'unknown')}")
+    def token_stream():
+        for item in agent.ask_streaming(prompt):
+            if isinstance(item, dict):
+                metadata.update(item)
+            else:
+                yield item
 
-            # Zdroje
-            if response.get("sources"):
-                with st.expander("🔍 Zobrazit zdroje"):
-                    for i, source in enumerate(response["sources"][:5], 1):
-                        if isinstance(source, str):
-                            st.text(f"{i}. {source[:300]}...")
+    with st.chat_message("assistant"):
+        answer = st.write_stream(token_stream())
+        if not isinstance(answer, str):
+            answer = "".join(str(part) for part in answer)
+
+        st.session_state.law_metrics.track_query(
+            duration=metadata.get("response_time", 0.0),
+            confidence=metadata.get("confidence", "N/A"),
+            chunks_used=len(metadata.get("sources", [])),
+            agent_type=metadata.get("method", "unknown"),
+            prompt_tokens=metadata.get("prompt_tokens"),
+            ttft=metadata.get("ttft"),
+            trace_id=metadata.get("trace_id")
+        )
+
+        # Metadata
+        st.caption(
+            f"🔧 Metoda: {metadata.get('method', 'unknown')} | "
+            f"⚡ První token: {metadata.get('ttft', 0.0):.2f}s | "
+            f"⏱️ Celkem: {metadata.get('response_time', 0.0):.2f}s"
+        )
+
+        # Zdroje
+        if metadata.get("sources"):
+            with st.expander("🔍 Zobrazit zdroje"):
+                for i, source in enumerate(metadata["sources"][:5], 1):
+                    if isinstance(source, str):
+                        st.text(f"{i}. {source[:300]}...")
 
     # Přidání odpovědi do historie
     st.session_state.law_messages.append(
         {
             "role": "assistant",
-            "content": response["answer"],
-            "sources": response.get("sources", []),
-            "method": response.get("method", "unknown"),
+            "content": answer,
+            "sources": metadata.get("sources", []),
+            "method": metadata.get("method", "unknown"),
         }
     )
 
@@ -972,6 +1104,7 @@ def reset_law_agent():
 
     st.session_state.law_agent_loaded = False
     st.session_state.law_messages = []
+    st.session_state.pop("law_metrics", None)
     st.session_state.pop("selected_law", None)
     st.session_state.pop("selected_article", None)
 
@@ -1111,10 +1244,29 @@ def render_database_sidebar():
     agent = st.session_state.search_agent
     results = agent.get_last_results()
 
-    if results is None:
+    if not results:
         st.info("💡 Zkuste:\n- Najdi Jana\n- Kdo je v IT?\n- pan Horák z Liberce")
         return
 
+    # Jeden blok na každé volání nástroje z posledního kola (např. dvě souběžná hledání)
+    for result in results:
+        if len(results) > 1:
+            st.markdown(f"#### 🔎 {result.label}")
+        render_search_result(result)
+
+    st.markdown("---")
+    if st.button("🗑️ Reset", use_container_width=True):
+        agent.reset()
+        st.session_state.messages = []
+        initial = agent.start_conversation()
+        st.session_state.messages = [{"role": "assistant", "content": initial["message"]}]
+        st.rerun()
+
+
+def render_search_result(result):
+    """Jeden výsledek nástroje search agenta (statistiky, tabulka, stránkovaný kurzor osob)"""
+    results = result.results
+
     if isinstance(results, dict) and "total_people" in results:
         st.markdown("### 📈 Statistiky databáze")
         col_a, col_b = st.columns(2)
@@ -1126,14 +1278,24 @@ def render_database_sidebar():
             st.metric("Průměrný věk", results["average_age"])
         return
 
-    if isinstance(results, list):
-        st.markdown(f"**Nalezeno:** {len(results)} osob")
-        if len(results) == 0:
+    if isinstance(results, AggregateTable):
+        st.markdown(f"### 📊 {results.title}")
+        if results.filters:
+            st.caption(", ".join(f"{key}: {value}" for key, value in results.filters.items()))
+        st.caption(f"{results.people:,} osob")
+        st.dataframe(results.records(), use_container_width=True, hide_index=True)
+        return
+
+    if isinstance(results, PeopleCursor):
+        st.markdown(f"**Nalezeno:** {results.total} osob")
+        if results.total == 0:
             st.warning("Žádné výsledky")
             return
 
-        if len(results) == 1:
-            person = results[0]
+        # Materializuje se jen zobrazená stránka kurzoru
+        page = results.page()
+        if results.total == 1:
+            person = page[0]
             st.markdown("---")
             st.markdown(f"### {person['full_name']}")
             st.text(f"📧 {person['email']}")
@@ -1143,20 +1305,24 @@ def render_database_sidebar():
             st.text(f"📍 {person['location']}")
             st.text(f"💰 {person['salary']:,} Kč")
         else:
-            display_count = min(len(results), 10)
-            st.caption(f"Zobrazuji prvních {display_count}")
-            for person in results[:display_count]:
+            st.caption(f"Stránka {results.current + 1} z {results.page_count}")
+            for person in page:
                 with st.expander(f"{person['full_name']} - {person['position']}"):
                     st.text(f"📧 {person['email']}")
                     st.text(f"🏢 {person['department']} | 📍 {person['location']}")
 
-    st.markdown("---")
-    if st.button("🗑️ Reset", use_container_width=True):
-        agent.reset()
-        st.session_state.messages = []
-        initial = agent.start_conversation()
-        st.session_state.messages = [{"role": "assistant", "content": initial["message"]}]
-        st.rerun()
+            if results.page_count > 1:
+                col_prev, col_next = st.columns(2)
+                with col_prev:
+                    if st.button("◀ Předchozí", key=f"prev-{result.result_id}", use_container_width=True,
+                                 disabled=results.current == 0):
+                        results.seek(results.current - 1)
+                        st.rerun()
+                with col_next:
+                    if st.button("Další ▶", key=f"next-{result.result_id}", use_container_width=True,
+                                 disabled=results.current >= results.page_count - 1):
+                        results.seek(results.current + 1)
+                        st.rerun()
 
 
 def render_database_chat():
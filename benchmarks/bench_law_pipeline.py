@@ -0,0 +1,239 @@
+"""
+End-to-end benchmark právní RAG pipeline nad syntetickým zákonem.
+
+Pro každou velikost (počet paragrafů) měří:
+- parse_doc_to_structure (DOCX -> JSON struktura)
+- konstrukci LawJsonCrawler a jednotlivá API crawleru
+- LawDocumentProcessor.create_structured_chunks (všechny strategie)
+- stavbu indexu (create_faiss_index - embeddingy přes mock server + FAISS)
+- search_relevant_chunks (end-to-end) a samotné FAISS vyhledávání
+- SemanticCache.get (zásah i minutí) s počtem položek rovným velikosti
+
+Embeddingy obsluhuje lokální mock (benchmarks/mock_llm_server.py, výchozí profil
+"instant"), takže se měří vlastní kód, ne latence API. Výsledky jsou JSON
+s commitem a prostředím - lze je ukládat a porovnávat napříč commity.
+
+Použití (z kořene repozitáře):
+    python -m benchmarks.bench_law_pipeline --output bench_law.json
+    python -m benchmarks.bench_law_pipeline --sizes 10,100 --repeat 3
+    python -m benchmarks.bench_law_pipeline --json-only    # bez DOCX a parsování
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.load_test_api import latency_summary
+from benchmarks.mock_llm_server import add_profile_arguments, build_profile, create_app, hash_embedding, start_in_thread
+from benchmarks.synthetic_law import write_law_docx, write_law_json
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+CHUNK_STRATEGIES = ["paragraph", "article_paragraph", "point", "mixed"]
+
+SEARCH_QUERIES = [
+    "Jaká je lhůta pro vydání rozhodnutí?",
+    "Kdo může uložit pokutu?",
+    "Povinnosti zaměstnavatele při oznámení změny údajů",
+    "Jak dlouho se uchovávají doklady?",
+    "Odborná způsobilost provozovatele",
+]
+
+
+def measure(fn: Callable, repeat: int = 1) -> Dict:
+    """Spustí fn `repeat`-krát, vrací statistiky časů (výstup fn na stdout se zahazuje)"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            durations.append(time.perf_counter() - start)
+    stats = {
+        "runs": repeat,
+        "mean_s": sum(durations) / len(durations),
+        "min_s": min(durations),
+        "max_s": max(durations),
+    }
+    if isinstance(result, (list, tuple, str)):
+        stats["result_len"] = len(result)
+    return stats
+
+
+def bench_crawler_apis(crawler, repeat: int) -> Dict:
+    titles = crawler.get_paragraph_titles()
+    article = titles[len(titles) // 2] if titles else "§ 1"
+    return {
+        "get_paragraph_titles": measure(crawler.get_paragraph_titles, repeat),
+        "find_articles": measure(lambda: crawler.find_articles(article), repeat),
+        "find_articles_exact": measure(lambda: crawler.find_articles(article, exact=True), repeat),
+        "list_article_paragraphs": measure(lambda: crawler.list_article_paragraphs(article), repeat),
+        "list_points": measure(lambda: crawler.list_points(article), repeat),
+        "list_subpoints": measure(lambda: crawler.list_subpoints(article), repeat),
+        "get_text_article": measure(lambda: crawler.get_text(article=article), repeat),
+        "get_text_paragraph": measure(lambda: crawler.get_text(article=article, paragraph="1"), repeat),
+        "get_text_without_article": measure(lambda: crawler.get_text(paragraph="1", point="a"), repeat),
+    }
+
+
+def bench_search(processor, queries: List[str], k: int = 5) -> Dict:
+    end_to_end = []
+    for query in queries:
+        start = time.perf_counter()
+        processor.search_relevant_chunks(query, k=k)
+        end_to_end.append(time.perf_counter() - start)
+
+    vectors = np.stack([processor.get_embedding(q) for q in queries]).astype(np.float32)
+    faiss_only = []
+    for vector in vectors:
+        start = time.perf_counter()
+        processor.index.search(vector.reshape(1, -1), min(k * 3, len(processor.chunks)))
+        faiss_only.append(time.perf_counter() - start)
+
+    return {
+        "search_relevant_chunks_s": latency_summary(end_to_end),
+        "faiss_search_s": latency_summary(faiss_only),
+    }
+
+
+def bench_semantic_cache(entries: int, repeat: int) -> Dict:
+    from semantic_cache import SemanticCache
+
+    cache = SemanticCache()
+    for i in range(entries):
+        question = f"Otázka číslo {i} k paragrafu {i % 97}"
+        cache.add(question, hash_embedding(question).tolist(), {"answer": f"odpověď {i}"})
+
+    last_question = f"Otázka číslo {entries - 1} k paragrafu {(entries - 1) % 97}"
+    hit_embedding = hash_embedding(last_question).tolist()  # nejhorší případ - poslední položka
+    miss_embedding = hash_embedding("Úplně jiná otázka mimo cache").tolist()
+    return {
+        "entries": entries,
+        "get_hit_last": measure(lambda: cache.get(last_question, hit_embedding), repeat),
+        "get_miss": measure(lambda: cache.get("miss", miss_embedding), repeat),
+    }
+
+
+def bench_size(n_articles: int, workdir: str, args) -> Dict:
+    from parse_law import parse_doc_to_structure
+    from seach_law_json import LawJsonCrawler
+    from law_document_processor import LawDocumentProcessor
+
+    result: Dict = {"articles": n_articles}
+    json_path = os.path.join(workdir, f"law_{n_articles}.json")
+
+    if args.json_only:
+        write_law_json(json_path, n_articles)
+    else:
+        docx_path = write_law_docx(os.path.join(workdir, f"law_{n_articles}.docx"), n_articles)
+        result["docx_bytes"] = os.path.getsize(docx_path)
+        structure = {}
+
+        def parse():
+            structure["value"] = parse_doc_to_structure(docx_path)
+            return structure["value"]["parts"]
+
+        result["parse_doc_to_structure"] = measure(parse)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(structure["value"], f, ensure_ascii=False)
+    result["json_bytes"] = os.path.getsize(json_path)
+
+    result["crawler_init"] = measure(lambda: LawJsonCrawler(json_path), args.repeat)
+    crawler = LawJsonCrawler(json_path)
+    result["crawler_api"] = bench_crawler_apis(crawler, args.repeat)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor = LawDocumentProcessor()
+        processor.load_from_json(json_path)
+
+    chunking = {}
+    for strategy in CHUNK_STRATEGIES:
+        chunking[strategy] = measure(
+            lambda: processor.create_structured_chunks(chunk_strategy=strategy, max_chunk_size=1500),
+            args.repeat
+        )
+    result["create_structured_chunks"] = chunking
+
+    if args.index_max_articles and n_articles > args.index_max_articles:
+        result["index"] = {"skipped": f"nad --index-max-articles {args.index_max_articles}"}
+        return result
+
+    # create_faiss_index použije chunky z poslední strategie - chunkujeme znovu "mixed" (výchozí agenta)
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor.create_structured_chunks(chunk_strategy="mixed", max_chunk_size=1500)
+    result["index"] = {
+        "chunks": len(processor.chunks),
+        "create_faiss_index": measure(processor.create_faiss_index),
+    }
+    result["search"] = bench_search(processor, SEARCH_QUERIES * args.repeat)
+    return result
+
+
+def _environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark právní RAG pipeline")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="počty paragrafů oddělené čárkou")
+    parser.add_argument("--repeat", type=int, default=3, help="počet opakování rychlých měření")
+    parser.add_argument("--json-only", action="store_true", help="generovat přímo JSON (bez DOCX a parsování)")
+    parser.add_argument("--index-max-articles", type=int, default=0,
+                        help="přeskočit stavbu indexu nad touto velikostí (0 = nepřeskakovat)")
+    parser.add_argument("--api-base", help="URL běžícího mock serveru (jinak se spustí v procesu)")
+    parser.add_argument("--mock-port", type=int, default=8100)
+    parser.add_argument("--output", help="uložit výsledky do JSON souboru")
+    add_profile_arguments(parser)
+    parser.set_defaults(profile="instant")
+    args = parser.parse_args()
+
+    server = None
+    api_base = args.api_base
+    if not api_base:
+        app = create_app(build_profile(args), completion_tokens=args.completion_tokens)
+        server, api_base = start_in_thread(app, port=args.mock_port)
+    os.environ["API_BASE"] = api_base
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = {"environment": _environment(), "profile": args.profile, "sizes": sizes, "results": {}}
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for n_articles in sizes:
+                print(f"▶ {n_articles} paragrafů...")
+                report["results"][str(n_articles)] = bench_size(n_articles, workdir, args)
+                report["results"][str(n_articles)]["semantic_cache"] = bench_semantic_cache(n_articles, args.repeat)
+    finally:
+        if server is not None:
+            server.should_exit = True
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
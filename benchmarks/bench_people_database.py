@@ -0,0 +1,188 @@
+"""
+Benchmark databáze osob - lineární průchod seznamem, indexovaná PeopleDatabase
+v paměti a SQLitePeopleDatabase (FTS5) nad souborem.
+
+Pro každou velikost měří:
+- načtení (generování, stavba indexů, hromadné nahrání do SQLite)
+- latenci dotazů agenta (jméno, oddělení, pozice, dovednost, ID, smart search,
+  statistiky) - výsledky se materializují jen v rozsahu výpisu (prvních 10)
+
+Všechny backendy dostanou stejná data (seed), počty výsledků se kontrolují.
+
+Použití (z kořene repozitáře):
+    python -m benchmarks.bench_people_database --output bench_people.json
+    python -m benchmarks.bench_people_database --sizes 1000,100000 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.bench_law_pipeline import _environment
+from benchmarks.load_test_api import latency_summary
+from people_database import PeopleDatabase, generate_people
+from people_database_sqlite import SQLitePeopleDatabase
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+# Dotazy ve tvaru, v jakém je volá DatabaseSearchAgent
+QUERIES = {
+    "search_by_name": ("name", "Novák"),
+    "search_by_name_short": ("name", "Ev"),
+    "filter_by_department": ("department", "IT"),
+    "filter_by_position": ("position", "developer"),
+    "filter_by_skill": ("skill", "Kubernetes"),
+}
+SMART_SEARCHES = {
+    "smart_location_position": {"location": "Praha", "position": "developer"},
+    "smart_name_skill_location": {"name": "Černý", "skill": "Python", "location": "Brno"},
+    "smart_empty": {"name": "Černý", "skill": "Rust"},
+}
+SHOWN_RESULTS = 10
+
+
+class LinearPeople:
+    """Referenční lineární průchod seznamem (původní implementace bez indexů)"""
+
+    def __init__(self, people: List[Dict]):
+        self.people = people
+
+    def filter(self, field: str, value: str) -> List[Dict]:
+        value = value.lower()
+        if field == "name":
+            return [p for p in self.people if value in p["first_name"].lower()
+                    or value in p["last_name"].lower() or value in p["full_name"].lower()]
+        if field == "skill":
+            return [p for p in self.people if any(value in skill.lower() for skill in p["skills"])]
+        if field in ("department", "location"):
+            return [p for p in self.people if p[field].lower() == value]
+        return [p for p in self.people if value in p[field].lower()]
+
+    def search(self, filters: Dict[str, str]) -> List[Dict]:
+        results = self.people
+        for field, value in filters.items():
+            value = value.lower()
+            if field == "name":
+                results = [p for p in results if value in p["full_name"].lower()
+                           or value in p["first_name"].lower() or value in p["last_name"].lower()]
+            elif field == "skill":
+                results = [p for p in results if any(value in skill.lower() for skill in p["skills"])]
+            else:
+                results = [p for p in results if value in p[field].lower()]
+        return results
+
+    def get_person_by_id(self, person_id: int):
+        for person in self.people:
+            if person["id"] == person_id:
+                return person
+        return None
+
+    def get_statistics(self) -> Dict:
+        departments: Dict[str, int] = {}
+        for person in self.people:
+            departments[person["department"]] = departments.get(person["department"], 0) + 1
+        return {
+            "total_people": len(self.people),
+            "active_employees": sum(1 for p in self.people if p["active"]),
+            "departments": departments,
+            "average_salary": int(sum(p["salary"] for p in self.people) / len(self.people)),
+        }
+
+
+def timed(fn: Callable, repeat: int):
+    """Latence fn (repeat běhů) a poslední výsledek"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return latency_summary(durations), result
+
+
+def shown(results) -> int:
+    """Počet výsledků a materializace zobrazené části (jako výpis agenta)"""
+    results[:SHOWN_RESULTS]
+    return len(results)
+
+
+def bench_backend(name: str, backend, repeat: int, size: int) -> Dict:
+    result: Dict = {}
+    counts: Dict[str, int] = {}
+
+    for query, (field, value) in QUERIES.items():
+        if name == "linear":
+            fn = lambda: shown(backend.filter(field, value))
+        else:
+            method = "search_by_name" if field == "name" else f"filter_by_{field}"
+            fn = lambda: shown(getattr(backend, method)(value))
+        result[query], counts[query] = timed(fn, repeat)
+
+    for query, filters in SMART_SEARCHES.items():
+        result[query], counts[query] = timed(lambda: shown(backend.search(filters)), repeat)
+
+    result["get_person_by_id"], _ = timed(lambda: backend.get_person_by_id(size - 1), repeat)
+    result["get_statistics"], _ = timed(backend.get_statistics, repeat)
+    result["result_counts"] = counts
+    return result
+
+
+def bench_size(size: int, workdir: str, args) -> Dict:
+    start = time.perf_counter()
+    people = list(generate_people(size, rng=random.Random(args.seed)))
+    report: Dict = {"rows": size, "generate_s": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    memory = PeopleDatabase(people=people)
+    report["index_build_s"] = time.perf_counter() - start
+
+    db_path = os.path.join(workdir, f"people_{size}.db")
+    start = time.perf_counter()
+    sqlite = SQLitePeopleDatabase(db_path)
+    sqlite.bulk_load(iter(people))
+    report["sqlite_load_s"] = time.perf_counter() - start
+    report["sqlite_file_bytes"] = os.path.getsize(db_path)
+
+    report["backends"] = {
+        "linear": bench_backend("linear", LinearPeople(people), args.repeat, size),
+        "memory_index": bench_backend("memory_index", memory, args.repeat, size),
+        "sqlite": bench_backend("sqlite", sqlite, args.repeat, size),
+    }
+    sqlite.close()
+
+    reference = report["backends"]["linear"]["result_counts"]
+    report["counts_match"] = all(
+        backend["result_counts"] == reference for backend in report["backends"].values()
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark databáze osob (seznam / indexy / SQLite)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="počty osob oddělené čárkou")
+    parser.add_argument("--repeat", type=int, default=5, help="počet opakování každého dotazu")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="uložit výsledky do JSON souboru")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = {"environment": _environment(), "sizes": sizes, "results": {}}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            print(f"▶ {size} osob...")
+            report["results"][str(size)] = bench_size(size, workdir, args)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark lokálního klasifikátoru typu dotazu proti LLM routingu.
+
+Měří shodu lokálního klasifikátoru s referenčními štítky (zalogovaná LLM
+rozhodnutí nebo vestavěná sada), podíl dotazů, které by kvůli nízké jistotě
+šly na LLM fallback, a ušetřenou latenci (jen dotazy bez fallbacku).
+
+Použití (z kořene repozitáře):
+    python -m benchmarks.bench_query_classifier
+    python -m benchmarks.bench_query_classifier --log routing_log.jsonl --folds 5
+    python -m benchmarks.bench_query_classifier --llm      # živé LLM volání jako reference
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from query_classifier import QueryTypeClassifier
+
+# Vestavěná evaluační sada (odlišná od SEED_EXAMPLES)
+EVAL_SET: List[Dict[str, str]] = [
+    {"question": "Můžeš mi shrnout druhou část zákona?", "label": "summary"},
+    {"question": "Dej mi stručný přehled celého dokumentu", "label": "summary"},
+    {"question": "Co je hlavním obsahem tohoto předpisu?", "label": "summary"},
+    {"question": "Shrnutí povinností zaměstnavatele", "label": "summary"},
+    {"question": "Porovnej § 5 a § 6", "label": "analysis"},
+    {"question": "Jaké jsou dopady změny pro malé firmy?", "label": "analysis"},
+    {"question": "Zhodnoť srozumitelnost tohoto ustanovení", "label": "analysis"},
+    {"question": "Analyzuj vztah mezi odstavci 2 a 3", "label": "analysis"},
+    {"question": "Jaká je maximální pokuta?", "label": "extraction"},
+    {"question": "Vypiš všechny lhůty uvedené v zákoně", "label": "extraction"},
+    {"question": "Kolik procent činí sazba daně?", "label": "extraction"},
+    {"question": "Které ministerstvo je příslušné?", "label": "extraction"},
+    {"question": "Vysvětli pojem správní delikt", "label": "explanation"},
+    {"question": "Proč zákon rozlišuje fyzické a právnické osoby?", "label": "explanation"},
+    {"question": "Jak probíhá řízení o přestupku?", "label": "explanation"},
+    {"question": "Co znamená promlčení v tomto kontextu?", "label": "explanation"},
+]
+
+
+def load_dataset(path: str) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate_folds(dataset: List[Dict[str, str]], folds: int) -> Dict:
+    """K-fold: trénink na (k-1) částech zalogovaných rozhodnutí, test na zbytku"""
+    items = list(dataset)
+    random.Random(42).shuffle(items)
+    folds = max(1, min(folds, len(items)))
+
+    agree = 0
+    local_times = []
+    methods: Dict[str, int] = {}
+
+    for fold in range(folds):
+        test = items[fold::folds]
+        train = [item for i, item in enumerate(items) if i % folds != fold] if folds > 1 else []
+
+        classifier = QueryTypeClassifier()
+        for item in train:
+            classifier.record(item["question"], item["label"], item.get("embedding"))
+
+        for item in test:
+            start = time.perf_counter()
+            label, confidence, method = classifier.predict(item["question"], item.get("embedding"))
+            local_times.append(time.perf_counter() - start)
+            if confidence < classifier.confidence_threshold:
+                method = "llm"        # classify() by se zeptal LLM
+            methods[method] = methods.get(method, 0) + 1
+            agree += int(label == item["label"])
+
+    return {
+        "samples": len(items),
+        "agreement": agree / len(items) if items else 0.0,
+        "local_latency_ms_mean": statistics.mean(local_times) * 1000 if local_times else 0.0,
+        "local_latency_ms_max": max(local_times) * 1000 if local_times else 0.0,
+        "methods": methods,
+        "fallback_rate": methods.get("llm", 0) / len(items) if items else 0.0,
+    }
+
+
+def llm_reference(dataset: List[Dict[str, str]]) -> Dict:
+    """Přeštítkuje dataset živým LLM voláním a změří jeho latenci"""
+    from akkodis_clients import client_gpt_4o
+    from chatbot import ContextualChatbot
+
+    client, deployment = client_gpt_4o()
+    latencies = []
+    relabeled = []
+    for item in dataset:
+        start = time.perf_counter()
+        response = client.chat.completions.create(
+            model=deployment,
+            messages=[{"role": "user", "content": ContextualChatbot._classification_prompt(item["question"])}],
+            temperature=0.3,
+            max_tokens=20
+        )
+        latencies.append(time.perf_counter() - start)
+        relabeled.append({**item, "label": response.choices[0].message.content.strip().lower()})
+    return {"dataset": relabeled, "latencies": latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", help="JSONL se zalogovanými routing rozhodnutími (question, label)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--llm", action="store_true", help="použít živé LLM jako referenci a změřit jeho latenci")
+    parser.add_argument("--llm-latency-ms", type=float, default=700.0,
+                        help="předpokládaná latence LLM klasifikace, pokud se neměří živě")
+    parser.add_argument("--output", help="uložit výsledek jako JSON")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.log) if args.log else EVAL_SET
+    llm_latency_ms = args.llm_latency_ms
+    if args.llm:
+        reference = llm_reference(dataset)
+        dataset = reference["dataset"]
+        llm_latency_ms = statistics.mean(reference["latencies"]) * 1000
+
+    # Bez logu hodnotíme vestavěnou sadu proti modelu natrénovanému jen ze seedů
+    result = evaluate_folds(dataset, args.folds if args.log else 1)
+    result["llm_latency_ms"] = llm_latency_ms
+    result["llm_latency_measured"] = args.llm
+    # Lokální predikce běží vždy, LLM volání odpadne jen u dotazů bez fallbacku
+    result["saved_latency_ms_per_query"] = (
+        (1 - result["fallback_rate"]) * llm_latency_ms - result["local_latency_ms_mean"]
+    )
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
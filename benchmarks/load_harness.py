@@ -0,0 +1,232 @@
+"""
+Zátěžový harness nad lokálním mock LLM serverem (benchmarks/mock_llm_server.py).
+
+Prožene ContextualChatbot, LawExpertAgent a chatbot_api (Flask i ASGI, přes
+HTTP jako benchmarks/load_test_api.py) zadaným počtem souběžných uživatelů
+bez přístupu k OpenAI/Azure.
+Výsledky (propustnost, latence p50/p95/p99, chyby) vypíše jako JSON.
+
+Použití (z kořene repozitáře):
+    python -m benchmarks.load_harness --target all --concurrency 16 --requests 64
+    python -m benchmarks.load_harness --target law --law-docx zakon.docx --profile gpt-4o
+    python -m benchmarks.load_harness --target law --law-articles 500   # syntetický zákon
+    python -m benchmarks.load_harness --target api-async --api-base http://localhost:8100/v1
+
+Bez --api-base se mock spustí v tomtéž procesu (sdílí s harnessem CPU i GIL);
+pro přesnější čísla spusťte mock zvlášť a předejte jeho URL.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from benchmarks.load_test_api import latency_summary, run_load_test
+from benchmarks.mock_llm_server import VOCABULARY, add_profile_arguments, build_profile, create_app, start_in_thread
+
+TARGETS = ["chatbot", "chatbot-async", "law", "api", "api-async"]
+
+QUESTIONS = [
+    "Jaká je lhůta pro podání žádosti?",
+    "Shrň povinnosti zaměstnavatele",
+    "Kdo rozhoduje o odvolání?",
+    "Jaká je výše pokuty za porušení povinnosti?",
+    "Vysvětli postup řízení",
+    "Co stanoví § 3?",
+]
+
+
+def synthetic_text(paragraphs: int, seed: int = 42) -> str:
+    """Deterministický pseudo-český text dokumentu pro ContextualChatbot"""
+    rng = random.Random(seed)
+    return "\n\n".join(
+        " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(80, 160))) + "."
+        for _ in range(paragraphs)
+    )
+
+
+def _report(name: str, latencies: List[float], errors: List[str], elapsed: float, concurrency: int) -> Dict:
+    return {
+        "target": name,
+        "concurrency": concurrency,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency_s": latency_summary(latencies),
+    }
+
+
+def run_threaded(name: str, make_worker: Callable[[], Callable[[str], object]],
+                 questions: List[str], concurrency: int) -> Dict:
+    """Každé vlákno = jeden uživatel s vlastní instancí agenta, otázky si dělí rovnoměrně"""
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    def user(batch: List[str]):
+        ask = make_worker()
+        for question in batch:
+            start = time.perf_counter()
+            try:
+                ask(question)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(repr(e))
+
+    batches = [questions[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(user, batches))
+    return _report(name, latencies, errors, time.perf_counter() - start, concurrency)
+
+
+async def run_async(name: str, make_worker: Callable[[], Callable[[str], object]],
+                    questions: List[str], concurrency: int) -> Dict:
+    """Async varianta run_threaded - uživatelé jsou korutiny v jednom event loopu"""
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def user(batch: List[str]):
+        ask = make_worker()
+        for question in batch:
+            start = time.perf_counter()
+            try:
+                await ask(question)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(repr(e))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(questions[i::concurrency]) for i in range(concurrency)))
+    return _report(name, latencies, errors, time.perf_counter() - start, concurrency)
+
+
+# ---------- Cíle ----------
+
+def bench_chatbot(args, questions: List[str], use_async: bool) -> Dict:
+    from chatbot import ContextualChatbot
+    from document_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    processor.create_faiss_index(synthetic_text(args.doc_paragraphs))
+
+    if use_async:
+        return asyncio.run(run_async(
+            "chatbot-async", lambda: ContextualChatbot(processor).ask_async, questions, args.concurrency
+        ))
+    return run_threaded("chatbot", lambda: ContextualChatbot(processor).ask, questions, args.concurrency)
+
+
+def bench_law(args, questions: List[str]) -> Dict:
+    from chatbot import ContextualChatbot
+    from law_expert_agent import LawExpertAgent
+
+    agent = LawExpertAgent()
+    if args.law_docx:
+        agent.load_law_from_docx(args.law_docx)
+    else:
+        from benchmarks.synthetic_law import write_law_docx
+
+        with tempfile.TemporaryDirectory() as workdir:
+            docx_path = write_law_docx(os.path.join(workdir, "synthetic_law.docx"), args.law_articles)
+            agent.load_law_from_docx(docx_path)
+
+    def make_worker():
+        # Sdílený index a crawler, vlastní chatbot a historie pro každého uživatele
+        worker = copy.copy(agent)
+        worker.chatbot = ContextualChatbot(agent.doc_processor)
+        worker.conversation_history = []
+        return worker.ask
+
+    try:
+        return run_threaded("law", make_worker, questions, args.concurrency)
+    finally:
+        agent.cleanup()
+
+
+def bench_api(args, messages_per_user: int) -> Dict:
+    """Flask API na werkzeug serveru (jako run.py), zatížené přes HTTP"""
+    import threading
+    from werkzeug.serving import make_server
+    from chatbot_api import app
+
+    server = make_server('127.0.0.1', args.api_port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        return asyncio.run(run_load_test(f"http://127.0.0.1:{args.api_port}", args.concurrency, messages_per_user))
+    finally:
+        server.shutdown()
+
+
+def bench_api_async(args, messages_per_user: int) -> Dict:
+    """ASGI API na uvicorn serveru, zatížené přes HTTP"""
+    from chatbot_api_async import app
+
+    server, _ = start_in_thread(app, port=args.api_port + 1)
+    try:
+        return asyncio.run(run_load_test(f"http://127.0.0.1:{args.api_port + 1}", args.concurrency, messages_per_user))
+    finally:
+        server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zátěžový harness nad mock LLM serverem")
+    parser.add_argument("--target", choices=TARGETS + ["all"], default="all")
+    parser.add_argument("--concurrency", type=int, default=8, help="počet souběžných uživatelů")
+    parser.add_argument("--requests", type=int, default=32, help="celkový počet dotazů na cíl")
+    parser.add_argument("--api-base", help="URL běžícího mock serveru (jinak se spustí v procesu)")
+    parser.add_argument("--mock-port", type=int, default=8100)
+    parser.add_argument("--api-port", type=int, default=5100, help="port Flask API (ASGI API běží na +1)")
+    parser.add_argument("--law-docx", help="DOCX zákona pro cíl law (jinak syntetický zákon)")
+    parser.add_argument("--law-articles", type=int, default=50, help="počet paragrafů syntetického zákona")
+    parser.add_argument("--doc-paragraphs", type=int, default=40, help="velikost dokumentu pro cíl chatbot")
+    parser.add_argument("--output", help="uložit výsledky do JSON souboru")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    api_base = args.api_base
+    if not api_base:
+        app = create_app(build_profile(args), completion_tokens=args.completion_tokens, error_rate=args.error_rate)
+        server, api_base = start_in_thread(app, port=args.mock_port)
+
+    # Klienti v clients.py čtou konfiguraci při importu - moduly agentů se importují až teď
+    os.environ["API_BASE"] = api_base
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.requests)]
+    messages_per_user = max(1, args.requests // args.concurrency)
+    targets = TARGETS if args.target == "all" else [args.target]
+
+    runners = {
+        "chatbot": lambda: bench_chatbot(args, questions, use_async=False),
+        "chatbot-async": lambda: bench_chatbot(args, questions, use_async=True),
+        "law": lambda: bench_law(args, questions),
+        "api": lambda: bench_api(args, messages_per_user),
+        "api-async": lambda: bench_api_async(args, messages_per_user),
+    }
+
+    report = {"api_base": api_base, "profile": args.profile, "results": {}}
+    try:
+        for target in targets:
+            print(f"▶ {target}...")
+            report["results"][target] = runners[target]()
+    finally:
+        if server is not None:
+            server.should_exit = True
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
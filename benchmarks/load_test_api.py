@@ -0,0 +1,168 @@
+"""
+Zátěžový test webpage chatbot API (Flask chatbot_api.py vs. ASGI chatbot_api_async.py).
+
+Každý virtuální uživatel zavolá /api/init (získá vlastní session) a pak
+posílá zprávy na /api/chat (nebo /api/chat/stream). Měří se propustnost,
+latence (p50/p95/p99), u streamu čas do prvního tokenu a chybovost.
+
+Použití (z kořene repozitáře, servery musí běžet):
+    python -m benchmarks.load_test_api --url http://localhost:5000 --concurrency 200
+    python -m benchmarks.load_test_api --url flask=http://localhost:5000 \\
+        --url asgi=http://localhost:5001 --concurrency 500 --messages 3 --stream
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+SESSION_HEADER = "X-Session-ID"
+
+DEFAULT_MESSAGES = [
+    "Jaké služby nabízíte?",
+    "Kolik stojí Enterprise balíček?",
+    "Jak vás mohu kontaktovat?",
+    "Nabízíte bezplatnou konzultaci?",
+]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+async def _send_message(
+    client: httpx.AsyncClient,
+    base_url: str,
+    headers: Dict[str, str],
+    message: str,
+    stream: bool
+) -> Tuple[float, Optional[float]]:
+    """Pošle jednu zprávu, vrací (latence, čas do prvního tokenu)"""
+    start = time.perf_counter()
+
+    if not stream:
+        response = await client.post(f"{base_url}/api/chat", json={"message": message}, headers=headers)
+        response.raise_for_status()
+        return time.perf_counter() - start, None
+
+    ttft = None
+    async with client.stream("POST", f"{base_url}/api/chat/stream",
+                             json={"message": message}, headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: error"):
+                raise RuntimeError("stream error event")
+            if ttft is None and line.startswith("data:") and '"token"' in line:
+                ttft = time.perf_counter() - start
+    return time.perf_counter() - start, ttft
+
+
+async def _virtual_user(
+    client: httpx.AsyncClient,
+    base_url: str,
+    messages: List[str],
+    stream: bool,
+    results: Dict[str, list]
+):
+    try:
+        response = await client.get(f"{base_url}/api/init")
+        response.raise_for_status()
+        headers = {SESSION_HEADER: response.headers.get(SESSION_HEADER, "")}
+    except Exception as e:
+        results["errors"].append(f"init: {e!r}")
+        return
+
+    for message in messages:
+        try:
+            latency, ttft = await _send_message(client, base_url, headers, message, stream)
+            results["latencies"].append(latency)
+            if ttft is not None:
+                results["ttfts"].append(ttft)
+        except Exception as e:
+            results["errors"].append(f"chat: {e!r}")
+
+
+async def run_load_test(
+    base_url: str,
+    concurrency: int,
+    messages_per_user: int,
+    stream: bool = False,
+    timeout: float = 120.0
+) -> Dict:
+    """Spustí `concurrency` souběžných uživatelů proti jednomu serveru"""
+    messages = [DEFAULT_MESSAGES[i % len(DEFAULT_MESSAGES)] for i in range(messages_per_user)]
+    results: Dict[str, list] = {"latencies": [], "ttfts": [], "errors": []}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _virtual_user(client, base_url, messages, stream, results)
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    completed = len(results["latencies"])
+    return {
+        "url": base_url,
+        "concurrency": concurrency,
+        "messages_per_user": messages_per_user,
+        "stream": stream,
+        "elapsed_s": elapsed,
+        "completed": completed,
+        "errors": len(results["errors"]),
+        "error_samples": results["errors"][:5],
+        "throughput_rps": completed / elapsed if elapsed > 0 else 0.0,
+        "latency_s": latency_summary(results["latencies"]),
+        "ttft_s": latency_summary(results["ttfts"]) if stream else None,
+    }
+
+
+def _parse_target(value: str) -> Tuple[str, str]:
+    """'jmeno=url' nebo jen 'url'"""
+    if "=" in value and not value.startswith("http"):
+        name, url = value.split("=", 1)
+        return name, url.rstrip("/")
+    return value, value.rstrip("/")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zátěžový test webpage chatbot API")
+    parser.add_argument("--url", action="append", required=True,
+                        help="URL serveru, volitelně pojmenované: asgi=http://localhost:5001 (lze opakovat)")
+    parser.add_argument("--concurrency", type=int, default=100, help="počet souběžných uživatelů")
+    parser.add_argument("--messages", type=int, default=2, help="počet zpráv na uživatele")
+    parser.add_argument("--stream", action="store_true", help="použít /api/chat/stream (SSE)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="timeout jednoho požadavku v sekundách")
+    parser.add_argument("--output", help="uložit výsledky do JSON souboru")
+    args = parser.parse_args()
+
+    report = {}
+    for target in args.url:
+        name, url = _parse_target(target)
+        report[name] = asyncio.run(run_load_test(url, args.concurrency, args.messages, args.stream, args.timeout))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Lokální náhrada OpenAI/Azure API pro offline zátěžové testy.
+
+Implementuje /chat/completions (včetně streamování) a /embeddings:
+- embeddingy jsou deterministické (hash slov -> náhodný vektor, součet přes
+  slova), takže podobné texty mají podobné vektory a FAISS vyhledávání dává smysl
+- odpovědi jsou deterministické podle poslední zprávy uživatele
+- latence a rychlost generování podle profilu (čas do prvního tokenu, tokeny/s)
+
+Použití (z kořene repozitáře):
+    python -m benchmarks.mock_llm_server --port 8100 --profile gpt-4o
+    API_BASE=http://localhost:8100/v1 python chatbot_api_async.py
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from conversation_history import estimate_messages_tokens, estimate_tokens
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """Latence simulovaného modelu"""
+    ttft_ms: float          # čas do prvního tokenu odpovědi
+    tokens_per_s: float     # rychlost generování (0 = bez zpoždění)
+    embedding_ms: float     # latence jednoho /embeddings požadavku
+    jitter: float = 0.0     # náhodný rozptyl latencí (0.2 = +-20 %)
+
+
+PROFILES: Dict[str, LatencyProfile] = {
+    "instant": LatencyProfile(ttft_ms=0, tokens_per_s=0, embedding_ms=0),
+    "fast": LatencyProfile(ttft_ms=50, tokens_per_s=400, embedding_ms=10, jitter=0.1),
+    "gpt-4o": LatencyProfile(ttft_ms=450, tokens_per_s=80, embedding_ms=60, jitter=0.25),
+    "slow": LatencyProfile(ttft_ms=1500, tokens_per_s=25, embedding_ms=250, jitter=0.25),
+}
+
+EMBEDDING_DIMENSION = 1536
+
+VOCABULARY = (
+    "zákon stanoví povinnost osoba orgán lhůta řízení rozhodnutí žádost podle "
+    "odstavce paragrafu ustanovení správní úřad případ právo smlouva zaměstnanec "
+    "zaměstnavatel pokuta sankce oznámení den měsíc rok platnost účinnost "
+    "informace údaje podmínky postup návrh odvolání soud služby produkt cena "
+    "kontakt společnost zákazník nabídka"
+).split()
+
+
+# ---------- Embeddingy ----------
+
+@lru_cache(maxsize=100000)
+def _word_vector(word: str, dimension: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+
+
+def hash_embedding(text: str, dimension: int = EMBEDDING_DIMENSION) -> np.ndarray:
+    """Deterministický embedding - normalizovaný součet vektorů slov"""
+    counts = Counter(re.findall(r"\w+", text.lower())) or Counter({"": 1})
+    vector = np.zeros(dimension, dtype=np.float32)
+    for word, count in counts.items():
+        vector += count * _word_vector(word, dimension)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+# ---------- Chat ----------
+
+def _message_text(message: Dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def mock_reply_tokens(messages: List[Dict], max_tokens: int) -> List[str]:
+    """Deterministická odpověď podle poslední zprávy uživatele, po tokenech"""
+    last_user = next((_message_text(m) for m in reversed(messages) if m.get("role") == "user"), "")
+    rng = random.Random(hashlib.sha1(last_user.encode("utf-8")).hexdigest())
+    return [rng.choice(VOCABULARY) + ("." if (i + 1) % 12 == 0 else "") + " " for i in range(max_tokens)]
+
+
+def create_app(
+    profile: LatencyProfile = PROFILES["fast"],
+    completion_tokens: int = 120,
+    dimension: int = EMBEDDING_DIMENSION,
+    error_rate: float = 0.0
+) -> Starlette:
+    """
+    Vytvoří ASGI aplikaci mock serveru.
+
+    Args:
+        profile: latence simulovaného modelu
+        completion_tokens: délka odpovědi (omezená max_tokens z požadavku)
+        dimension: dimenze embeddingů
+        error_rate: podíl požadavků, které skončí chybou 503 (test retry logiky)
+    """
+
+    def jittered(seconds: float) -> float:
+        if profile.jitter <= 0:
+            return seconds
+        return max(0.0, seconds * random.uniform(1 - profile.jitter, 1 + profile.jitter))
+
+    def should_fail() -> bool:
+        return error_rate > 0 and random.random() < error_rate
+
+    async def chat_completions(body: Dict) -> Response:
+        messages = body.get("messages", [])
+        model = body.get("model", "mock")
+        max_tokens = min(body.get("max_tokens") or body.get("max_completion_tokens") or completion_tokens,
+                         completion_tokens)
+        tokens = mock_reply_tokens(messages, max_tokens)
+        usage = {
+            "prompt_tokens": estimate_messages_tokens(messages),
+            "completion_tokens": len(tokens),
+            "total_tokens": estimate_messages_tokens(messages) + len(tokens),
+        }
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        token_delay = 1.0 / profile.tokens_per_s if profile.tokens_per_s > 0 else 0.0
+
+        if not body.get("stream"):
+            await asyncio.sleep(jittered(profile.ttft_ms / 1000 + token_delay * len(tokens)))
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        def chunk(delta: Dict, finish_reason=None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        async def generate():
+            await asyncio.sleep(jittered(profile.ttft_ms / 1000))
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                yield chunk({"content": token})
+                if token_delay:
+                    await asyncio.sleep(jittered(token_delay))
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                data = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": model, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(data)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+    async def embeddings(body: Dict) -> Response:
+        inputs = body.get("input", "")
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+
+        await asyncio.sleep(jittered(profile.embedding_ms / 1000))
+
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(texts):
+            vector = hash_embedding(text, dimension)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        prompt_tokens = sum(estimate_tokens(text) for text in texts)
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "mock"),
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        })
+
+    async def dispatch(request: Request) -> Response:
+        """OpenAI (/v1/...) i Azure (/openai/deployments/<model>/...) cesty"""
+        path = request.url.path.rstrip("/")
+        if should_fail():
+            return JSONResponse({"error": {"message": "mock overloaded", "type": "server_error"}},
+                                status_code=503)
+        body = await request.json()
+        if path.endswith("/chat/completions"):
+            return await chat_completions(body)
+        if path.endswith("/embeddings"):
+            return await embeddings(body)
+        return JSONResponse({"error": {"message": f"Unknown endpoint {path}"}}, status_code=404)
+
+    async def health(request: Request) -> Response:
+        return JSONResponse({"status": "ok"})
+
+    return Starlette(routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/{path:path}", dispatch, methods=["POST"]),
+    ])
+
+
+def start_in_thread(app: Starlette, host: str = "127.0.0.1", port: int = 8100) -> Tuple[object, str]:
+    """
+    Spustí mock server na pozadí (pro harness ve stejném procesu).
+
+    Returns:
+        (uvicorn server, base URL pro API_BASE) - ukončení: server.should_exit = True
+    """
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", backlog=4096))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Mock LLM server se nespustil na {host}:{port}")
+        time.sleep(0.01)
+    return server, f"http://{host}:{port}/v1"
+
+
+def build_profile(args) -> LatencyProfile:
+    profile = PROFILES[args.profile]
+    overrides = {
+        "ttft_ms": args.ttft_ms,
+        "tokens_per_s": args.tokens_per_s,
+        "embedding_ms": args.embedding_ms,
+        "jitter": args.jitter,
+    }
+    return replace(profile, **{k: v for k, v in overrides.items() if v is not None})
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast", help="latenční profil")
+    parser.add_argument("--ttft-ms", type=float, help="přepíše čas do prvního tokenu")
+    parser.add_argument("--tokens-per-s", type=float, help="přepíše rychlost generování")
+    parser.add_argument("--embedding-ms", type=float, help="přepíše latenci embeddingů")
+    parser.add_argument("--jitter", type=float, help="přepíše rozptyl latencí")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="délka odpovědi v tokenech")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="podíl požadavků končících chybou 503")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Azure server pro offline zátěžové testy")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    profile = build_profile(args)
+    print(f"Mock LLM server: http://{args.host}:{args.port}/v1 (profil {args.profile}: {profile})")
+    app = create_app(profile, completion_tokens=args.completion_tokens, error_rate=args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", backlog=4096)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Generátor syntetického českého zákona pro benchmarky.
+
+Struktura odpovídá reálným předpisům: části (ČÁST PRVNÍ, ...), paragrafy (§ n),
+odstavce ((1), (2), ...), písmena (a), b), ...) a body (1., 2., ...).
+Zákon lze vygenerovat jako DOCX (vstup parse_doc_to_structure) nebo přímo jako
+JSON ve schématu výstupu parse_law (vstup LawJsonCrawler bez parsování DOCX).
+
+Použití (z kořene repozitáře):
+    python -m benchmarks.synthetic_law --articles 1000 --docx zakon.docx --json zakon.json
+"""
+import argparse
+import json
+import random
+from typing import Dict, Iterator, List, Tuple
+
+from parse_law import RULES, aggregate_article_tags, make_node, make_paragraph_node
+
+ARTICLES_PER_PART = 25
+
+_PART_ORDINALS = [
+    "PRVNÍ", "DRUHÁ", "TŘETÍ", "ČTVRTÁ", "PÁTÁ", "ŠESTÁ", "SEDMÁ", "OSMÁ", "DEVÁTÁ", "DESÁTÁ",
+]
+
+_SUBJECTS = [
+    "Zaměstnavatel", "Správní orgán", "Žadatel", "Provozovatel", "Ministerstvo",
+    "Obecní úřad", "Poskytovatel služby", "Fyzická osoba", "Právnická osoba", "Krajský úřad",
+]
+_VERBS = [
+    "je povinen", "může", "nesmí", "oznámí", "rozhodne o tom, zda", "zajistí, aby",
+    "vede evidenci o tom, zda", "je oprávněn",
+]
+_OBJECTS = [
+    "podat žádost o vydání povolení", "uchovávat doklady po dobu 5 let",
+    "oznámit změnu údajů do 15 dnů", "uložit pokutu do 100 000 Kč",
+    "zveřejnit informace způsobem umožňujícím dálkový přístup",
+    "vydat rozhodnutí ve lhůtě 30 dnů", "přerušit řízení",
+    "předložit doklad o odborné způsobilosti", "zahájit řízení z moci úřední",
+]
+_CONDITIONS = [
+    "", " za podmínek stanovených tímto zákonem", " podle § {ref}", " nejpozději do 30 dnů ode dne doručení",
+    " na základě písemné žádosti", " v rozsahu stanoveném prováděcím právním předpisem",
+]
+
+_PROPERTIES = {"bold": False, "strike": False, "double_strike": False, "color": "black", "alignment": "other"}
+
+
+def _part_title(index: int) -> str:
+    ordinal = _PART_ORDINALS[index] if index < len(_PART_ORDINALS) else str(index + 1)
+    return f"ČÁST {ordinal}"
+
+
+def _sentence(rng: random.Random, n_articles: int) -> str:
+    condition = rng.choice(_CONDITIONS).format(ref=rng.randint(1, n_articles))
+    return f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}{condition}"
+
+
+def generate_law(n_articles: int, seed: int = 42) -> Iterator[Tuple[str, str]]:
+    """
+    Vygeneruje řádky zákona jako dvojice (druh, text).
+
+    Druhy: "part", "article" (centrované nadpisy), "paragraph", "point",
+    "subpoint" (text včetně prefixu "(1) ", "a) ", "1. ").
+    Výstup je deterministický pro dané n_articles a seed.
+    """
+    rng = random.Random(seed)
+    for article in range(1, n_articles + 1):
+        if (article - 1) % ARTICLES_PER_PART == 0:
+            yield "part", _part_title((article - 1) // ARTICLES_PER_PART)
+        yield "article", f"§ {article}"
+
+        for paragraph in range(1, rng.randint(1, 4) + 1):
+            has_points = rng.random() < 0.4
+            ending = ":" if has_points else "."
+            yield "paragraph", f"({paragraph}) {_sentence(rng, n_articles)}{ending}"
+            if not has_points:
+                continue
+            points = rng.randint(2, 4)
+            for p in range(points):
+                letter = "abcdefgh"[p]
+                has_subpoints = rng.random() < 0.3
+                ending = ":" if has_subpoints else ("." if p == points - 1 else ",")
+                yield "point", f"{letter}) {_sentence(rng, n_articles).lower()}{ending}"
+                if has_subpoints:
+                    for s in range(1, rng.randint(2, 3) + 1):
+                        yield "subpoint", f"{s}. {_sentence(rng, n_articles).lower()},"
+
+
+def write_law_docx(path: str, n_articles: int, seed: int = 42) -> str:
+    """Zapíše syntetický zákon do DOCX (nadpisy centrované, jako ve Sbírce)"""
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    document = Document()
+    for kind, text in generate_law(n_articles, seed):
+        paragraph = document.add_paragraph(text)
+        if kind in ("part", "article"):
+            paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    document.save(path)
+    return path
+
+
+def build_law_structure(n_articles: int, seed: int = 42, document: str = "synthetic") -> Dict:
+    """Sestaví stejnou strukturu, jakou pro DOCX z write_law_docx vrátí parse_doc_to_structure"""
+    result = {"document": document, "schema_version": RULES.get("schema_version", "1.0"), "parts": []}
+    part = article = paragraph = point = None
+
+    def segments(text: str, centered: bool = False) -> List[Dict]:
+        properties = dict(_PROPERTIES, alignment="center" if centered else "other")
+        return [{"label": "valid_text", "text": text, "properties": properties}]
+
+    for kind, text in generate_law(n_articles, seed):
+        if kind == "part":
+            part = make_node("part", title=text, meta={"raw_text": text})
+            heading_segments = segments(text, centered=True)
+            heading_segments[0]["label"] = RULES["heading_outside_article"].get("label", "heading_text")
+            part["children"].append(make_paragraph_node(text, heading_segments, para_heading=True))
+            result["parts"].append(part)
+
+        elif kind == "article":
+            heading_segments = segments(text, centered=True)
+            article = make_node("article", title=None, meta={
+                "raw_text": text,
+                "heading_segments": heading_segments,
+                "heading_summary": aggregate_article_tags(heading_segments),
+                "article_number": text,
+            })
+            part["children"].append(article)
+
+        elif kind == "paragraph":
+            key, rest = text[1:].split(") ", 1)
+            paragraph = make_node("article_paragraph", title=key, meta={"prefix_type": "number"})
+            paragraph["children"].append(make_paragraph_node(rest, segments(text), prefix={"type": "number", "key": key}))
+            article["children"].append(paragraph)
+
+        elif kind == "point":
+            key, rest = text.split(") ", 1)
+            point = make_node("point", title=key, meta={"prefix_type": "letter"})
+            point["children"].append(make_paragraph_node(rest, segments(text), prefix={"type": "letter", "key": key}))
+            paragraph["children"].append(point)
+
+        elif kind == "subpoint":
+            key, rest = text.split(". ", 1)
+            subpoint = make_node("subpoint", title=key, meta={"prefix_type": "sub_number"})
+            subpoint["children"].append(
+                make_paragraph_node(rest, segments(text), prefix={"type": "sub_number", "key": key})
+            )
+            point["children"].append(subpoint)
+
+    return result
+
+
+def write_law_json(path: str, n_articles: int, seed: int = 42) -> str:
+    """Zapíše syntetický zákon přímo jako JSON (bez DOCX a parsování)"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(build_law_structure(n_articles, seed, document=path), f, ensure_ascii=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generátor syntetického českého zákona")
+    parser.add_argument("--articles", type=int, default=100, help="počet paragrafů")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--docx", help="výstupní DOCX")
+    parser.add_argument("--json", help="výstupní JSON (schéma parse_law)")
+    args = parser.parse_args()
+
+    if not args.docx and not args.json:
+        parser.error("zadejte --docx nebo --json")
+    if args.docx:
+        print(f"DOCX: {write_law_docx(args.docx, args.articles, args.seed)}")
+    if args.json:
+        print(f"JSON: {write_law_json(args.json, args.articles, args.seed)}")
+
+
+if __name__ == "__main__":
+    main()
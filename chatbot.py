@@ -1,31 +1,21 @@
-from typing import List, Dict, Optional
-from akkodis_clients import client_gpt_4o
+from typing import List, Dict, Optional, Tuple
+from akkodis_clients import client_gpt_4o, async_client_gpt_4o
 from document_processor import DocumentProcessor
+from conversation_history import ConversationHistory, estimate_messages_tokens
+from query_classifier import QueryTypeClassifier, QUERY_TYPES
+from semantic_cache import SemanticCache
+from tracing import current_trace_id, isolated_generator, set_usage, span
+from usage import current_budget_level, ledger as usage_ledger, usage_scope
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+import asyncio
+import contextvars
 import time
 
 
-class ContextualChatbot:
-    def __init__(self, doc_processor: DocumentProcessor):
-        # Načtení GPT clienta z akkodis_clients
-        self.client, self.deployment = client_gpt_4o()
-        self.doc_processor = doc_processor
-        self.conversation_history: List[Dict[str, str]] = []
-
-    def ask(self, question: str) -> dict:
-        """Položí otázku s kontextem z dokumentu a historie konverzace"""
-        start_time = time.time()
-
-        # Vyhledání relevantních chunks z dokumentu
-        relevant_chunks, distances = self.doc_processor.search_relevant_chunks(question, k=3)
-        context = "\n\n".join(relevant_chunks)
-
-        # Příprava system promptu s kontextem dokumentu
-        system_message = {
-    "role": "system",
-    "content": f"""Jsi specializovaný AI asistent pro právní dokumentaci. Tvým úkolem je poskytovat přesné odpovědi na otázky týkající se zákonů na základě poskytnutého kontextu.
+# Statické instrukce - musí zůstat byte-identické, aby fungoval prompt caching
+LAW_SYSTEM_PROMPT = """Jsi specializovaný AI asistent pro právní dokumentaci. Tvým úkolem je poskytovat přesné odpovědi na otázky týkající se zákonů na základě poskytnutého kontextu.
 
-## Kontext z právního dokumentu:
-{context}
+Kontext z právního dokumentu dostaneš v samostatné zprávě těsně před otázkou.
 
 ## Instrukce pro odpovědi:
 
@@ -49,33 +39,110 @@ class ContextualChatbot:
 - Neposkytuj právní rady - pouze informace z dokumentu
 - Neinterpretuj zákon mimo rámec poskytnutého kontextu
 - Při nejasnostech raději přiznej nedostatek informací než spekuluj"""
-}
 
-        # Přidání aktuální otázky do historie
-        self.conversation_history.append({
-            "role": "user",
-            "content": question
-        })
+STREAMING_SYSTEM_PROMPT = """Jsi pokročilý AI asistent.
 
-        # Sestavení zpráv pro API (system + historie konverzace)
-        messages = [system_message] + self.conversation_history
+Kontext z dokumentu dostaneš v samostatné zprávě těsně před otázkou.
 
-        # Zavolání GPT API
-        response = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=800
+Odpovídej pouze na základě kontextu."""
+
+# Při dosažení rozpočtu API (usage.py) se posílá jen posledních N zpráv historie bez shrnutí
+BUDGET_HISTORY_MESSAGES = 2
+
+# Jak dlouho async odpověď počká na běžící obnovení shrnutí historie (pak použije dosavadní)
+SUMMARY_WAIT_SECONDS = 0.5
+
+
+class ContextualChatbot:
+    def __init__(
+        self,
+        doc_processor: DocumentProcessor,
+        max_history_turns: int = 4,
+        history_token_budget: int = 3000,
+        routing_log_path: Optional[str] = None
+    ):
+        # Načtení GPT clienta z akkodis_clients
+        self.client, self.deployment = client_gpt_4o("contextual_chatbot")
+        self.doc_processor = doc_processor
+        self.history = ConversationHistory(
+            self.client,
+            self.deployment,
+            max_turns=max_history_turns,
+            token_budget=history_token_budget
+        )
+        # Lokální routing; LLM jen jako fallback při nízké jistotě
+        self.query_classifier = QueryTypeClassifier(
+            llm_fallback=self.classify_query_type_llm,
+            log_path=routing_log_path
         )
+        # Odpovědi pro cache-first režim při vyčerpaném rozpočtu API (plní se jen se zapnutými rozpočty)
+        self.answer_cache = SemanticCache()
 
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """Doslovně uchované zprávy (starší jsou ve shrnutí)"""
+        return self.history.messages
+
+    def ask(self, question: str, query_embedding: Optional[List[float]] = None) -> dict:
+        """
+        Položí otázku s kontextem z dokumentu a historie konverzace.
+
+        query_embedding: již spočítaný embedding pro vyhledávání (jinak z question)
+        """
+        start_time = time.time()
+
+        with span("chatbot.ask"):
+            embedding = query_embedding
+            if embedding is None and usage_ledger.budgets_enabled:
+                embedding = self.doc_processor.get_embedding(question)
+                cached = self._budget_cache_lookup(question, embedding, start_time)
+                if cached is not None:
+                    return cached
+
+            # Vyhledání relevantních chunks z dokumentu (embedding z kontroly cache se použije znovu)
+            relevant_chunks, distances = self.doc_processor.search_relevant_chunks(
+                question, k=3, query_embedding=embedding
+            )
+            context = "\n\n".join(relevant_chunks)
+
+            # Statický prefix + historie + proměnlivý kontext (kvůli prompt cachingu)
+            messages = self._build_messages(LAW_SYSTEM_PROMPT, context, question)
+
+            # Zavolání GPT API
+            with span("llm.completion", model=self.deployment) as completion_span, \
+                    usage_scope(history_tokens=self._history_tokens(messages)):
+                response = self.client.chat.completions.create(
+                    model=self.deployment,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=800
+                )
+                set_usage(completion_span, response)
+
+            result = self._finalize_answer(question, messages, response, relevant_chunks, distances, start_time)
+            self._budget_cache_store(question, embedding, result)
+            return result
+
+    def _finalize_answer(
+        self,
+        question: str,
+        messages: List[Dict[str, str]],
+        response,
+        relevant_chunks: List[str],
+        distances: List[float],
+        start_time: float
+    ) -> dict:
+        """Uloží výměnu do historie a sestaví výsledek ask"""
         # Získání odpovědi
         answer = response.choices[0].message.content
 
-        # Uložení odpovědi do historie
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": answer
-        })
+        # Skutečný počet tokenů z API, jinak odhad
+        usage = getattr(response, "usage", None)
+        prompt_tokens = usage.prompt_tokens if usage else estimate_messages_tokens(messages)
+
+        # Uložení otázky a odpovědi do historie (bez kontextu z vyhledávání)
+        self.history.append("user", question)
+        self.history.append("assistant", answer)
 
         # Výpočet confidence a response time
         confidence = self._calculate_confidence(relevant_chunks, distances)
@@ -86,45 +153,83 @@ class ContextualChatbot:
             "sources": relevant_chunks,
             "confidence": confidence,
             "distances": distances,
-            "response_time": response_time
+            "response_time": response_time,
+            "prompt_tokens": prompt_tokens,
+            "trace_id": current_trace_id()
         }
 
-    def ask_streaming(self, question: str):
-        """Streamovaná odpověď pro real-time efekt"""
-        relevant_chunks, distances = self.doc_processor.search_relevant_chunks(question, k=3)
-        context = "\n\n".join(relevant_chunks)
-
-        system_message = {
-            "role": "system",
-            "content": f"""Jsi pokročilý AI asistent.
-
-Kontext z dokumentu:
-{context}
+    def _budget_cache_lookup(self, question: str, embedding, start_time: float) -> Optional[dict]:
+        """Cache-first při vyčerpaném rozpočtu API - podobná otázka se zodpoví bez completion"""
+        if current_budget_level() != "exceeded":
+            return None
+        cached = self.answer_cache.get(question, embedding)
+        if cached is None:
+            return None
 
-Odpovídej pouze na základě kontextu."""
+        self.history.append("user", question)
+        self.history.append("assistant", cached["answer"])
+        return {
+            **cached,
+            "response_time": time.time() - start_time,
+            "prompt_tokens": 0,
+            "trace_id": current_trace_id()
         }
 
-        self.conversation_history.append({"role": "user", "content": question})
-        messages = [system_message] + self.conversation_history
+    def _budget_cache_store(self, question: str, embedding, result: dict):
+        """Uloží odpověď pro pozdější cache-first režim (embedding je None při vypnutých rozpočtech)"""
+        if embedding is not None:
+            self.answer_cache.add(question, embedding, {
+                key: result[key] for key in ("answer", "sources", "confidence", "distances")
+            })
+
+    @staticmethod
+    def _history_tokens(messages: List[Dict[str, str]]) -> int:
+        """Odhad tokenů historie ve zprávách z _build_messages (mezi instrukcemi a kontextem)"""
+        return estimate_messages_tokens(messages[1:-2])
+
+    @isolated_generator
+    def ask_streaming(self, question: str, system_prompt: Optional[str] = None):
+        """
+        Streamovaná odpověď pro real-time efekt
+
+        Args:
+            question: otázka
+            system_prompt: statické instrukce (výchozí STREAMING_SYSTEM_PROMPT)
+        """
+        relevant_chunks, distances = self.doc_processor.search_relevant_chunks(question, k=3)
+        context = "\n\n".join(relevant_chunks)
 
-        # Streaming response
-        stream = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=800,
-            stream=True
-        )
+        messages = self._build_messages(system_prompt or STREAMING_SYSTEM_PROMPT, context, question)
+        self.history.append("user", question)
 
         full_answer = ""
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
-                content = chunk.choices[0].delta.content
-                full_answer += content
-                yield content
+        with span("llm.completion", model=self.deployment, stream=True) as completion_span, \
+                usage_scope(history_tokens=self._history_tokens(messages)):
+            # Streaming response
+            stream = self.client.chat.completions.create(
+                model=self.deployment,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800,
+                stream=True
+            )
+
+            # Průběžný odhad (vstup, počet streamovaných částí ~ tokenů); skutečné usage
+            # ze závěrečného chunku streamu doplní obal klienta (usage.py)
+            completion_span.set("prompt_tokens", estimate_messages_tokens(messages))
+            streamed_chunks = 0
+            for chunk in stream:
+                if chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    if not full_answer:
+                        completion_span.mark("ttft")
+                    full_answer += content
+                    streamed_chunks += 1
+                    completion_span.set("completion_tokens", streamed_chunks)
+                    yield content
 
         # Uložení celé odpovědi do historie
-        self.conversation_history.append({"role": "assistant", "content": full_answer})
+        self.history.append("assistant", full_answer)
 
         # Vrácení metadat jako poslední yield
         confidence = self._calculate_confidence(relevant_chunks, distances)
@@ -132,9 +237,33 @@ Odpovídej pouze na základě kontextu."""
             "metadata": True,
             "sources": relevant_chunks,
             "confidence": confidence,
-            "distances": distances
+            "distances": distances,
+            "prompt_tokens": estimate_messages_tokens(messages)
         }
 
+    def _build_messages(self, system_prompt: str, context: str, question: str) -> List[Dict[str, str]]:
+        """
+        Sestaví zprávy pro API.
+
+        Pořadí je zvolené tak, aby začátek promptu byl mezi dotazy byte-identický
+        (instrukce, historie) a proměnlivé části (kontext, otázka) byly až na konci.
+        Provider pak může použít automatický prompt caching.
+        """
+        with span("prompt.build"):
+            history = self.history.get_messages()
+            if current_budget_level() != "ok":
+                # Rozpočet API dochází - bez shrnutí, jen poslední výměna
+                history = [m for m in history if m["role"] != "system"][-BUDGET_HISTORY_MESSAGES:]
+
+            return (
+                [{"role": "system", "content": system_prompt}]
+                + history
+                + [
+                    {"role": "system", "content": f"## Kontext z dokumentu k následující otázce:\n{context}"},
+                    {"role": "user", "content": question}
+                ]
+            )
+
     def _calculate_confidence(self, chunks: List[str], distances: List[float]) -> str:
         """Vypočítá confidence scoring na základě kvality retrievalu"""
         avg_distance = sum(distances) / len(distances)
@@ -147,9 +276,9 @@ Odpovídej pouze na základě kontextu."""
         else:
             return "Nízká"
 
-    def classify_query_type(self, question: str) -> str:
-        """Klasifikuje typ dotazu pro multi-agent routing"""
-        classification_prompt = f"""Klasifikuj tento dotaz do jedné z kategorií:
+    @staticmethod
+    def _classification_prompt(question: str) -> str:
+        return f"""Klasifikuj tento dotaz do jedné z kategorií:
 - summary: shrnutí, přehled, celkový obsah
 - analysis: analýza, porovnání, vyhodnocení
 - extraction: hledání konkrétních dat, čísel, jmen
@@ -158,9 +287,41 @@ Odpovídej pouze na základě kontextu."""
 Dotaz: {question}
 Odpověz pouze názvem kategorie."""
 
+    @staticmethod
+    def _enhance_question(question: str, query_type: str) -> str:
+        """Vylepšení otázky podle typu"""
+        enhanced_prompts = {
+            "summary": f"Jako expert na sumarizaci: {question}\nPoskytni strukturované shrnutí s klíčovými body.",
+            "analysis": f"Jako analytik: {question}\nProveď hloubkovou analýzu s argumenty a závěry.",
+            "extraction": f"Jako data specialista: {question}\nNajdi a vypiš všechny relevantní konkrétní údaje.",
+            "explanation": f"Jako učitel: {question}\nVysvětli jednoduše a srozumitelně s příklady."
+        }
+        return enhanced_prompts.get(query_type, question)
+
+    @staticmethod
+    def _no_context_messages(question: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": "Jsi AI asistent. Odpověz na otázku."},
+            {"role": "user", "content": question}
+        ]
+
+    def classify_query_type(self, question: str, embedding: Optional[List[float]] = None) -> str:
+        """
+        Klasifikuje typ dotazu pro multi-agent routing (lokálně, LLM jen jako fallback).
+
+        S embeddingem otázky se použije nearest-centroid a fallback ho zaloguje.
+        """
+        with span("routing.classify") as classify_span:
+            query_type, _, method = self.query_classifier.classify(question, embedding)
+            classify_span.set("query_type", query_type)
+            classify_span.set("method", method)
+        return query_type
+
+    def classify_query_type_llm(self, question: str) -> str:
+        """Klasifikace typu dotazu pomocí LLM (fallback lokálního klasifikátoru)"""
         response = self.client.chat.completions.create(
             model=self.deployment,
-            messages=[{"role": "user", "content": classification_prompt}],
+            messages=[{"role": "user", "content": self._classification_prompt(question)}],
             temperature=0.3,
             max_tokens=20
         )
@@ -168,48 +329,257 @@ Odpověz pouze názvem kategorie."""
         return response.choices[0].message.content.strip().lower()
 
     def ask_with_agent_routing(self, question: str) -> dict:
-        """Položí otázku s inteligentním multi-agent routingem"""
-        query_type = self.classify_query_type(question)
+        """
+        Položí otázku s inteligentním multi-agent routingem.
 
-        # Vylepšení otázky podle typu
-        enhanced_prompts = {
-            "summary": f"Jako expert na sumarizaci: {question}\nPoskytni strukturované shrnutí s klíčovými body.",
-            "analysis": f"Jako analytik: {question}\nProveď hloubkovou analýzu s argumenty a závěry.",
-            "extraction": f"Jako data specialista: {question}\nNajdi a vypiš všechny relevantní konkrétní údaje.",
-            "explanation": f"Jako učitel: {question}\nVysvětli jednoduše a srozumitelně s příklady."
-        }
+        Embedding původní otázky slouží klasifikaci i vyhledávání, vylepšená
+        otázka jde jen do completion.
+        """
+        with span("chatbot.ask_with_routing"):
+            embedding = self.doc_processor.get_embedding(question)
+            query_type = self.classify_query_type(question, embedding)
 
-        enhanced_question = enhanced_prompts.get(query_type, question)
-        result = self.ask(enhanced_question)
-        result["agent_type"] = query_type
+            enhanced_question = self._enhance_question(question, query_type)
+            result = self.ask(enhanced_question, query_embedding=embedding)
+            result["agent_type"] = query_type
 
         return result
 
-    def compare_with_without_context(self, question: str) -> dict:
-        """Demo funkce: porovnání odpovědi s kontextem a bez"""
-        # Odpověď BEZ kontextu z dokumentu
-        messages_no_context = [
-            {"role": "system", "content": "Jsi AI asistent. Odpověz na otázku."},
-            {"role": "user", "content": question}
-        ]
-
-        response_no_context = self.client.chat.completions.create(
+    def _answer_without_context(self, question: str) -> str:
+        """Odpověď BEZ kontextu z dokumentu"""
+        response = self.client.chat.completions.create(
             model=self.deployment,
-            messages=messages_no_context,
+            messages=self._no_context_messages(question),
             temperature=0.7,
             max_tokens=500
         )
+        return response.choices[0].message.content
+
+    @staticmethod
+    def _timed(func, *args):
+        """Zavolá funkci a vrátí (výsledek, doba běhu)"""
+        branch_start = time.time()
+        result = func(*args)
+        return result, time.time() - branch_start
+
+    @isolated_generator
+    def compare_with_without_context_streaming(self, question: str):
+        """
+        Demo funkce: obě odpovědi se generují souběžně a vrací se postupně,
+        jak dobíhají (rychlejší větev se zobrazí hned).
+
+        Yields:
+            dict s klíči "branch" ("without_context" | "with_context"), "duration"
+            a výsledkem dané větve
+        """
+        with span("chatbot.compare"), ThreadPoolExecutor(max_workers=2) as executor:
+            # Kopie kontextu pro každou větev - spany a usage_scope se přenesou do vláken
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._timed, self._answer_without_context, question):
+                    "without_context",
+                executor.submit(contextvars.copy_context().run, self._timed, self.ask, question): "with_context"
+            }
+
+            for future in as_completed(futures):
+                branch = futures[future]
+                result, duration = future.result()
+
+                if branch == "without_context":
+                    yield {"branch": branch, "duration": duration, "answer": result}
+                else:
+                    yield {
+                        "branch": branch,
+                        "duration": duration,
+                        "answer": result["answer"],
+                        "sources": result["sources"],
+                        "confidence": result["confidence"]
+                    }
+
+    def compare_with_without_context(self, question: str) -> dict:
+        """Demo funkce: porovnání odpovědi s kontextem a bez (obě větve běží souběžně)"""
+        start_time = time.time()
+        branches = {item["branch"]: item for item in self.compare_with_without_context_streaming(question)}
+
+        without_context = branches["without_context"]
+        with_context = branches["with_context"]
+
+        return {
+            "without_context": without_context["answer"],
+            "with_context": with_context["answer"],
+            "sources": with_context["sources"],
+            "confidence": with_context["confidence"],
+            "timings": self._comparison_timings(
+                without_context["duration"], with_context["duration"], time.time() - start_time
+            )
+        }
 
-        # Odpověď S kontextem (normální funkce)
-        response_with_context = self.ask(question)
+    @staticmethod
+    def _comparison_timings(without_context: float, with_context: float, total: float) -> Dict[str, float]:
+        """Časy jednotlivých větví; rag_overhead = o kolik je RAG větev pomalejší"""
+        return {
+            "without_context": without_context,
+            "with_context": with_context,
+            "rag_overhead": with_context - without_context,
+            "total": total
+        }
+
+    # ========================================================================
+    # ASYNC VARIANTY (AsyncOpenAI, pro async web servery)
+    # ========================================================================
+
+    def _get_async_client(self):
+        # Sdílený klient z registru - vázaný na aktuální event loop
+        client, _ = async_client_gpt_4o("contextual_chatbot")
+        return client
+
+    async def _retrieve_async(
+        self,
+        question: str,
+        k: int = 3,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[str], List[float]]:
+        """
+        Vyhledání kontextu; souběžně se dokončí případné obnovení shrnutí historie,
+        aby prompt obsahoval aktuální shrnutí - nejvýše SUMMARY_WAIT_SECONDS.
+        """
+        if hasattr(self.doc_processor, "search_relevant_chunks_async"):
+            search = self.doc_processor.search_relevant_chunks_async(
+                question, k=k, query_embedding=query_embedding
+            )
+        else:
+            search = asyncio.to_thread(
+                self.doc_processor.search_relevant_chunks, question, k=k, query_embedding=query_embedding
+            )
+
+        (relevant_chunks, distances), _ = await asyncio.gather(search, self._wait_for_summary())
+        return relevant_chunks, distances
+
+    async def _wait_for_summary(self):
+        """Počká na běžící obnovení shrnutí s limitem; po něm se použije dosavadní shrnutí"""
+        try:
+            await asyncio.to_thread(self.history.wait_for_summary, SUMMARY_WAIT_SECONDS)
+        except FutureTimeoutError:
+            pass
+
+    async def _answer_async(
+        self,
+        question: str,
+        relevant_chunks: List[str],
+        distances: List[float],
+        start_time: float
+    ) -> dict:
+        """Completion nad již vyhledaným kontextem"""
+        context = "\n\n".join(relevant_chunks)
+        messages = self._build_messages(LAW_SYSTEM_PROMPT, context, question)
+
+        with span("llm.completion", model=self.deployment) as completion_span, \
+                usage_scope(history_tokens=self._history_tokens(messages)):
+            response = await self._get_async_client().chat.completions.create(
+                model=self.deployment,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800
+            )
+            set_usage(completion_span, response)
+
+        return self._finalize_answer(question, messages, response, relevant_chunks, distances, start_time)
+
+    async def ask_async(self, question: str) -> dict:
+        """Asynchronní varianta ask - neblokuje vlákno po dobu API volání"""
+        start_time = time.time()
+        with span("chatbot.ask"):
+            embedding = None
+            if usage_ledger.budgets_enabled:
+                embedding = await self._embed_async(question)
+                cached = self._budget_cache_lookup(question, embedding, start_time)
+                if cached is not None:
+                    return cached
+
+            relevant_chunks, distances = await self._retrieve_async(question, query_embedding=embedding)
+            result = await self._answer_async(question, relevant_chunks, distances, start_time)
+            self._budget_cache_store(question, embedding, result)
+            return result
+
+    async def _embed_async(self, question: str) -> List[float]:
+        if hasattr(self.doc_processor, "get_embedding_async"):
+            return await self.doc_processor.get_embedding_async(question)
+        return await asyncio.to_thread(self.doc_processor.get_embedding, question)
+
+    async def classify_query_type_async(self, question: str, embedding: Optional[List[float]] = None) -> str:
+        """Asynchronní varianta classify_query_type"""
+        with span("routing.classify") as classify_span:
+            query_type, confidence, method = self.query_classifier.predict(question, embedding)
+            if confidence < self.query_classifier.confidence_threshold:
+                llm_type = await self.classify_query_type_llm_async(question)
+                if llm_type in QUERY_TYPES:
+                    self.query_classifier.record(question, llm_type, embedding)
+                    query_type, method = llm_type, "llm"
+            classify_span.set("query_type", query_type)
+            classify_span.set("method", method)
+        return query_type
+
+    async def classify_query_type_llm_async(self, question: str) -> str:
+        """Asynchronní varianta classify_query_type_llm"""
+        response = await self._get_async_client().chat.completions.create(
+            model=self.deployment,
+            messages=[{"role": "user", "content": self._classification_prompt(question)}],
+            temperature=0.3,
+            max_tokens=20
+        )
+
+        return response.choices[0].message.content.strip().lower()
+
+    async def ask_with_agent_routing_async(self, question: str) -> dict:
+        """
+        Asynchronní routing: klasifikace dotazu běží souběžně s vyhledáváním.
+
+        Vyhledává se podle původní otázky, vylepšená otázka jde jen do completion;
+        embedding otázky sdílí vyhledávání s klasifikací.
+        """
+        start_time = time.time()
+
+        with span("chatbot.ask_with_routing"):
+            embedding = await self._embed_async(question)
+            (relevant_chunks, distances), query_type = await asyncio.gather(
+                self._retrieve_async(question, query_embedding=embedding),
+                self.classify_query_type_async(question, embedding)
+            )
+
+            enhanced_question = self._enhance_question(question, query_type)
+            result = await self._answer_async(enhanced_question, relevant_chunks, distances, start_time)
+            result["agent_type"] = query_type
+
+        return result
+
+    async def compare_with_without_context_async(self, question: str) -> dict:
+        """Asynchronní porovnání - obě odpovědi se generují souběžně"""
+        start_time = time.time()
+
+        async def timed(coro):
+            branch_start = time.time()
+            result = await coro
+            return result, time.time() - branch_start
+
+        (response_no_context, no_context_time), (response_with_context, with_context_time) = await asyncio.gather(
+            timed(self._get_async_client().chat.completions.create(
+                model=self.deployment,
+                messages=self._no_context_messages(question),
+                temperature=0.7,
+                max_tokens=500
+            )),
+            timed(self.ask_async(question))
+        )
 
         return {
             "without_context": response_no_context.choices[0].message.content,
             "with_context": response_with_context["answer"],
             "sources": response_with_context["sources"],
-            "confidence": response_with_context["confidence"]
+            "confidence": response_with_context["confidence"],
+            "timings": self._comparison_timings(
+                no_context_time, with_context_time, time.time() - start_time
+            )
         }
 
     def clear_history(self):
         """Vymaže historii konverzace"""
-        self.conversation_history = []
+        self.history.clear()
@@ -1,16 +1,62 @@
 """Flask API pro webpage chatbot"""
-from flask import Flask, request, jsonify
+import functools
+import json
+import os
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from webpage_assistant import WebpageAssistant
 from webpage_content import WEBPAGE_CONTENT
+from session_store import SESSION_COOKIE, SESSION_HEADER, Session, SessionStore
+from metrics_registry import ACTIVE_SESSIONS, PROMETHEUS_CONTENT_TYPE, registry
+from tracing import TRACE_HEADER, current_trace_id, isolated_generator, span
+from usage import usage_scope
 
 app = Flask(__name__)
-CORS(app)  # Povolit CORS pro všechny domény
+CORS(app, expose_headers=[SESSION_HEADER, TRACE_HEADER])  # Povolit CORS pro všechny domény
+
+# Každý návštěvník má vlastní instanci asistenta (vlastní historii)
+sessions = SessionStore(
+    factory=lambda: WebpageAssistant(WEBPAGE_CONTENT),
+    max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", "10000")),
+    ttl_seconds=float(os.getenv("CHAT_SESSION_TTL", "1800"))
+)
+ACTIVE_SESSIONS.set_function(lambda: len(sessions))
+
+
+def _get_session() -> Session:
+    """Najde session podle hlavičky nebo cookie, případně vytvoří novou"""
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    session, _ = sessions.get_or_create(session_id)
+    return session
+
+
+def _with_session(response: Response, session: Session) -> Response:
+    """Vrátí ID session klientovi (hlavička i cookie)"""
+    response.headers[SESSION_HEADER] = session.session_id
+    response.set_cookie(SESSION_COOKIE, session.session_id, httponly=True, samesite='Lax')
+    return response
+
+
+def traced_endpoint(name: str):
+    """
+    Celý požadavek jako kořenový span; ID trace se vrací v hlavičce X-Trace-ID.
+    Klient může poslat vlastní X-Trace-ID a navázat tak na svůj trace.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with span(name, trace_id=request.headers.get(TRACE_HEADER)) as request_span:
+                response = app.make_response(view(*args, **kwargs))
+                request_span.set("status", response.status_code)
+            if request_span.trace_id:
+                response.headers[TRACE_HEADER] = request_span.trace_id
+            return response
+        return wrapper
+    return decorator
 
-# Globální instance asistenta
-assistant = WebpageAssistant(WEBPAGE_CONTENT)
 
 @app.route('/api/chat', methods=['POST'])
+@traced_endpoint("api.chat")
 def chat():
     """Endpoint pro chat zprávy"""
     try:
@@ -20,13 +66,17 @@ def chat():
         if not user_message:
             return jsonify({'error': 'No message provided'}), 400
 
+        session = _get_session()
+
         # Získání odpovědi od asistenta
-        response = assistant.chat(user_message)
+        with session.lock, usage_scope(session=session.session_id):
+            response = session.assistant.chat(user_message)
 
-        return jsonify({
+        return _with_session(jsonify({
             'response': response,
+            'session_id': session.session_id,
             'status': 'success'
-        })
+        }), session)
 
     except Exception as e:
         return jsonify({
@@ -35,18 +85,65 @@ def chat():
         }), 500
 
 
+def _sse(data: dict, event: str = None) -> str:
+    """Naformátuje jednu Server-Sent Events zprávu"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+@traced_endpoint("api.chat_stream")
+def chat_stream():
+    """Endpoint pro chat zprávy - odpověď se streamuje jako Server-Sent Events"""
+    data = request.json or {}
+    user_message = data.get('message', '')
+
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    session = _get_session()
+    trace_id = current_trace_id()
+
+    @isolated_generator
+    def generate():
+        # Zámek se drží po celou dobu streamu - zprávy téže session se neprolínají
+        # Stream běží až po návratu handleru, proto vlastní span ve stejném trace
+        with span("api.chat_stream.body", trace_id=trace_id), session.lock, \
+                usage_scope(session=session.session_id):
+            try:
+                for token in session.assistant.chat_streaming(user_message):
+                    yield _sse({'token': token})
+                yield _sse({'status': 'success', 'session_id': session.session_id}, event='done')
+            except Exception as e:
+                yield _sse({'error': str(e), 'status': 'error'}, event='error')
+
+    return _with_session(Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # vypnutí bufferování v reverzních proxy
+        }
+    ), session)
+
+
 @app.route('/api/init', methods=['GET'])
+@traced_endpoint("api.init")
 def init_chat():
     """Endpoint pro inicializaci chatu"""
     try:
+        session = _get_session()
+
         # Reset a nový start
-        assistant.reset()
-        greeting = assistant.start_conversation()
+        with session.lock:
+            session.assistant.reset()
+            greeting = session.assistant.start_conversation()
 
-        return jsonify({
+        return _with_session(jsonify({
             'greeting': greeting,
+            'session_id': session.session_id,
             'status': 'success'
-        })
+        }), session)
 
     except Exception as e:
         return jsonify({
@@ -56,16 +153,21 @@ def init_chat():
 
 
 @app.route('/api/reset', methods=['POST'])
+@traced_endpoint("api.reset")
 def reset_chat():
     """Endpoint pro reset konverzace"""
     try:
-        assistant.reset()
-        greeting = assistant.start_conversation()
+        session = _get_session()
 
-        return jsonify({
+        with session.lock:
+            session.assistant.reset()
+            greeting = session.assistant.start_conversation()
+
+        return _with_session(jsonify({
             'greeting': greeting,
+            'session_id': session.session_id,
             'status': 'success'
-        })
+        }), session)
 
     except Exception as e:
         return jsonify({
@@ -74,5 +176,11 @@ def reset_chat():
         }), 500
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Metriky procesu ve formátu Prometheus"""
+    return Response(registry.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
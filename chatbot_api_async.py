@@ -0,0 +1,221 @@
+"""
+ASGI (async) varianta API pro webpage chatbot - stejný kontrakt jako chatbot_api.py.
+
+Každé čekání na model je jen pozastavená korutina, ne blokované vlákno,
+takže jeden proces zvládne tisíce souběžných (i streamovaných) spojení.
+
+Spuštění:
+    python chatbot_api_async.py
+    uvicorn chatbot_api_async:app --port 5000
+"""
+import functools
+import json
+import os
+from contextlib import aclosing, asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from akkodis_clients import aclose_clients
+from webpage_assistant import WebpageAssistant
+from webpage_content import WEBPAGE_CONTENT
+from session_store import SESSION_COOKIE, SESSION_HEADER, Session, SessionStore
+from metrics_registry import ACTIVE_SESSIONS, PROMETHEUS_CONTENT_TYPE, registry
+from tracing import TRACE_HEADER, current_trace_id, span
+from usage import usage_scope
+
+# Každý návštěvník má vlastní instanci asistenta (vlastní historii)
+sessions = SessionStore(
+    factory=lambda: WebpageAssistant(WEBPAGE_CONTENT),
+    max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", "10000")),
+    ttl_seconds=float(os.getenv("CHAT_SESSION_TTL", "1800"))
+)
+ACTIVE_SESSIONS.set_function(lambda: len(sessions))
+
+
+def _get_session(request: Request) -> Session:
+    """Najde session podle hlavičky nebo cookie, případně vytvoří novou"""
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    session, _ = sessions.get_or_create(session_id)
+    return session
+
+
+def _with_session(response: Response, session: Session) -> Response:
+    """Vrátí ID session klientovi (hlavička i cookie)"""
+    response.headers[SESSION_HEADER] = session.session_id
+    response.set_cookie(SESSION_COOKIE, session.session_id, httponly=True, samesite='lax')
+    return response
+
+
+def traced_endpoint(name: str):
+    """Celý požadavek jako kořenový span; ID trace se vrací v hlavičce X-Trace-ID"""
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(request: Request) -> Response:
+            with span(name, trace_id=request.headers.get(TRACE_HEADER)) as request_span:
+                response = await endpoint(request)
+                request_span.set("status", response.status_code)
+            if request_span.trace_id:
+                response.headers[TRACE_HEADER] = request_span.trace_id
+            return response
+        return wrapper
+    return decorator
+
+
+def _error(e: Exception) -> JSONResponse:
+    return JSONResponse({
+        'error': str(e),
+        'status': 'error'
+    }, status_code=500)
+
+
+def _sse(data: dict, event: str = None) -> str:
+    """Naformátuje jednu Server-Sent Events zprávu"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@traced_endpoint("api.chat")
+async def chat(request: Request) -> Response:
+    """Endpoint pro chat zprávy"""
+    try:
+        data = await request.json()
+        user_message = data.get('message', '')
+
+        if not user_message:
+            return JSONResponse({'error': 'No message provided'}, status_code=400)
+
+        session = _get_session(request)
+
+        # Získání odpovědi od asistenta
+        async with session.async_lock:
+            with usage_scope(session=session.session_id):
+                response = await session.assistant.chat_async(user_message)
+
+        return _with_session(JSONResponse({
+            'response': response,
+            'session_id': session.session_id,
+            'status': 'success'
+        }), session)
+
+    except Exception as e:
+        return _error(e)
+
+
+@traced_endpoint("api.chat_stream")
+async def chat_stream(request: Request) -> Response:
+    """Endpoint pro chat zprávy - odpověď se streamuje jako Server-Sent Events"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    user_message = (data or {}).get('message', '')
+
+    if not user_message:
+        return JSONResponse({'error': 'No message provided'}, status_code=400)
+
+    session = _get_session(request)
+    trace_id = current_trace_id()
+
+    async def generate():
+        # Zámek se drží po celou dobu streamu - zprávy téže session se neprolínají
+        # Stream běží až po návratu handleru, proto vlastní span ve stejném trace
+        with span("api.chat_stream.body", trace_id=trace_id), usage_scope(session=session.session_id):
+            async with session.async_lock:
+                try:
+                    # aclosing - při odpojení klienta se stream k modelu hned uzavře
+                    async with aclosing(session.assistant.chat_streaming_async(user_message)) as tokens:
+                        async for token in tokens:
+                            yield _sse({'token': token})
+                    yield _sse({'status': 'success', 'session_id': session.session_id}, event='done')
+                except Exception as e:
+                    yield _sse({'error': str(e), 'status': 'error'}, event='error')
+
+    return _with_session(StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # vypnutí bufferování v reverzních proxy
+        }
+    ), session)
+
+
+@traced_endpoint("api.init")
+async def init_chat(request: Request) -> Response:
+    """Endpoint pro inicializaci chatu"""
+    try:
+        session = _get_session(request)
+
+        # Reset a nový start
+        async with session.async_lock:
+            session.assistant.reset()
+            greeting = session.assistant.start_conversation()
+
+        return _with_session(JSONResponse({
+            'greeting': greeting,
+            'session_id': session.session_id,
+            'status': 'success'
+        }), session)
+
+    except Exception as e:
+        return _error(e)
+
+
+@traced_endpoint("api.reset")
+async def reset_chat(request: Request) -> Response:
+    """Endpoint pro reset konverzace"""
+    try:
+        session = _get_session(request)
+
+        async with session.async_lock:
+            session.assistant.reset()
+            greeting = session.assistant.start_conversation()
+
+        return _with_session(JSONResponse({
+            'greeting': greeting,
+            'session_id': session.session_id,
+            'status': 'success'
+        }), session)
+
+    except Exception as e:
+        return _error(e)
+
+
+async def metrics(request: Request) -> Response:
+    """Metriky procesu ve formátu Prometheus"""
+    return Response(registry.render_prometheus(), headers={'Content-Type': PROMETHEUS_CONTENT_TYPE})
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    yield
+    # Sdílený AsyncOpenAI klient (pool spojení) všech session
+    await aclose_clients()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/chat', chat, methods=['POST']),
+        Route('/api/chat/stream', chat_stream, methods=['POST']),
+        Route('/api/init', init_chat, methods=['GET']),
+        Route('/api/reset', reset_chat, methods=['POST']),
+        Route('/metrics', metrics, methods=['GET']),
+    ],
+    middleware=[
+        # Povolit CORS pro všechny domény
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+                   expose_headers=[SESSION_HEADER, TRACE_HEADER]),
+    ],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='localhost', port=5000, backlog=4096)
@@ -1,7 +1,12 @@
+import asyncio
 import os
+import threading
 
+import httpx
 import openai
-from typing import Tuple, Literal
+from typing import Dict, Tuple, Literal, Union
+
+from usage import UsageTrackedClient, track_usage
 
 PROVIDERS = Literal['AZURE', 'OPENAI']
 
@@ -11,32 +16,149 @@ AZURE_API_KEY: str = os.getenv("AZURE_API_KEY", "")
 OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
 PROVIDER = "OPENAI"
 
+CHAT_DEPLOYMENTS = {'OPENAI': "gpt-4o", 'AZURE': "models-gpt-4o"}
+EMBEDDING_DEPLOYMENTS = {'OPENAI': "text-embedding-ada-002", 'AZURE': "models-ada-002"}
 
-def client_gpt_4o() -> Tuple[openai.AzureOpenAI, str]:
-    if PROVIDER == 'OPENAI':
-        deployment = "gpt-4o"
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# Nastavení HTTP poolu sdílených klientů
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("CLIENT_MAX_CONNECTIONS", "200")),
+    max_keepalive_connections=int(os.getenv("CLIENT_MAX_KEEPALIVE", "50")),
+    keepalive_expiry=float(os.getenv("CLIENT_KEEPALIVE_EXPIRY", "120"))
+)
+HTTP_TIMEOUT = httpx.Timeout(float(os.getenv("CLIENT_TIMEOUT", "120")), connect=10.0)
+HTTP2: bool = os.getenv("CLIENT_HTTP2", "").lower() in ("1", "true", "yes")
+
+AnyClient = Union[openai.OpenAI, openai.AzureOpenAI]
+AnyAsyncClient = Union[openai.AsyncOpenAI, openai.AsyncAzureOpenAI]
+
+# Registr klientů pro celý proces - jeden klient (jeden pool spojení, jeden
+# TLS handshake na spojení) pro chat i embeddingy daného providera.
+# Sync klienti jsou thread-safe a sdílí se napříč vlákny; async klienti jsou
+# vázaní na event loop, proto se drží zvlášť pro každý běžící loop.
+_registry_lock = threading.Lock()
+_sync_clients: Dict[str, AnyClient] = {}
+_async_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, Dict[str, AnyAsyncClient]]] = {}
+_unbound_async_clients: Dict[str, AnyAsyncClient] = {}
+
+
+def _http2_enabled() -> bool:
+    if not HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("CLIENT_HTTP2 vyžaduje balíček h2 (pip install httpx[http2]) - používá se HTTP/1.1")
+        return False
+    return True
 
-    elif PROVIDER == 'AZURE':
-        deployment = "models-gpt-4o"
-        client = openai.AzureOpenAI(base_url=API_BASE,
-                                    api_key=AZURE_API_KEY,
-                                    api_version=API_VERSION)
-    return client, deployment
 
+def _new_client(is_async: bool) -> Union[AnyClient, AnyAsyncClient]:
+    http_kwargs = dict(limits=HTTP_LIMITS, http2=_http2_enabled())
 
-def client_ada_002() -> Tuple[openai.AzureOpenAI, str]:
     if PROVIDER == 'OPENAI':
-        deployment = "text-embedding-ada-002"
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        # API_BASE přesměruje klienta jinam, např. na lokální mock (benchmarks/mock_llm_server.py)
+        base_url = API_BASE or None
+        if is_async:
+            return openai.AsyncOpenAI(api_key=OPENAI_API_KEY,
+                                      base_url=base_url,
+                                      timeout=HTTP_TIMEOUT,
+                                      http_client=openai.DefaultAsyncHttpxClient(**http_kwargs))
+        return openai.OpenAI(api_key=OPENAI_API_KEY,
+                             base_url=base_url,
+                             timeout=HTTP_TIMEOUT,
+                             http_client=openai.DefaultHttpxClient(**http_kwargs))
 
     elif PROVIDER == 'AZURE':
-        deployment = "models-ada-002"
-        client = openai.AzureOpenAI(base_url=API_BASE,
-                                    api_key=AZURE_API_KEY,
-                                    api_version=API_VERSION)
+        if is_async:
+            return openai.AsyncAzureOpenAI(base_url=API_BASE,
+                                           api_key=AZURE_API_KEY,
+                                           api_version=API_VERSION,
+                                           timeout=HTTP_TIMEOUT,
+                                           http_client=openai.DefaultAsyncHttpxClient(**http_kwargs))
+        return openai.AzureOpenAI(base_url=API_BASE,
+                                  api_key=AZURE_API_KEY,
+                                  api_version=API_VERSION,
+                                  timeout=HTTP_TIMEOUT,
+                                  http_client=openai.DefaultHttpxClient(**http_kwargs))
+
+    raise ValueError(f"Neznámý provider: {PROVIDER}")
+
+
+def get_client() -> AnyClient:
+    """Sdílený sync klient pro aktuálního providera (vytvoří se jednou za proces)"""
+    client = _sync_clients.get(PROVIDER)
+    if client is None:
+        with _registry_lock:
+            client = _sync_clients.get(PROVIDER)
+            if client is None:
+                client = _sync_clients[PROVIDER] = _new_client(is_async=False)
+    return client
+
+
+def get_async_client() -> AnyAsyncClient:
+    """
+    Sdílený async klient pro aktuálního providera a běžící event loop.
+
+    Mimo event loop (např. při importu ASGI aplikace) vrací jednoho klienta,
+    který se naváže na loop, ve kterém se poprvé použije.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    with _registry_lock:
+        if loop is None:
+            clients = _unbound_async_clients
+        else:
+            # Klienti uzavřených loopů (např. po asyncio.run) už nejdou použít
+            for key in [key for key, (other, _) in _async_clients.items() if other.is_closed()]:
+                del _async_clients[key]
+            clients = _async_clients.setdefault(id(loop), (loop, {}))[1]
+
+        client = clients.get(PROVIDER)
+        if client is None:
+            client = clients[PROVIDER] = _new_client(is_async=True)
+    return client
+
+
+def close_clients():
+    """Uzavře sdílené sync klienty (při ukončení procesu)"""
+    with _registry_lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_clients():
+    """Uzavře sdílené async klienty běžícího event loopu (např. v lifespan ASGI aplikace)"""
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        clients = list(_async_clients.pop(id(loop), (loop, {}))[1].values())
+        clients += list(_unbound_async_clients.values())
+        _unbound_async_clients.clear()
+    for client in clients:
+        await client.close()
+
+
+# Klienti pro agenty jsou obalení sledováním spotřeby tokenů (usage.py);
+# agent je výchozí label volání v ledgeru (usage_scope(agent=...) má přednost)
+
+def client_gpt_4o(agent: str = "") -> Tuple[UsageTrackedClient, str]:
+    return track_usage(get_client(), agent), CHAT_DEPLOYMENTS[PROVIDER]
+
+
+def client_ada_002(agent: str = "") -> Tuple[UsageTrackedClient, str]:
+    return track_usage(get_client(), agent), EMBEDDING_DEPLOYMENTS[PROVIDER]
+
+
+def async_client_gpt_4o(agent: str = "") -> Tuple[UsageTrackedClient, str]:
+    return track_usage(get_async_client(), agent), CHAT_DEPLOYMENTS[PROVIDER]
+
 
-    return client, deployment
+def async_client_ada_002(agent: str = "") -> Tuple[UsageTrackedClient, str]:
+    return track_usage(get_async_client(), agent), EMBEDDING_DEPLOYMENTS[PROVIDER]
 
 
 def get_api_key():
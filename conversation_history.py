@@ -0,0 +1,192 @@
+"""Historie konverzace s tokenovým rozpočtem a průběžným shrnutím"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Optional
+
+from tracing import span
+from usage import current_budget_level
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # tiktoken není povinná závislost - použije se odhad podle délky textu
+    _ENCODING = None
+
+# Režie na jednu zprávu v chat formátu (role, oddělovače)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Odhadne počet tokenů v textu"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    # Čeština má kratší tokeny než angličtina, ~3 znaky na token
+    return len(text) // 3 + 1
+
+
+def estimate_messages_tokens(messages: List[Dict[str, str]]) -> int:
+    """Odhadne počet tokenů v seznamu chat zpráv"""
+    return sum(estimate_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+class ConversationHistory:
+    """
+    Omezená historie konverzace.
+
+    - posledních max_turns výměn se posílá doslovně
+    - starší výměny se skládají do průběžného shrnutí, které se obnovuje
+      asynchronně na pozadí (nezdržuje odpověď)
+    - celková velikost (shrnutí + doslovné zprávy) se drží pod token_budget
+    - ukládají se pouze otázky a odpovědi, nikdy kontext z vyhledávání
+    """
+
+    def __init__(
+        self,
+        client,
+        deployment: str,
+        max_turns: int = 4,
+        token_budget: int = 3000,
+        summary_max_tokens: int = 300
+    ):
+        self.client = client
+        self.deployment = deployment
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+
+        self.messages: List[Dict[str, str]] = []
+        self.summary: str = ""
+        self._pending: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        self._summary_future: Optional[Future] = None
+        # Běží obnovení shrnutí - nastavuje se a ruší pod zámkem spolu s kontrolou _pending
+        self._summary_running = False
+        # Zvyšuje se při clear(), aby se neuložilo shrnutí ze staré konverzace
+        self._generation = 0
+
+    def append(self, role: str, content: str):
+        """Přidá zprávu a případně přesune nejstarší výměny do shrnutí"""
+        with self._lock:
+            self.messages.append({"role": role, "content": content})
+            evicted = self._enforce_budget()
+            if evicted:
+                self._pending.extend(evicted)
+
+        if evicted:
+            self._schedule_summary()
+
+    def get_messages(self) -> List[Dict[str, str]]:
+        """Vrátí zprávy pro API: shrnutí (pokud existuje) + poslední výměny"""
+        with self._lock:
+            messages = list(self.messages)
+            summary = self.summary
+
+        if summary:
+            return [self._summary_message(summary)] + messages
+        return messages
+
+    def token_count(self) -> int:
+        """Odhad tokenů, které historie přidá do promptu"""
+        return estimate_messages_tokens(self.get_messages())
+
+    def wait_for_summary(self, timeout: Optional[float] = None):
+        """Počká na dokončení běžícího obnovení shrnutí"""
+        future = self._summary_future
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def clear(self):
+        """Vymaže historii i shrnutí"""
+        with self._lock:
+            self.messages = []
+            self._pending = []
+            self.summary = ""
+            self._generation += 1
+
+    def _turn_count(self) -> int:
+        return sum(1 for m in self.messages if m["role"] == "user")
+
+    def _enforce_budget(self) -> List[Dict[str, str]]:
+        """Odebere nejstarší zprávy nad limit; vrací odebrané zprávy (volat pod zámkem)"""
+        evicted = []
+        summary_tokens = estimate_tokens(self.summary)
+
+        while len(self.messages) > 1 and (
+            self._turn_count() > self.max_turns
+            or summary_tokens + estimate_messages_tokens(self.messages) > self.token_budget
+        ):
+            # Odebíráme celé výměny (otázka + odpověď), aby historie nezačínala odpovědí
+            evicted.append(self.messages.pop(0))
+            while len(self.messages) > 1 and self.messages[0]["role"] != "user":
+                evicted.append(self.messages.pop(0))
+
+        return evicted
+
+    def _schedule_summary(self):
+        """Naplánuje obnovení shrnutí, pokud už neběží"""
+        if current_budget_level() == "exceeded":
+            # Rozpočet API vyčerpán (usage.py) - staré zprávy se jen zahodí, bez shrnutí
+            with self._lock:
+                self._pending = []
+            return
+        with self._lock:
+            # Běžící obnovení si nové zprávy vyzvedne samo, než skončí
+            if self._summary_running:
+                return
+            self._summary_running = True
+            # Kopie kontextu - shrnutí se započítá do session a trace, která ho vyvolala
+            self._summary_future = self._executor.submit(contextvars.copy_context().run, self._refresh_summary)
+
+    def _refresh_summary(self):
+        """Zapracuje čekající zprávy do shrnutí (běží na pozadí)"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._summary_running = False
+                    return
+                pending = self._pending
+                self._pending = []
+                previous_summary = self.summary
+                generation = self._generation
+
+            transcript = "\n".join(f"{m['role']}: {m['content']}" for m in pending)
+            prompt = f"""Aktualizuj stručné shrnutí konverzace. Zachovej fakta, závěry a otevřené otázky, které mohou být potřeba pro další dotazy.
+
+Dosavadní shrnutí:
+{previous_summary or '(zatím žádné)'}
+
+Nové zprávy:
+{transcript}
+
+Odpověz pouze novým shrnutím."""
+
+            try:
+                with span("history.summary"):
+                    response = self.client.chat.completions.create(
+                        model=self.deployment,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0.3,
+                        max_tokens=self.summary_max_tokens
+                    )
+                new_summary = response.choices[0].message.content.strip()
+            except Exception as e:
+                print(f"⚠️ Chyba při shrnutí historie: {e}")
+                # Zprávy vrátíme zpět, zkusí se to při dalším obnovení
+                with self._lock:
+                    if generation == self._generation:
+                        self._pending = pending + self._pending
+                    self._summary_running = False
+                return
+
+            with self._lock:
+                if generation == self._generation:
+                    self.summary = new_summary
+
+    @staticmethod
+    def _summary_message(summary: str) -> Dict[str, str]:
+        return {"role": "system", "content": f"Shrnutí předchozí konverzace:\n{summary}"}
@@ -1,22 +1,144 @@
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
 from akkodis_clients import client_gpt_4o
-from people_database import PeopleDatabase
+from conversation_history import estimate_messages_tokens
+from people_analytics import AggregateTable
+from people_database import PeopleCursor, PeopleDatabase
+from people_database_sqlite import SQLitePeopleDatabase
+from tracing import span
+from usage import current_budget_level, usage_scope
+import contextvars
 import json
-import re
+import os
+
+# Při dosažení rozpočtu API (usage.py) se posílá jen posledních N zpráv historie
+BUDGET_HISTORY_MESSAGES = 3
+
+# Počet osob na stránce výsledků (výpis v odpovědi, sidebar, výsledek nástroje pro model)
+RESULTS_PAGE_SIZE = 5
+
+# Výsledky vykresluje aplikace - model odpovídá jen krátkým komentářem
+MAX_RESPONSE_TOKENS = 300
+
+# Počet uchovaných výsledků osob, na které lze navázat nástrojem page
+MAX_CURSORS = 20
+
+_SEARCH_PROPERTIES = {
+    "name": {"type": "string", "description": "Jméno nebo příjmení (i jeho část)"},
+    "location": {"type": "string", "description": "Město"},
+    "position": {"type": "string", "description": "Pozice nebo její část, např. developer"},
+    "department": {"type": "string", "description": "Oddělení"},
+    "skill": {"type": "string", "description": "Dovednost, např. Python"},
+}
+_GROUP_FIELD = {"type": "string", "enum": ["department", "position", "location"]}
+
+
+def _tool(name: str, description: str, properties: Optional[Dict] = None, required: Optional[List[str]] = None) -> Dict:
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties or {}, "required": required or []},
+        },
+    }
+
+
+# JSON schémata nástrojů - operace databáze osob
+TOOLS = [
+    _tool("search_by_name", "Hledání osob podle jména nebo příjmení (podřetězec)",
+          {"name": _SEARCH_PROPERTIES["name"]}, ["name"]),
+    _tool("filter_by_department", "Osoby v oddělení (přesný název)",
+          {"department": _SEARCH_PROPERTIES["department"]}, ["department"]),
+    _tool("filter_by_position", "Osoby podle pozice (podřetězec)",
+          {"position": _SEARCH_PROPERTIES["position"]}, ["position"]),
+    _tool("filter_by_location", "Osoby v městě (přesný název)",
+          {"location": _SEARCH_PROPERTIES["location"]}, ["location"]),
+    _tool("filter_by_skill", "Osoby s dovedností (podřetězec)",
+          {"skill": _SEARCH_PROPERTIES["skill"]}, ["skill"]),
+    _tool("get_person_by_id", "Detail osoby podle ID",
+          {"person_id": {"type": "integer"}}, ["person_id"]),
+    _tool("smart_search", "Kombinace více kritérií najednou (AND, všechna jako podřetězec)", _SEARCH_PROPERTIES),
+    _tool("list_all", "Výpis všech osob (stránkovaně)"),
+    _tool("statistics", "Souhrnné statistiky databáze"),
+    _tool(
+        "aggregate",
+        "Analytické dotazy: percentily a souhrn platů, histogram věku, kohorty nástupu, "
+        "počty osob v kombinaci dvou polí. Kritéria hledání omezí, přes které osoby se počítá.",
+        {
+            "metric": {"type": "string",
+                       "enum": ["salary_percentiles", "salary_summary", "age_histogram", "hire_cohorts", "headcount"]},
+            "by": {**_GROUP_FIELD, "description": "Seskupení; u headcount řádky tabulky"},
+            "columns": {**_GROUP_FIELD, "description": "Sloupce tabulky headcount"},
+            "period": {"type": "string", "enum": ["year", "quarter", "month"], "description": "Období hire_cohorts"},
+            "bin": {"type": "integer", "description": "Šířka věkového koše v letech (age_histogram)"},
+            **_SEARCH_PROPERTIES,
+        },
+        ["metric"],
+    ),
+    _tool("page", "Jiná stránka výsledků osob (číslováno od 1)",
+          {"page": {"type": "integer"},
+           "result_id": {"type": "string",
+                         "description": "result_id výsledku, který se stránkuje (nutné, pokud bylo výsledků více)"}},
+          ["page"]),
+]
+
+# SQLite soubor s databází osob (people_database_sqlite.py); prázdné = simulovaná databáze v paměti
+PEOPLE_DB_PATH = os.getenv("PEOPLE_DB_PATH", "")
+
+
+@dataclass
+class ToolResult:
+    """Výsledek jednoho volání nástroje - každé volání v kole má vlastní výsledek"""
+    result_id: str                    # ID volání nástroje, které výsledek vytvořilo
+    function: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    results: Any = None               # PeopleCursor, AggregateTable nebo statistiky
+    error: Optional[str] = None       # proč se volání nepodařilo (neplatné parametry, ...)
+
+    @property
+    def label(self) -> str:
+        """Popis volání pro výpis (např. filter_by_skill: Python)"""
+        arguments = ", ".join(str(value) for value in self.arguments.values())
+        return f"{self.function}: {arguments}" if arguments else self.function
 
 
 class DatabaseSearchAgent:
-    """AI agent pro konverzační vyhledávání v databázi osob s chytrým parsováním"""
-
-    def __init__(self):
-        self.client, self.deployment = client_gpt_4o()
-        self.database = PeopleDatabase()
+    """AI agent pro konverzační vyhledávání v databázi osob (OpenAI tool calling, lokální vykreslení výsledků)"""
+
+    def __init__(self, database=None):
+        """
+        Args:
+            database: PeopleDatabase nebo SQLitePeopleDatabase (výchozí podle PEOPLE_DB_PATH)
+        """
+        self.client, self.deployment = client_gpt_4o("database_search")
+        if database is None:
+            # Prázdný SQLite soubor se naplní stejným počtem dummy osob jako databáze v paměti
+            database = SQLitePeopleDatabase(PEOPLE_DB_PATH, generate_if_empty=50) if PEOPLE_DB_PATH else PeopleDatabase()
+        self.database = database
         self.conversation_history: List[Dict[str, str]] = []
-        self.last_results = []
+        # Výsledky posledního kola s výsledky (jeden ToolResult na volání nástroje)
+        self.last_results: List[ToolResult] = []
+        # Výsledky osob podle result_id (pro page) a ID těch z posledního kola
+        self._cursors: "OrderedDict[str, ToolResult]" = OrderedDict()
+        self._latest_cursor_ids: List[str] = []
+        # System prompt podle verze statistik databáze - sestaví se znovu až po změně dat
+        self._system_prompt: Optional[str] = None
+        self._system_prompt_version: Optional[int] = None
 
     def get_system_prompt(self) -> str:
+        """System prompt pro search agenta (cache do změny statistik databáze)"""
+        version = self.database.statistics_version
+        if self._system_prompt is None or self._system_prompt_version != version:
+            self._system_prompt = self._build_system_prompt(self.database.get_statistics())
+            self._system_prompt_version = version
+        return self._system_prompt
+
+    def _build_system_prompt(self, stats: Dict) -> str:
         """Vytvoří system prompt pro search agenta"""
-        stats = self.database.get_statistics()
 
         prompt = f"""Jsi AI asistent pro vyhledávání v databázi zaměstnanců. Umíš interpretovat přirozené dotazy a najít správnou osobu.
 
@@ -26,64 +148,25 @@ DATABÁZE OBSAHUJE:
 - Oddělení: {', '.join(stats['departments'].keys())}
 - Lokace: {', '.join(stats['locations'].keys())}
 
-DOSTUPNÉ VYHLEDÁVACÍ FUNKCE:
-1. search_by_name|jméno - hledání podle jména/příjmení
-2. filter_by_department|oddělení - filtrování podle oddělení
-3. filter_by_position|pozice - filtrování podle pozice
-4. filter_by_location|město - filtrování podle města
-5. filter_by_skill|skill - hledání podle dovedností
-6. get_person_by_id|ID - získání detailu osoby podle ID
-7. smart_search|parametry - chytrý search s více filtry
-8. list_all - výpis všech osob
-9. statistics - statistiky databáze
-
-NOVÁ FUNKCE: smart_search
-Použij když uživatel kombinuje více kritérií:
-[FUNCTION]smart_search|name:Horák,location:Liberec[/FUNCTION]
-[FUNCTION]smart_search|name:Novák,position:architect[/FUNCTION]
-[FUNCTION]smart_search|name:Jan,department:IT,location:Praha[/FUNCTION]
-
-Možné parametry:
-- name: jméno nebo příjmení
-- location: město
-- position: pozice (nebo její část)
-- department: oddělení
-- skill: konkrétní dovednost
+K vyhledávání používej nástroje (tools). Když dotaz vyžaduje více nezávislých
+vyhledávání, zavolej více nástrojů najednou - provedou se souběžně.
 
 PRAVIDLA PRO INTERPRETACI DOTAZŮ:
-- "pan Horák z Liberce" → smart_search|name:Horák,location:Liberec
-- "architekt Novák" → smart_search|name:Novák,position:architect
-- "developeři v Praze" → smart_search|position:developer,location:Praha
-- "Jan z IT" → smart_search|name:Jan,department:IT
-- "kdo umí Python v Brně" → smart_search|skill:Python,location:Brno
-
-FORMÁT VOLÁNÍ FUNKCE:
-[FUNCTION]název_funkce|parametr[/FUNCTION]
-
-DŮLEŽITÉ - PREZENTACE VÝSLEDKŮ:
-Po zavolání funkce VŽDY zobraz výsledky přímo v odpovědi ve strukturovaném formátu.
-NEČEKEJ, že uživatel bude scrollovat do sidebaru!
-
-Pro 1 osobu:
-"Našel jsem:
-
-👤 **Jan Novák**
-📧 jan.novak@company.com
-📞 +420 123 456 789
-💼 Senior Developer
-🏢 IT | 📍 Praha
-💰 85,000 Kč | 🎯 32 let
-
-Chcete zobrazit detail nebo hledat něco dalšího?"
-
-Pro více osob (max 5):
-"Našel jsem 3 osoby:
-
-1. **Jan Novák** - Senior Developer | IT | Praha
-2. **Petr Novák** - Data Analyst | Marketing | Brno
-3. **Pavel Novák** - Team Lead | Engineering | Ostrava
-
-Pro detail konkrétní osoby zadejte např: 'Ukaž detail Jana Nováka'"
+- "pan Horák z Liberce" → smart_search(name=Horák, location=Liberec)
+- "architekt Novák" → smart_search(name=Novák, position=architect)
+- "developeři v Praze" → smart_search(position=developer, location=Praha)
+- "Jan z IT" → smart_search(name=Jan, department=IT)
+- "kdo umí Python v Brně" → smart_search(skill=Python, location=Brno)
+- "medián platu podle oddělení" → aggregate(metric=salary_percentiles, by=department)
+- "kolik lidí je v jaké pozici v Praze" → aggregate(metric=headcount, by=location, columns=position, location=Praha)
+- "porovnej Python a Java vývojáře" → dvě volání filter_by_skill najednou
+
+PREZENTACE VÝSLEDKŮ:
+Výsledky nástrojů zobrazí aplikace uživateli sama (osoby, tabulky, statistiky).
+NEOPAKUJ je - odpověz nejvýše jednou dvěma krátkými větami (např. doporučení,
+jak hledání zúžit). Výsledek nástroje obsahuje počet nalezených osob a aktuální
+stránku - podle něj odpovídej na navazující dotazy (např. detail druhé osoby).
+Další stránku vyžádej nástrojem page s result_id výsledku, který se má stránkovat.
 
 Odpovídej česky a buď přátelský!
 """
@@ -114,7 +197,17 @@ Co vás zajímá?"""
         }
 
     def chat(self, user_message: str) -> Dict:
-        """Zpracuje zprávu od uživatele a provede vyhledávání"""
+        """
+        Zpracuje zprávu od uživatele a provede vyhledávání.
+
+        Model volá nástroje (OpenAI tool calling), více volání v jednom kole se
+        provede souběžně. Výsledky se vykreslí lokálně a do historie jdou jen
+        kompaktní výsledky nástrojů - model je uvidí v dalším kole, druhé volání
+        API na přeformulování výsledků není potřeba.
+
+        "results" je seznam ToolResult (jeden na úspěšné volání), None bez výsledků.
+        Nepovedená volání se uživateli vypíšou jako chyba, model dostane její důvod.
+        """
         # Přidání zprávy do historie
         self.conversation_history.append({
             "role": "user",
@@ -124,49 +217,95 @@ Co vás zajímá?"""
         # Vytvoření promptu
         system_prompt = self.get_system_prompt()
 
-        # Zavolání API
-        messages = [{"role": "system", "content": system_prompt}] + self.conversation_history
-
-        response = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1000
-        )
-
-        assistant_message = response.choices[0].message.content
-
-        # Zpracování funkcí
-        results, function_called = self._process_functions(assistant_message)
-
-        # Odstranění function tagů z zobrazované zprávy
-        display_message = re.sub(r'\[FUNCTION\].*?\[/FUNCTION\]', '', assistant_message).strip()
-
-        # Pokud agent nezobrazil výsledky sám, přidáme je my
-        if results is not None and not self._has_formatted_results(display_message):
-            display_message = self._format_results_inline(display_message, results, function_called)
-
-        # Uložení odpovědi do historie
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": assistant_message
-        })
+        # Zavolání API (při docházejícím rozpočtu jen konec historie)
+        history = self.conversation_history
+        if current_budget_level() != "ok":
+            history = self._history_tail(history, BUDGET_HISTORY_MESSAGES)
+        messages = [{"role": "system", "content": system_prompt}] + history
+
+        with usage_scope(history_tokens=estimate_messages_tokens(history[:-1])):
+            response = self.client.chat.completions.create(
+                model=self.deployment,
+                messages=messages,
+                tools=TOOLS,
+                temperature=0.3,
+                max_tokens=MAX_RESPONSE_TOKENS
+            )
+
+        message = response.choices[0].message
+        display_message = (message.content or "").strip()
+        tool_calls = message.tool_calls or []
+
+        # Uložení odpovědi do historie (včetně volání nástrojů, na která musí navázat jejich výsledky)
+        assistant_entry: Dict[str, Any] = {"role": "assistant", "content": message.content}
+        if tool_calls:
+            assistant_entry["tool_calls"] = [
+                {"id": call.id, "type": "function",
+                 "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                for call in tool_calls
+            ]
+        self.conversation_history.append(assistant_entry)
+
+        results: List[ToolResult] = []
+        errors: List[ToolResult] = []
+        for call, result in zip(tool_calls, self._run_tool_calls(tool_calls)):
+            self.conversation_history.append({
+                "role": "tool",
+                "tool_call_id": call.id,
+                "content": self._tool_result(result)
+            })
+            if result.error is not None:
+                errors.append(result)
+            # Dvě volání page nad stejným výsledkem - zobrazí se jednou
+            elif all(result is not known for known in results):
+                results.append(result)
+
+        for failed in errors:
+            display_message += f"\n\n❌ {failed.label} - nepodařilo se provést: {failed.error}"
+        for result in results:
+            if len(results) > 1:
+                display_message += f"\n\n🔎 **{result.label}**"
+            display_message = self._format_results_inline(display_message, result.results, result.function)
+
+        if results:
+            self.last_results = results
+            self._remember_cursors(results)
 
         return {
-            "message": display_message,
-            "results": results,
-            "function_called": function_called
+            "message": display_message.strip(),
+            "results": results or None,
+            "function_called": [result.function for result in results] or None,
+            "tool_calls": [call.function.name for call in tool_calls]
         }
 
-    def _has_formatted_results(self, message: str) -> bool:
-        """Zkontroluje, zda zpráva už obsahuje naformátované výsledky"""
-        # Hledáme indikátory že agent už výsledky zobrazil
-        indicators = ["👤", "📧", "📞", "💼", "**"]
-        return any(indicator in message for indicator in indicators)
+    def _remember_cursors(self, results: List[ToolResult]):
+        """Zaregistruje nové výsledky osob pro page (nejstarší nad MAX_CURSORS se zapomenou)"""
+        new_ids = [result.result_id for result in results
+                   if isinstance(result.results, PeopleCursor) and result.result_id not in self._cursors]
+        for result in results:
+            if isinstance(result.results, PeopleCursor):
+                self._cursors[result.result_id] = result
+                self._cursors.move_to_end(result.result_id)
+        while len(self._cursors) > MAX_CURSORS:
+            self._cursors.popitem(last=False)
+        if new_ids:
+            self._latest_cursor_ids = new_ids
+
+    @staticmethod
+    def _history_tail(history: List[Dict], count: int) -> List[Dict]:
+        """Konec historie - bez osiřelých výsledků nástrojů na začátku (API je odmítne)"""
+        tail = history[-count:]
+        while tail and tail[0]["role"] == "tool":
+            tail = tail[1:]
+        return tail
 
     def _format_results_inline(self, message: str, results, function_called: str) -> str:
         """Naformátuje výsledky přímo do odpovědi"""
 
+        if isinstance(results, AggregateTable):
+            scope = f" ({', '.join(f'{k}: {v}' for k, v in results.filters.items())})" if results.filters else ""
+            return f"{message}\n\n📊 **{results.title}**{scope} - {results.people:,} osob\n\n{results.to_markdown()}"
+
         if function_called == "statistics":
             stats = results
             formatted = f"""\n\n📊 **Statistiky databáze:**
@@ -183,13 +322,15 @@ Co vás zajímá?"""
 
             return message + formatted
 
-        if isinstance(results, list):
-            if len(results) == 0:
+        if isinstance(results, PeopleCursor):
+            if results.total == 0:
                 return f"{message}\n\n❌ Nebyly nalezeny žádné výsledky."
 
+            page = results.page()
+
             # Formátování 1 osoby - plný detail
-            if len(results) == 1:
-                person = results[0]
+            if results.total == 1:
+                person = page[0]
                 formatted = f"""\n\nNašel jsem:
 
 👤 **{person['full_name']}**
@@ -207,70 +348,105 @@ Chcete zobrazit někoho dalšího nebo hledat něco jiného?"""
                 return message + formatted
 
             # Formátování více osob - kompaktní seznam
-            elif len(results) <= 5:
-                formatted = f"\n\nNašel jsem {len(results)} osob:\n\n"
+            elif results.page_count == 1:
+                formatted = f"\n\nNašel jsem {results.total} osob:\n\n"
 
-                for i, person in enumerate(results, 1):
+                for i, person in enumerate(page, 1):
                     formatted += f"{i}. **{person['full_name']}** - {person['position']} | {person['department']} | {person['location']}\n"
 
                 formatted += "\nPro detail konkrétní osoby zadejte např: 'Ukaž detail [jméno]'"
 
                 return message + formatted
 
-            # Více než 5 osob
+            # Více stránek - jen aktuální stránka
             else:
-                formatted = f"\n\nNašel jsem {len(results)} osob. Tady je prvních 5:\n\n"
+                first = results.current * results.page_size
+                formatted = (f"\n\nNašel jsem {results.total} osob. "
+                             f"Stránka {results.current + 1}/{results.page_count}:\n\n")
 
-                for i, person in enumerate(results[:5], 1):
+                for i, person in enumerate(page, first + 1):
                     formatted += f"{i}. **{person['full_name']}** - {person['position']} | {person['department']} | {person['location']}\n"
 
-                formatted += f"\n... a dalších {len(results) - 5} osob.\n"
-                formatted += "\nZkuste zúžit hledání (např. přidat město nebo oddělení)"
+                remaining = results.total - first - len(page)
+                if remaining > 0:
+                    formatted += f"\n... a dalších {remaining} osob.\n"
+                formatted += "\nZkuste zúžit hledání (např. přidat město nebo oddělení) nebo si řekněte o další stránku"
 
                 return message + formatted
 
         return message
 
-    def _process_functions(self, message: str) -> tuple:
-        """Zpracuje volání funkcí v odpovědi"""
-        pattern = r'\[FUNCTION\](.*?)\|(.*?)\[/FUNCTION\]'
-        matches = re.findall(pattern, message, re.IGNORECASE)
-
-        if not matches:
-            return None, None
-
-        # Zpracujeme první funkci
-        function_name, parameter = matches[0]
-        function_name = function_name.strip()
-        parameter = parameter.strip()
-
+    def _run_tool_calls(self, tool_calls) -> List:
+        """Provede volání nástrojů (více najednou souběžně), výsledky v pořadí volání"""
+        if not tool_calls:
+            return []
+        if len(tool_calls) == 1:
+            return [self._execute_tool(tool_calls[0])]
+        with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
+            # Kopie kontextu - spany a usage_scope se přenesou do vláken
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._execute_tool, call)
+                for call in tool_calls
+            ]
+            return [future.result() for future in futures]
+
+    def _execute_tool(self, call) -> ToolResult:
+        """Jedno volání nástroje; neplatné argumenty vrací ToolResult s error (model i uživatel ho uvidí)"""
+        name = call.function.name
+        arguments: Dict[str, Any] = {}
+        with span("db.tool", tool=name) as tool_span:
+            try:
+                try:
+                    arguments = json.loads(call.function.arguments or "{}")
+                except ValueError:
+                    raise ValueError("neplatné argumenty (JSON)")
+                if name == "page":
+                    return self._page(self._int(arguments, "page"), arguments.get("result_id"))
+                results = self._execute(name, arguments)
+                if results is None:
+                    raise ValueError(f"neznámý nástroj {name}")
+                return ToolResult(call.id, name, arguments, results)
+            except KeyError as e:
+                error = f"chybí parametr {e.args[0]}"
+            except (ValueError, TypeError) as e:
+                error = str(e)
+            print(f"⚠️ Nástroj {name} selhal: {error}")
+            tool_span.set("error", error)
+            return ToolResult(call.id, name, arguments if isinstance(arguments, dict) else {}, error=error)
+
+    @staticmethod
+    def _int(arguments: Dict[str, Any], key: str) -> int:
+        """Celočíselný parametr nástroje"""
+        try:
+            return int(arguments[key])
+        except (TypeError, ValueError):
+            raise ValueError(f"parametr {key} musí být celé číslo, ne {arguments[key]!r}")
+
+    def _execute(self, function_name: str, arguments: Dict[str, Any]):
+        """Provede operaci databáze podle jména nástroje (kromě page)"""
         results = None
 
         if function_name == "search_by_name":
-            results = self.database.search_by_name(parameter)
+            results = self.database.search_by_name(arguments["name"])
 
         elif function_name == "filter_by_department":
-            results = self.database.filter_by_department(parameter)
+            results = self.database.filter_by_department(arguments["department"])
 
         elif function_name == "filter_by_position":
-            results = self.database.filter_by_position(parameter)
+            results = self.database.filter_by_position(arguments["position"])
 
         elif function_name == "filter_by_location":
-            results = self.database.filter_by_location(parameter)
+            results = self.database.filter_by_location(arguments["location"])
 
         elif function_name == "filter_by_skill":
-            results = self.database.filter_by_skill(parameter)
+            results = self.database.filter_by_skill(arguments["skill"])
 
         elif function_name == "get_person_by_id":
-            try:
-                person_id = int(parameter)
-                person = self.database.get_person_by_id(person_id)
-                results = [person] if person else []
-            except:
-                results = []
+            person = self.database.get_person_by_id(self._int(arguments, "person_id"))
+            results = [person] if person else []
 
         elif function_name == "smart_search":
-            results = self._smart_search(parameter)
+            results = self._smart_search(arguments)
 
         elif function_name == "list_all":
             results = self.database.get_all_people()
@@ -278,56 +454,95 @@ Chcete zobrazit někoho dalšího nebo hledat něco jiného?"""
         elif function_name == "statistics":
             results = self.database.get_statistics()
 
-        self.last_results = results
-        return results, function_name
-
-    def _smart_search(self, parameters: str) -> List[Dict]:
-        """Chytrý search s více filtry"""
-        # Parse parametrů: "name:Horák,location:Liberec"
-        filters = {}
-        for param in parameters.split(','):
-            if ':' in param:
-                key, value = param.split(':', 1)
-                filters[key.strip().lower()] = value.strip()
-
-        # Začneme se všemi lidmi
-        results = self.database.get_all_people()
-
-        # Postupně aplikujeme filtry
-        if 'name' in filters:
-            name_filter = filters['name'].lower()
-            results = [p for p in results if
-                      name_filter in p['first_name'].lower() or
-                      name_filter in p['last_name'].lower() or
-                      name_filter in p['full_name'].lower()]
-
-        if 'location' in filters:
-            location_filter = filters['location'].lower()
-            results = [p for p in results if
-                      location_filter in p['location'].lower()]
-
-        if 'position' in filters:
-            position_filter = filters['position'].lower()
-            results = [p for p in results if
-                      position_filter in p['position'].lower()]
-
-        if 'department' in filters:
-            dept_filter = filters['department'].lower()
-            results = [p for p in results if
-                      dept_filter in p['department'].lower()]
-
-        if 'skill' in filters:
-            skill_filter = filters['skill'].lower()
-            results = [p for p in results if
-                      any(skill_filter in s.lower() for s in p['skills'])]
+        elif function_name == "aggregate":
+            results = self._aggregate(arguments)
+
+        # Seznamy osob jako stránkovaný kurzor - dál se materializuje jen zobrazená stránka
+        if isinstance(results, Sequence) and not isinstance(results, PeopleCursor):
+            results = PeopleCursor(results, RESULTS_PAGE_SIZE)
+        return results
+
+    def _smart_search(self, arguments: Dict[str, Any]) -> Sequence:
+        """Chytrý search s více filtry (vrací línou sekvenci osob - PeopleView nebo SQLitePeopleView)"""
+        filters = {key: str(value) for key, value in arguments.items()
+                   if key in self.database.SEARCH_FIELDS and value}
+
+        # Plánovač: nejselektivnější filtr první, průnik bitmap, osoby až pro zobrazenou stránku
+        with span("db.search") as search_span:
+            plan = self.database.plan(filters)
+            search_span.set("plan", [f"{p.field}~{p.value} (~{p.estimate})" for p in plan])
+            results = self.database.execute(plan)
+            search_span.set("results", len(results))
 
         return results
 
-    def get_last_results(self):
-        """Vrátí poslední výsledky vyhledávání"""
+    def _aggregate(self, arguments: Dict[str, Any]) -> AggregateTable:
+        """Analytický dotaz nad sloupci databáze (people_analytics); filtry jako u smart_search"""
+        filters = {key: str(value) for key, value in arguments.items()
+                   if key in self.database.SEARCH_FIELDS and value}
+
+        with span("db.aggregate", metric=arguments.get("metric")) as aggregate_span:
+            table = self.database.analytics(filters).aggregate(
+                str(arguments.get("metric", "")).lower(),
+                by=arguments.get("by") or None,
+                columns=arguments.get("columns") or None,
+                period=arguments.get("period") or None,
+                bin_width=self._int(arguments, "bin") if arguments.get("bin") else None
+            )
+            aggregate_span.set("people", table.people)
+        return table
+
+    def _page(self, number: int, result_id: Optional[str] = None) -> ToolResult:
+        """
+        Posune kurzor výsledku osob na stránku (číslováno od 1) a vrátí tento výsledek.
+
+        Bez result_id jen pokud poslední kolo vrátilo jediný výsledek osob.
+        """
+        if result_id is None:
+            if not self._latest_cursor_ids:
+                raise ValueError("Žádné předchozí výsledky osob ke stránkování")
+            if len(self._latest_cursor_ids) > 1:
+                raise ValueError(f"Výsledků osob je více - uveď result_id ({', '.join(self._latest_cursor_ids)})")
+            result_id = self._latest_cursor_ids[0]
+        result = self._cursors.get(str(result_id))
+        if result is None:
+            raise ValueError(f"Neznámý result_id '{result_id}'")
+        result.results.seek(number - 1)
+        return result
+
+    @staticmethod
+    def _tool_result(result: ToolResult) -> str:
+        """Kompaktní výsledek nástroje pro model (JSON) - počet a zobrazená stránka, ne celé záznamy"""
+        results = result.results
+        if result.error is not None:
+            payload: Dict[str, Any] = {"error": f"Nástroj se nepodařilo provést: {result.error}"}
+        elif isinstance(results, AggregateTable):
+            payload = {"title": results.title, "people": results.people, "columns": results.columns,
+                       "rows": results.rows[:RESULTS_PAGE_SIZE], "total_rows": len(results.rows)}
+        elif isinstance(results, PeopleCursor):
+            payload = {
+                "result_id": result.result_id,
+                "count": results.total,
+                "page": results.current + 1,
+                "pages": results.page_count,
+                "people": [
+                    {"id": p["id"], "name": p["full_name"], "position": p["position"],
+                     "department": p["department"], "location": p["location"]}
+                    for p in results.page()
+                ],
+            }
+        else:
+            payload = dict(results)   # statistiky - sdílený slovník databáze se nemění
+        payload["rendered"] = "Výsledek se uživateli zobrazuje v aplikaci - neopakuj ho."
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+    def get_last_results(self) -> List[ToolResult]:
+        """Vrátí výsledky posledního kola s výsledky (jeden na volání nástroje)"""
         return self.last_results
 
     def reset(self):
         """Resetuje agenta"""
         self.conversation_history = []
         self.last_results = []
+        self._cursors = OrderedDict()
+        self._latest_cursor_ids = []
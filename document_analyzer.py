@@ -1,26 +1,46 @@
+import contextvars
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
 from chatbot import ContextualChatbot
 
 
-class DocumentAnalyzer:
-    """Pokročilé analytické funkce pro demonstraci schopností agenta"""
+# Jeden společný map krok pro všechny analýzy - výsledek se cachuje per dávka
+# chunků a znovu použije pro každou další analýzu
+MAP_PROMPT = """Projdi následující část dokumentu a vypiš stručné poznámky v této struktuře:
 
-    def __init__(self, chatbot: ContextualChatbot):
-        self.chatbot = chatbot
+KLÍČOVÉ BODY: hlavní informace a závěry
+ENTITY: osoby (jména, role), organizace a instituce, místa, data a časové údaje, čísla a statistiky
+TÉMATA: probíraná témata
+KVALITA: postřehy ke struktuře, úplnosti, jasnosti a konzistenci
 
-    def auto_generate_summary(self) -> str:
-        """Automatické shrnutí dokumentu"""
-        prompt = """Vytvořte komplexní shrnutí celého dokumentu. Zahrňte:
+Vycházej pouze z textu. Pokud některá kategorie v textu není, napiš "—".
+
+## Část dokumentu:
+{text}"""
+
+MERGE_PROMPT = """Slouč následující dílčí poznámky z různých částí jednoho dokumentu do jedněch poznámek.
+Zaměř se na: {focus}
+Odstraň duplicity, zachovej všechny podstatné a konkrétní údaje.
+
+{notes}"""
+
+ANALYSES: Dict[str, Dict[str, str]] = {
+    "summary": {
+        "focus": "klíčové body, závěry a celkový kontext dokumentu",
+        "prompt": """Vytvořte komplexní shrnutí celého dokumentu. Zahrňte:
 1. Hlavní téma dokumentu
 2. Klíčové body a závěry
 3. Důležité informace
 4. Celkový kontext
 
 Odpověď strukturujte přehledně."""
-        return self.chatbot.ask(prompt)["answer"]
-
-    def extract_key_entities(self) -> str:
-        """Extrakce klíčových entit"""
-        prompt = """Analyzujte dokument a vypište všechny důležité entity:
+    },
+    "entities": {
+        "focus": "entity - osoby, organizace, místa, data a čísla",
+        "prompt": """Analyzujte dokument a vypište všechny důležité entity:
 - Osoby (jména, role)
 - Organizace a instituce
 - Místa a lokace
@@ -28,19 +48,195 @@ Odpověď strukturujte přehledně."""
 - Čísla a statistiky
 
 Seřaďte je podle kategorií."""
-        return self.chatbot.ask(prompt)["answer"]
+    },
+    "themes": {
+        "focus": "hlavní probíraná témata",
+        "prompt": """Jaká jsou hlavní témata probíraná v tomto dokumentu?
+Uveďte 3-5 hlavních témat s krátkým vysvětlením každého."""
+    },
+    "quality": {
+        "focus": "kvalita dokumentu - struktura, úplnost, jasnost a konzistence",
+        "prompt": """Zhodnoťte tento dokument z hlediska:
+1. Struktury a organizace
+2. Úplnosti informací
+3. Jasnosti a srozumitelnosti
+4. Konzistence obsahu"""
+    },
+}
+
+
+class DocumentAnalyzer:
+    """
+    Pokročilé analytické funkce pro demonstraci schopností agenta.
+
+    Analýzy pokrývají celý dokument (map-reduce), ne jen top-k chunky:
+    - map: poznámky ke každé dávce chunků, paralelně a s cache
+    - reduce: hierarchické slučování poznámek po skupinách
+    Analýzy nevolají chatbot.ask, takže neplní historii konverzace.
+    """
+
+    def __init__(
+        self,
+        chatbot: ContextualChatbot,
+        batch_chars: int = 8000,
+        reduce_fan_in: int = 6,
+        max_workers: int = 8
+    ):
+        """
+        Args:
+            chatbot: chatbot s načteným dokumentem (používá se jeho klient a chunky)
+            batch_chars: maximální délka jedné map dávky ve znacích
+            reduce_fan_in: kolik dílčích výsledků se slučuje v jednom reduce kroku
+            max_workers: počet souběžných LLM volání
+        """
+        self.chatbot = chatbot
+        self.batch_chars = batch_chars
+        self.reduce_fan_in = reduce_fan_in
+        self.max_workers = max_workers
+
+        self._map_cache: Dict[str, str] = {}
+        self._cache_lock = threading.Lock()
+
+    # ---------- Veřejné API ----------
+
+    def auto_generate_summary(self) -> str:
+        """Automatické shrnutí dokumentu"""
+        return self.run_analysis("summary")
+
+    def extract_key_entities(self) -> str:
+        """Extrakce klíčových entit"""
+        return self.run_analysis("entities")
 
     def identify_themes(self) -> str:
         """Identifikace hlavních témat"""
-        prompt = """Jaká jsou hlavní témata probíraná v tomto dokumentu? 
-Uveďte 3-5 hlavních témat s krátkým vysvětlením každého."""
-        return self.chatbot.ask(prompt)["answer"]
+        return self.run_analysis("themes")
 
     def answer_quality_check(self) -> str:
         """Kontrola kvality informací v dokumentu"""
-        prompt = """Zhodnoťte tento dokument z hlediska:
-1. Struktury a organizace
-2. Úplnosti informací
-3. Jasnosti a srozumitelnosti
-4. Konzistence obsahu"""
-        return self.chatbot.ask(prompt)["answer"]
+        return self.run_analysis("quality")
+
+    def run_analysis(self, analysis: str) -> str:
+        """Spustí jednu analýzu nad celým dokumentem"""
+        return self.run_all_analyses([analysis])[analysis]
+
+    def run_all_analyses(self, analyses: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Spustí více analýz souběžně.
+
+        Map krok je společný - každá dávka se zpracuje jednou a výsledek
+        sdílí všechny analýzy (i ty spuštěné později).
+        """
+        analyses = analyses or list(ANALYSES.keys())
+        unknown = [a for a in analyses if a not in ANALYSES]
+        if unknown:
+            raise ValueError(f"Neznámé analýzy: {', '.join(unknown)}")
+
+        # Oddělené pooly: vlákna analýz čekají na reduce kroky v LLM poolu (bez deadlocku)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as llm_executor, \
+                ThreadPoolExecutor(max_workers=len(analyses)) as analysis_executor:
+            notes = self._map_in_context(llm_executor, self._map_batch, self._batches())
+
+            # Kopie kontextu - LLM volání se započítají do trace a usage_scope volajícího
+            futures = {
+                analysis: analysis_executor.submit(
+                    contextvars.copy_context().run, self._reduce, analysis, notes, llm_executor
+                )
+                for analysis in analyses
+            }
+            return {analysis: future.result() for analysis, future in futures.items()}
+
+    @staticmethod
+    def _map_in_context(executor: ThreadPoolExecutor, fn: Callable, items: List) -> List:
+        """executor.map, každá úloha v kopii kontextu volajícího (spany, usage_scope)"""
+        futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def clear_cache(self):
+        """Vymaže cache map výsledků (např. po načtení jiného dokumentu)"""
+        with self._cache_lock:
+            self._map_cache.clear()
+
+    # ---------- Map ----------
+
+    def _chunk_texts(self) -> Tuple[List[str], str]:
+        """
+        Texty všech chunků (DocumentProcessor vrací stringy, LawDocumentProcessor dicty)
+        a oddělovač pro jejich spojení.
+
+        Chunky DocumentProcessor se překrývají (chunk_overlap) - opakovaný začátek
+        se vynechá, navazující části se spojí bez oddělovače.
+        """
+        processor = self.chatbot.doc_processor
+        overlap = getattr(processor, "chunk_overlap", 0)
+        texts = [
+            chunk.get("text", "") if isinstance(chunk, dict) else chunk
+            for chunk in processor.chunks
+        ]
+        if not overlap:
+            return texts, "\n\n"
+        return [text if i == 0 else text[overlap:] for i, text in enumerate(texts)], ""
+
+    def _batches(self) -> List[str]:
+        """Seskupí chunky do dávek do velikosti batch_chars"""
+        texts, separator = self._chunk_texts()
+        batches = []
+        current: List[str] = []
+        current_len = 0
+
+        for text in texts:
+            if current and current_len + len(text) > self.batch_chars:
+                batches.append(separator.join(current))
+                current, current_len = [], 0
+            current.append(text)
+            current_len += len(text)
+
+        if current:
+            batches.append(separator.join(current))
+        return batches
+
+    def _map_batch(self, batch: str) -> str:
+        key = hashlib.sha1(batch.encode("utf-8")).hexdigest()
+        with self._cache_lock:
+            cached = self._map_cache.get(key)
+        if cached is not None:
+            return cached
+
+        notes = self._complete(MAP_PROMPT.format(text=batch), max_tokens=600)
+
+        with self._cache_lock:
+            self._map_cache[key] = notes
+        return notes
+
+    # ---------- Reduce ----------
+
+    def _reduce(self, analysis: str, notes: List[str], executor: ThreadPoolExecutor) -> str:
+        """Hierarchicky slučuje poznámky po skupinách, nakonec vytvoří výslednou odpověď"""
+        if not notes:
+            return "Dokument neobsahuje žádný text k analýze."
+
+        focus = ANALYSES[analysis]["focus"]
+        level = notes
+        while len(level) > self.reduce_fan_in:
+            groups = [level[i:i + self.reduce_fan_in] for i in range(0, len(level), self.reduce_fan_in)]
+            level = self._map_in_context(executor, lambda group: self._merge(group, focus), groups)
+
+        joined = "\n\n---\n\n".join(level)
+        final_prompt = f"""{ANALYSES[analysis]["prompt"]}
+
+Vycházej z těchto poznámek, které pokrývají celý dokument:
+
+{joined}"""
+        return self._complete(final_prompt, max_tokens=1000)
+
+    def _merge(self, group: List[str], focus: str) -> str:
+        notes = "\n\n---\n\n".join(group)
+        return self._complete(MERGE_PROMPT.format(focus=focus, notes=notes), max_tokens=800)
+
+    def _complete(self, prompt: str, max_tokens: int) -> str:
+        response = self.chatbot.client.chat.completions.create(
+            model=self.chatbot.deployment,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
@@ -1,15 +1,23 @@
+import asyncio
 import numpy as np
 from docx import Document
 import faiss
 from typing import List, Tuple, Dict, Optional
-from akkodis_clients import client_gpt_4o, client_ada_002
+from akkodis_clients import client_gpt_4o, client_ada_002, async_client_ada_002
+from metrics_registry import track_index_memory
+from tracing import span
+
+# Maximální počet vstupů v jednom volání embeddings API
+EMBEDDING_BATCH_SIZE = 2048
 
 
 class DocumentProcessor:
     def __init__(self):
         # Načtení embeddings clienta z akkodis_clients
-        self.embed_client, self.embed_deployment = client_ada_002()
+        self.embed_client, self.embed_deployment = client_ada_002("document_processor")
         self.chunks = []
+        # Překryv sousedních chunků ve znacích (analýzy celého dokumentu ho při spojování vynechají)
+        self.chunk_overlap = 0
         self.index = None
         self.embeddings_array = None
 
@@ -38,49 +46,165 @@ class DocumentProcessor:
 
     def get_embedding(self, text: str) -> List[float]:
         """Získá embedding pro text pomocí OpenAI API"""
-        response = self.embed_client.embeddings.create(
-            model=self.embed_deployment,
-            input=text
-        )
+        with span("embedding", texts=1):
+            response = self.embed_client.embeddings.create(
+                model=self.embed_deployment,
+                input=text
+            )
+        return response.data[0].embedding
+
+    async def get_embedding_async(self, text: str) -> List[float]:
+        """Asynchronní varianta get_embedding (AsyncOpenAI)"""
+        # Sdílený klient z registru - vázaný na aktuální event loop
+        async_embed_client, _ = async_client_ada_002("document_processor")
+        with span("embedding", texts=1):
+            response = await async_embed_client.embeddings.create(
+                model=self.embed_deployment,
+                input=text
+            )
         return response.data[0].embedding
 
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Získá embeddingy pro více textů najednou (jedno API volání na dávku)"""
+        embeddings = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+            with span("embedding", texts=len(batch)):
+                response = self.embed_client.embeddings.create(
+                    model=self.embed_deployment,
+                    input=batch
+                )
+            # API nemusí garantovat pořadí, řadíme podle indexu
+            embeddings.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        return embeddings
+
     def create_faiss_index(self, text: str):
         """Vytvoří FAISS index z textu"""
         # Rozdělení textu na chunks
-        self.chunks = self.split_text(text)
+        self.chunk_overlap = 200
+        self.chunks = self.split_text(text, overlap=self.chunk_overlap)
 
         # Vytvoření embeddingů pro každý chunk
         embeddings = []
         print(f"Zpracovávám {len(self.chunks)} chunks...")
-        for i, chunk in enumerate(self.chunks):
-            embedding = self.get_embedding(chunk)
-            embeddings.append(embedding)
-            if (i + 1) % 10 == 0:
-                print(f"Zpracováno {i + 1}/{len(self.chunks)} chunks")
-
-        # Převod na numpy array
-        embeddings_array = np.array(embeddings).astype('float32')
-        self.embeddings_array = embeddings_array  # Uložení pro vizualizaci
-
-        # Vytvoření FAISS indexu
-        dimension = embeddings_array.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings_array)
+        with span("index.build", chunks=len(self.chunks)):
+            for i, chunk in enumerate(self.chunks):
+                embedding = self.get_embedding(chunk)
+                embeddings.append(embedding)
+                if (i + 1) % 10 == 0:
+                    print(f"Zpracováno {i + 1}/{len(self.chunks)} chunks")
+
+            # Převod na numpy array
+            embeddings_array = np.array(embeddings).astype('float32')
+            self.embeddings_array = embeddings_array  # Uložení pro vizualizaci
+
+            # Vytvoření FAISS indexu
+            dimension = embeddings_array.shape[1]
+            self.index = faiss.IndexFlatL2(dimension)
+            self.index.add(embeddings_array)
+        track_index_memory(self)
 
         print(f"FAISS index vytvořen s {self.index.ntotal} vektory")
 
-    def search_relevant_chunks(self, query: str, k: int = 3) -> Tuple[List[str], List[float]]:
-        """Vyhledá k nejrelevantnějších chunks pro dotaz včetně vzdáleností"""
-        # Získání embeddingu pro dotaz
-        query_embedding = np.array([self.get_embedding(query)]).astype('float32')
-
-        # Vyhledání nejbližších chunks
-        distances, indices = self.index.search(query_embedding, k)
+    def search_relevant_chunks(
+        self,
+        query: str,
+        k: int = 3,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[str], List[float]]:
+        """
+        Vyhledá k nejrelevantnějších chunks pro dotaz včetně vzdáleností.
+
+        query_embedding: již spočítaný embedding dotazu (jinak se získá z API)
+        Bez načteného dokumentu vrací prázdný výsledek.
+        """
+        if self.index is None:
+            return [], []
+
+        with span("search", k=k):
+            # Získání embeddingu pro dotaz
+            if query_embedding is None:
+                query_embedding = self.get_embedding(query)
+            query_embedding = np.array([query_embedding]).astype('float32')
+
+            # Vyhledání nejbližších chunks
+            with span("faiss.search", vectors=self.index.ntotal):
+                distances, indices = self.index.search(query_embedding, k)
 
         # Vrácení relevantních chunks a jejich vzdáleností
         relevant_chunks = [self.chunks[idx] for idx in indices[0]]
         return relevant_chunks, distances[0].tolist()
 
+    async def search_relevant_chunks_async(
+        self,
+        query: str,
+        k: int = 3,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[str], List[float]]:
+        """Asynchronní varianta search_relevant_chunks - embedding neblokuje event loop"""
+        if self.index is None:
+            return [], []
+
+        with span("search", k=k):
+            if query_embedding is None:
+                query_embedding = await self.get_embedding_async(query)
+            query_embedding = np.array([query_embedding]).astype('float32')
+
+            # FAISS search je CPU-bound, pustíme ho mimo event loop
+            with span("faiss.search", vectors=self.index.ntotal):
+                distances, indices = await asyncio.to_thread(self.index.search, query_embedding, k)
+
+        relevant_chunks = [self.chunks[idx] for idx in indices[0]]
+        return relevant_chunks, distances[0].tolist()
+
+    def search_relevant_chunks_batch(
+        self,
+        queries: List[str],
+        k: int = 3,
+        thresholds: Optional[List[Optional[float]]] = None
+    ) -> List[Tuple[List[str], List[float]]]:
+        """
+        Vyhledá k nejrelevantnějších chunks pro více dotazů najednou.
+
+        Všechny dotazy se embedují jedním API voláním a prohledají jedním
+        index.search nad maticí dotazů.
+
+        Args:
+            queries: seznam dotazů
+            k: počet výsledků na dotaz
+            thresholds: volitelná maximální vzdálenost pro každý dotaz (None = bez limitu)
+
+        Returns:
+            Pro každý dotaz dvojice (chunks, vzdálenosti) ve stejném pořadí jako queries;
+            bez načteného dokumentu prázdné dvojice
+        """
+        if not queries:
+            return []
+        if thresholds is not None and len(thresholds) != len(queries):
+            raise ValueError("Počet thresholds musí odpovídat počtu dotazů")
+        if self.index is None:
+            return [([], []) for _ in queries]
+
+        with span("search", k=k, queries=len(queries)):
+            query_matrix = np.array(self.get_embeddings(queries)).astype('float32')
+            with span("faiss.search", vectors=self.index.ntotal, queries=len(queries)):
+                distances, indices = self.index.search(query_matrix, min(k, len(self.chunks)))
+
+        results = []
+        for row, (row_distances, row_indices) in enumerate(zip(distances, indices)):
+            threshold = thresholds[row] if thresholds is not None else None
+            chunks, chunk_distances = [], []
+            for distance, idx in zip(row_distances, row_indices):
+                if idx < 0:
+                    continue
+                if threshold is not None and distance > threshold:
+                    break
+                chunks.append(self.chunks[idx])
+                chunk_distances.append(float(distance))
+            results.append((chunks, chunk_distances))
+
+        return results
+
     def compare_retrieval_strategies(self, query: str) -> Dict:
         """Porovná různé retrieval strategie"""
         results = {}
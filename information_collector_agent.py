@@ -1,39 +1,29 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
 from akkodis_clients import client_gpt_4o
+from conversation_history import estimate_messages_tokens
+from usage import usage_scope
 import json
 import re
 
 
-class InformationCollectorAgent:
-    """Aktivní konverzační agent pro sběr informací"""
-
-    def __init__(self, required_fields: Dict[str, str]):
-        """
-        Args:
-            required_fields: Dictionary s poli, které agent má získat
-                           {"pole_nazev": "Popis pole pro agenta"}
-        """
-        self.client, self.deployment = client_gpt_4o()
-        self.required_fields = required_fields
-        self.collected_data: Dict[str, Optional[str]] = {field: None for field in required_fields.keys()}
-        self.conversation_history: List[Dict[str, str]] = []
-        self.conversation_started = False
-
-    def get_system_prompt(self) -> str:
-        """Vytvoří system prompt pro aktivního agenta"""
-        missing_fields = [field for field, value in self.collected_data.items() if value is None]
-        completed_fields = [field for field, value in self.collected_data.items() if value is not None]
+@lru_cache(maxsize=32)
+def _build_static_prompt(fields: Tuple[Tuple[str, str], ...]) -> str:
+    """
+    Sestaví statickou část system promptu pro danou konfiguraci polí.
 
-        prompt = f"""Jsi proaktivní a přátelský AI asistent, který vede konverzaci a postupně získává tyto informace od uživatele:
+    Neobsahuje nic proměnlivého (stav sběru je v samostatné zprávě),
+    takže je pro stejnou konfiguraci byte-identická a provider ji může cachovat.
+    """
+    prompt = """Jsi proaktivní a přátelský AI asistent, který vede konverzaci a postupně získává tyto informace od uživatele:
 
 POŽADOVANÁ POLE A JEJICH VÝZNAM:
 """
-        for field, description in self.required_fields.items():
-            status = "✓ ZÍSKÁNO" if self.collected_data[field] else "☐ POTŘEBUJI"
-            current_value = f" (aktuální hodnota: {self.collected_data[field]})" if self.collected_data[field] else ""
-            prompt += f"- {field}: {description} [{status}]{current_value}\n"
+    for field, description in fields:
+        prompt += f"- {field}: {description}\n"
 
-        prompt += f"""
+    prompt += """
+Aktuální stav sběru (získaná a chybějící pole) dostaneš v samostatné zprávě na konci konverzace.
 
 TVOJE ÚKOLY:
 1. Buď aktivní - sám veď konverzaci směrem k získání všech potřebných informací
@@ -44,11 +34,6 @@ TVOJE ÚKOLY:
 6. Buď příjemný, ale efektivní - netlač, ale veď konverzaci
 7. Na začátku konverzace se představ a řekni, co potřebuješ získat
 
-AKTUÁLNÍ STAV:
-Počet získaných polí: {len(completed_fields)}/{len(self.required_fields)}
-Získaná pole: {', '.join(completed_fields) if completed_fields else 'žádná'}
-Chybějící pole: {', '.join(missing_fields) if missing_fields else 'žádná'}
-
 PRAVIDLO EXTRAKCE:
 Když získáš informaci, VŽDY ji označ takto:
 [EXTRACT]nazev_pole: hodnota[/EXTRACT]
@@ -61,6 +46,49 @@ Ty: "Dobrý den! Pomohu vám vyplnit zákaznickou kartu. Začněme prosím - jak
 
 Uživatel: "Jan Novák"
 Ty: "[EXTRACT]jmeno: Jan Novák[/EXTRACT] Skvělé, děkuji pane Nováku! Můžete mi prosím poskytnout váš email?"
+"""
+    return prompt
+
+
+class InformationCollectorAgent:
+    """Aktivní konverzační agent pro sběr informací"""
+
+    def __init__(self, required_fields: Dict[str, str]):
+        """
+        Args:
+            required_fields: Dictionary s poli, které agent má získat
+                           {"pole_nazev": "Popis pole pro agenta"}
+        """
+        self.client, self.deployment = client_gpt_4o("information_collector")
+        self.required_fields = required_fields
+        self.collected_data: Dict[str, Optional[str]] = {field: None for field in required_fields.keys()}
+        self.conversation_history: List[Dict[str, str]] = []
+        self.conversation_started = False
+
+    def get_system_prompt(self) -> str:
+        """Vrátí statický system prompt (memoizovaný podle konfigurace polí)"""
+        return _build_static_prompt(tuple(self.required_fields.items()))
+
+    def get_state_prompt(self) -> str:
+        """
+        Vytvoří proměnlivou část promptu s aktuálním stavem sběru.
+
+        Posílá se až za historií, aby statický prefix zůstal byte-identický.
+        """
+        missing_fields = [field for field, value in self.collected_data.items() if value is None]
+        completed_fields = [field for field, value in self.collected_data.items() if value is not None]
+
+        prompt = "STAV POLÍ:\n"
+        for field in self.required_fields:
+            status = "✓ ZÍSKÁNO" if self.collected_data[field] else "☐ POTŘEBUJI"
+            current_value = f" (aktuální hodnota: {self.collected_data[field]})" if self.collected_data[field] else ""
+            prompt += f"- {field}: [{status}]{current_value}\n"
+
+        prompt += f"""
+AKTUÁLNÍ STAV:
+Počet získaných polí: {len(completed_fields)}/{len(self.required_fields)}
+Získaná pole: {', '.join(completed_fields) if completed_fields else 'žádná'}
+Chybějící pole: {', '.join(missing_fields) if missing_fields else 'žádná'}
 
 TVOJE STRATEGIE:
 {'- Představ se a vysvětli, co potřebuješ' if not self.conversation_started else ''}
@@ -69,17 +97,20 @@ TVOJE STRATEGIE:
 
         return prompt
 
+    def _build_messages(self) -> List[Dict[str, str]]:
+        """Statický prefix + historie + aktuální stav"""
+        return (
+            [{"role": "system", "content": self.get_system_prompt()}]
+            + self.conversation_history
+            + [{"role": "system", "content": self.get_state_prompt()}]
+        )
+
     def start_conversation(self) -> Dict:
         """Zahájí konverzaci - agent se sám představí"""
         self.conversation_started = True
 
-        system_prompt = self.get_system_prompt()
-
         # Agent začíná konverzaci
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": "Ahoj"}
-        ]
+        messages = self._build_messages() + [{"role": "user", "content": "Ahoj"}]
 
         response = self.client.chat.completions.create(
             model=self.deployment,
@@ -114,18 +145,16 @@ TVOJE STRATEGIE:
             "content": user_message
         })
 
-        # Vytvoření promptu
-        system_prompt = self.get_system_prompt()
+        # Zavolání API (statický prefix + historie + stav)
+        messages = self._build_messages()
 
-        # Zavolání API
-        messages = [{"role": "system", "content": system_prompt}] + self.conversation_history
-
-        response = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=400
-        )
+        with usage_scope(history_tokens=estimate_messages_tokens(self.conversation_history[:-1])):
+            response = self.client.chat.completions.create(
+                model=self.deployment,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=400
+            )
 
         assistant_message = response.choices[0].message.content
 
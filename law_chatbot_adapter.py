@@ -6,7 +6,7 @@ Problém: LawDocumentProcessor vrací dict chunky, Chatbot očekává string chu
 Řešení: Wrapper, který poskytuje kompatibilní API.
 """
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from law_document_processor import LawDocumentProcessor
 
 
@@ -32,6 +32,12 @@ class LawChatbotAdapter:
     def get_embedding(self, text: str):
         return self.processor.get_embedding(text)
 
+    async def get_embedding_async(self, text: str):
+        return await self.processor.get_embedding_async(text)
+
+    def get_embeddings(self, texts: List[str]):
+        return self.processor.get_embeddings(texts)
+
     def create_faiss_index(self, *args, **kwargs):
         return self.processor.create_faiss_index(*args, **kwargs)
 
@@ -63,7 +69,8 @@ class LawChatbotAdapter:
         self,
         query: str,
         k: int = 5,
-        filter_by_article: str = None
+        filter_by_article: str = None,
+        query_embedding=None
     ) -> Tuple[List[str], List[float]]:
         """
         Wrapper, který vrací string chunky místo dict chunků.
@@ -75,7 +82,8 @@ class LawChatbotAdapter:
         dict_chunks, distances = self.processor.search_relevant_chunks(
             query=query,
             k=k,
-            filter_by_article=filter_by_article
+            filter_by_article=filter_by_article,
+            query_embedding=query_embedding
         )
 
         # Konverze dict -> string
@@ -86,3 +94,44 @@ class LawChatbotAdapter:
             string_chunks.append(text)
 
         return string_chunks, distances
+
+    async def search_relevant_chunks_async(
+        self,
+        query: str,
+        k: int = 5,
+        filter_by_article: str = None,
+        query_embedding=None
+    ) -> Tuple[List[str], List[float]]:
+        """Asynchronní varianta search_relevant_chunks se stringovými chunky."""
+        dict_chunks, distances = await self.processor.search_relevant_chunks_async(
+            query=query,
+            k=k,
+            filter_by_article=filter_by_article,
+            query_embedding=query_embedding
+        )
+        return [chunk_dict.get("text", "") for chunk_dict in dict_chunks], distances
+
+    def search_relevant_chunks_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filters_by_article: Optional[List[Optional[str]]] = None,
+        thresholds: Optional[List[Optional[float]]] = None
+    ) -> List[Tuple[List[str], List[float]]]:
+        """
+        Dávková varianta search_relevant_chunks se stringovými chunky.
+
+        Returns:
+            Pro každý dotaz tuple (List[str], List[float])
+        """
+        batch_results = self.processor.search_relevant_chunks_batch(
+            queries=queries,
+            k=k,
+            filters_by_article=filters_by_article,
+            thresholds=thresholds
+        )
+
+        return [
+            ([chunk_dict.get("text", "") for chunk_dict in dict_chunks], distances)
+            for dict_chunks, distances in batch_results
+        ]
@@ -8,14 +8,20 @@ místo jednoduchého dělení po X znacích.
 Verze: 1.0 - Strukturovaný chunking podle paragrafů, odstavců a bodů
 """
 
+import asyncio
 import numpy as np
 from typing import List, Tuple, Dict, Optional
 import faiss
 import json
 from pathlib import Path
 
-from akkodis_clients import client_gpt_4o, client_ada_002
+from akkodis_clients import client_gpt_4o, client_ada_002, async_client_ada_002
 from seach_law_json import LawJsonCrawler, NodePath
+from metrics_registry import track_index_memory
+from tracing import span
+
+# Maximální počet vstupů v jednom volání embeddings API
+EMBEDDING_BATCH_SIZE = 2048
 
 
 class LawDocumentProcessor:
@@ -31,7 +37,7 @@ class LawDocumentProcessor:
 
     def __init__(self):
         # Načtení embeddings clienta
-        self.embed_client, self.embed_deployment = client_ada_002()
+        self.embed_client, self.embed_deployment = client_ada_002("law_document_processor")
         self.chunks: List[Dict[str, any]] = []  # Strukturované chunky s metadaty
         self.index: Optional[faiss.Index] = None
         self.embeddings_array: Optional[np.ndarray] = None
@@ -169,10 +175,11 @@ class LawDocumentProcessor:
     def get_embedding(self, text: str) -> np.ndarray:
         """Získá embedding pro text pomocí Azure OpenAI."""
         try:
-            response = self.embed_client.embeddings.create(
-                input=text,
-                model=self.embed_deployment
-            )
+            with span("embedding", texts=1):
+                response = self.embed_client.embeddings.create(
+                    input=text,
+                    model=self.embed_deployment
+                )
             embedding = response.data[0].embedding
             return np.array(embedding, dtype=np.float32)
         except Exception as e:
@@ -180,6 +187,45 @@ class LawDocumentProcessor:
             # Fallback: náhodný vektor
             return np.random.randn(1536).astype(np.float32)
 
+    async def get_embedding_async(self, text: str) -> np.ndarray:
+        """Asynchronní varianta get_embedding (AsyncOpenAI)."""
+        # Sdílený klient z registru - vázaný na aktuální event loop
+        async_embed_client, _ = async_client_ada_002("law_document_processor")
+        try:
+            with span("embedding", texts=1):
+                response = await async_embed_client.embeddings.create(
+                    input=text,
+                    model=self.embed_deployment
+                )
+            return np.array(response.data[0].embedding, dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️ Chyba při vytváření embeddingu: {e}")
+            # Fallback: náhodný vektor
+            return np.random.randn(1536).astype(np.float32)
+
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Získá embeddingy pro více textů (jedno API volání na dávku).
+
+        Returns:
+            Matice tvaru (len(texts), dimenze)
+        """
+        rows = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+            try:
+                with span("embedding", texts=len(batch)):
+                    response = self.embed_client.embeddings.create(
+                        input=batch,
+                        model=self.embed_deployment
+                    )
+                rows.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+            except Exception as e:
+                print(f"⚠️ Chyba při vytváření embeddingů: {e}")
+                # Fallback: náhodné vektory
+                rows.extend(np.random.randn(len(batch), 1536))
+        return np.array(rows, dtype=np.float32)
+
     def create_faiss_index(
         self,
         chunk_strategy: str = "mixed",
@@ -205,19 +251,21 @@ class LawDocumentProcessor:
         print("🧠 Vytváření embeddings...")
         embeddings = []
 
-        for i, chunk in enumerate(self.chunks):
-            if i % 10 == 0:
-                print(f"  Progress: {i}/{len(self.chunks)}")
+        with span("index.build", chunks=len(self.chunks)):
+            for i, chunk in enumerate(self.chunks):
+                if i % 10 == 0:
+                    print(f"  Progress: {i}/{len(self.chunks)}")
 
-            embedding = self.get_embedding(chunk["text"])
-            embeddings.append(embedding)
+                embedding = self.get_embedding(chunk["text"])
+                embeddings.append(embedding)
 
-        # Vytvoření FAISS indexu
-        self.embeddings_array = np.array(embeddings, dtype=np.float32)
-        dimension = self.embeddings_array.shape[1]
+            # Vytvoření FAISS indexu
+            self.embeddings_array = np.array(embeddings, dtype=np.float32)
+            dimension = self.embeddings_array.shape[1]
 
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(self.embeddings_array)
+            self.index = faiss.IndexFlatL2(dimension)
+            self.index.add(self.embeddings_array)
+        track_index_memory(self)
 
         print(f"✅ FAISS index vytvořen: {len(self.chunks)} chunků, dimenze {dimension}")
 
@@ -225,7 +273,8 @@ class LawDocumentProcessor:
         self,
         query: str,
         k: int = 5,
-        filter_by_article: Optional[str] = None
+        filter_by_article: Optional[str] = None,
+        query_embedding: Optional[np.ndarray] = None
     ) -> Tuple[List[Dict[str, any]], List[float]]:
         """
         Vyhledá nejrelevantnější chunky pro dotaz.
@@ -234,6 +283,7 @@ class LawDocumentProcessor:
             query: vyhledávací dotaz
             k: počet výsledků
             filter_by_article: filtrovat pouze chunky z daného paragrafu (např. "§ 11")
+            query_embedding: již spočítaný embedding dotazu (jinak se získá z API)
 
         Returns:
             (seznam chunků s metadaty, vzdálenosti)
@@ -241,21 +291,110 @@ class LawDocumentProcessor:
         if self.index is None:
             raise ValueError("FAISS index není inicializován. Zavolejte create_faiss_index().")
 
-        # Získání embeddingu pro dotaz
-        query_embedding = self.get_embedding(query)
-        query_embedding = query_embedding.reshape(1, -1)
+        with span("search", k=k, filtered=filter_by_article is not None):
+            # Získání embeddingu pro dotaz
+            if query_embedding is None:
+                query_embedding = self.get_embedding(query)
+            query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+
+            # Vyhledání v FAISS
+            with span("faiss.search", vectors=self.index.ntotal):
+                distances, indices = self.index.search(query_embedding, min(k * 3, len(self.chunks)))
 
-        # Vyhledání v FAISS
-        distances, indices = self.index.search(query_embedding, min(k * 3, len(self.chunks)))
+            return self._select_results(distances[0], indices[0], k, filter_by_article)
 
-        # Aplikace filtru
+    async def search_relevant_chunks_async(
+        self,
+        query: str,
+        k: int = 5,
+        filter_by_article: Optional[str] = None,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> Tuple[List[Dict[str, any]], List[float]]:
+        """
+        Asynchronní varianta search_relevant_chunks.
+
+        Embedding se čeká bez blokování event loopu, FAISS search běží ve vlákně.
+        """
+        if self.index is None:
+            raise ValueError("FAISS index není inicializován. Zavolejte create_faiss_index().")
+
+        with span("search", k=k, filtered=filter_by_article is not None):
+            if query_embedding is None:
+                query_embedding = await self.get_embedding_async(query)
+            query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+            with span("faiss.search", vectors=self.index.ntotal):
+                distances, indices = await asyncio.to_thread(
+                    self.index.search, query_embedding, min(k * 3, len(self.chunks))
+                )
+
+            return self._select_results(distances[0], indices[0], k, filter_by_article)
+
+    def search_relevant_chunks_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filters_by_article: Optional[List[Optional[str]]] = None,
+        thresholds: Optional[List[Optional[float]]] = None
+    ) -> List[Tuple[List[Dict[str, any]], List[float]]]:
+        """
+        Vyhledá nejrelevantnější chunky pro více dotazů najednou.
+
+        Všechny dotazy se embedují jedním API voláním a prohledají jedním
+        index.search nad maticí dotazů.
+
+        Args:
+            queries: vyhledávací dotazy
+            k: počet výsledků na dotaz
+            filters_by_article: volitelný filtr paragrafu pro každý dotaz (None = bez filtru)
+            thresholds: volitelná maximální vzdálenost pro každý dotaz (None = bez limitu)
+
+        Returns:
+            Pro každý dotaz dvojice (chunky s metadaty, vzdálenosti) ve stejném pořadí jako queries
+        """
+        if self.index is None:
+            raise ValueError("FAISS index není inicializován. Zavolejte create_faiss_index().")
+        if not queries:
+            return []
+        for name, values in (("filters_by_article", filters_by_article), ("thresholds", thresholds)):
+            if values is not None and len(values) != len(queries):
+                raise ValueError(f"Počet {name} musí odpovídat počtu dotazů")
+
+        with span("search", k=k, queries=len(queries)):
+            query_matrix = self.get_embeddings(queries)
+            with span("faiss.search", vectors=self.index.ntotal, queries=len(queries)):
+                distances, indices = self.index.search(query_matrix, min(k * 3, len(self.chunks)))
+
+        return [
+            self._select_results(
+                distances[row],
+                indices[row],
+                k,
+                filters_by_article[row] if filters_by_article else None,
+                thresholds[row] if thresholds else None
+            )
+            for row in range(len(queries))
+        ]
+
+    def _select_results(
+        self,
+        distances: np.ndarray,
+        indices: np.ndarray,
+        k: int,
+        filter_by_article: Optional[str] = None,
+        threshold: Optional[float] = None
+    ) -> Tuple[List[Dict[str, any]], List[float]]:
+        """Aplikuje filtr a threshold na jeden řádek výsledků z FAISS."""
         results = []
         result_distances = []
 
-        for distance, idx in zip(distances[0], indices[0]):
-            if idx >= len(self.chunks):
+        for distance, idx in zip(distances, indices):
+            if idx < 0 or idx >= len(self.chunks):
                 continue
 
+            # Vzdálenosti jsou seřazené, další výsledky už threshold nesplní
+            if threshold is not None and distance > threshold:
+                break
+
             chunk = self.chunks[idx]
 
             # Filtrování podle článku
@@ -11,13 +11,17 @@ import tempfile
 from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 import re
+import time
+
+from tracing import isolated_generator, span
+from usage import usage_scope
 
 # Import existujících modulů
 try:
     from parse_law import parse_doc_to_structure
     from seach_law_json import LawJsonCrawler
     from law_chatbot_adapter import LawChatbotAdapter  # ZMĚNA: používáme adapter!
-    from chatbot import ContextualChatbot
+    from chatbot import ContextualChatbot, LAW_SYSTEM_PROMPT
 except ImportError as e:
     print(f"⚠️ Warning: Some modules not found: {e}")
 
@@ -264,20 +268,13 @@ class LawExpertAgent:
             return {"answer": "❌ Agent není inicializován.", "sources": [], "method": "error"}
 
         self.conversation_history.append({"role": "user", "content": question})
-        query_type = self._classify_query(question)
-
-        if query_type == "list_paragraphs":
-            result = self._handle_list_paragraphs()
-        elif query_type == "paragraph_ref":
-            result = self._handle_paragraph_reference(question)
-        elif query_type == "paragraph_stats":
-            result = self._handle_paragraph_statistics()
-        elif query_type == "chunk_stats":
-            result = self._handle_chunk_statistics()
-        elif query_type == "structural":
-            result = self._handle_structural_query(question)
-        else:
-            result = self._handle_semantic_query(question)
+
+        with span("law_agent.ask") as ask_span, usage_scope(agent="law_expert"):
+            result = self._route_structural(question)
+            if result is None:
+                result = self._handle_semantic_query(question)
+            ask_span.set("method", result.get("method", "unknown"))
+            result["trace_id"] = ask_span.trace_id
 
         self.conversation_history.append({
             "role": "assistant",
@@ -286,6 +283,85 @@ class LawExpertAgent:
         })
         return result
 
+    @isolated_generator
+    def ask_streaming(self, question: str):
+        """
+        Streamovaná varianta ask.
+
+        Strukturální odpovědi (seznamy, paragrafy, statistiky) se vrátí najednou,
+        sémantická RAG cesta streamuje tokeny z chatbota.
+
+        Yields:
+            str části odpovědi; jako poslední dict s metadaty
+            ("metadata": True, "method", "sources", "ttft", "response_time", ...)
+        """
+        start_time = time.time()
+
+        if not self.crawler or not self.chatbot:
+            yield "❌ Agent není inicializován."
+            yield {"metadata": True, "method": "error", "sources": [],
+                   "ttft": time.time() - start_time, "response_time": time.time() - start_time}
+            return
+
+        self.conversation_history.append({"role": "user", "content": question})
+
+        with span("law_agent.ask", stream=True) as ask_span, usage_scope(agent="law_expert"):
+            result = self._route_structural(question)
+            if result is not None:
+                answer = result["answer"]
+                yield answer
+                elapsed = time.time() - start_time
+                metadata = {key: value for key, value in result.items() if key != "answer"}
+                metadata.update({"metadata": True, "ttft": elapsed, "response_time": elapsed})
+            else:
+                answer = ""
+                ttft = None
+                metadata = {}
+                for item in self.chatbot.ask_streaming(question, system_prompt=LAW_SYSTEM_PROMPT):
+                    if isinstance(item, dict):
+                        metadata = item
+                        continue
+                    if ttft is None:
+                        ttft = time.time() - start_time
+                        ask_span.mark("ttft")
+                    answer += item
+                    yield item
+
+                elapsed = time.time() - start_time
+                metadata.update({
+                    "metadata": True,
+                    "method": "semantic_rag",
+                    "ttft": ttft if ttft is not None else elapsed,
+                    "response_time": elapsed
+                })
+            ask_span.set("method", metadata.get("method", "unknown"))
+            metadata["trace_id"] = ask_span.trace_id
+
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": answer,
+            "method": metadata.get("method", "unknown")
+        })
+        yield metadata
+
+    def _route_structural(self, question: str) -> Optional[Dict[str, Any]]:
+        """Odpověď pro strukturální dotazy; None znamená sémantickou cestu."""
+        with span("law_agent.route") as route_span:
+            query_type = self._classify_query(question)
+            route_span.set("query_type", query_type)
+
+            if query_type == "list_paragraphs":
+                return self._handle_list_paragraphs()
+            elif query_type == "paragraph_ref":
+                return self._handle_paragraph_reference(question)
+            elif query_type == "paragraph_stats":
+                return self._handle_paragraph_statistics()
+            elif query_type == "chunk_stats":
+                return self._handle_chunk_statistics()
+            elif query_type == "structural":
+                return self._handle_structural_query(question)
+            return None
+
     def _classify_query(self, question: str) -> str:
         q_lower = question.lower()
         if any(kw in q_lower for kw in ["statistiky chunků", "přehled chunků"]):
@@ -337,10 +413,10 @@ class LawExpertAgent:
                 answer += f"- {article}: {count}\n"
         return {"answer": answer, "sources": [], "method": "structural_stats", "stats": stats}
 
-    def _handle_paragraph_reference(self, question: str) -> Dict[str, Any]:
+    def _handle_paragraph_reference(self, question: str) -> Optional[Dict[str, Any]]:
         match = re.search(r"§\s*(\d+[a-z]?)", question, re.IGNORECASE)
         if not match:
-            return self._handle_semantic_query(question)
+            return None
         para_num = match.group(1)
         details = self.find_paragraph_by_number(para_num)
         if "error" in details:
@@ -353,14 +429,14 @@ class LawExpertAgent:
             answer += f"**Text:**\n{full_text[:1000]}..." if len(full_text) > 1000 else f"**Text:**\n{full_text}"
         return {"answer": answer, "sources": [full_text] if full_text else [], "method": "paragraph_reference"}
 
-    def _handle_structural_query(self, question: str) -> Dict[str, Any]:
+    def _handle_structural_query(self, question: str) -> Optional[Dict[str, Any]]:
         para_match = re.search(r"§\s*(\d+[a-z]?)", question, re.IGNORECASE)
         article = f"§ {para_match.group(1)}" if para_match else None
         if article:
             text = self.search_by_structure(article=article)
             if text:
                 return {"answer": f"📜 **{article}**\n\n{text}", "sources": [text], "method": "structural"}
-        return self._handle_semantic_query(question)
+        return None
 
     def _handle_semantic_query(self, question: str) -> Dict[str, Any]:
         result = self.search_by_semantic(question, top_k=5)
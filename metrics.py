@@ -1,41 +1,257 @@
+import math
+import threading
 import time
-from typing import Dict, List
-import statistics
+from collections import Counter, OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
 
+import tracing
 
-class PerformanceMetrics:
-    """Tracking výkonu a kvality odpovědí"""
+
+class LogHistogram:
+    """
+    Histogram s logaritmickými koši (ve stylu HDR histogramu).
+
+    Paměť je omezená počtem košů (rozsah min_value..max_value), záznam je O(1)
+    a percentily mají relativní chybu nejvýše `precision`.
+    Koše se drží řídce (dict), prázdné koše nezabírají místo.
+    """
+
+    def __init__(self, min_value: float = 1e-5, max_value: float = 1e4, precision: float = 0.02):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.precision = precision
+        # Koš i >= 1 pokrývá (min_value * r^(i-1), min_value * r^i]; střed koše má chybu <= precision
+        self._log_ratio = math.log1p(2 * precision)
+        self._max_index = math.ceil(math.log(max_value / min_value) / self._log_ratio)
+        self._buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(math.ceil(math.log(value / self.min_value) / self._log_ratio), self._max_index)
+
+    def _bucket_value(self, index: int) -> float:
+        if index == 0:
+            return self.min_value
+        return self.min_value * math.exp((index - 0.5) * self._log_ratio)
+
+    def record(self, value: float):
+        index = self._index(value)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LogHistogram"):
+        """Přičte jiný histogram se stejným rozsahem a přesností"""
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """q-tý percentil (0-100) - hodnota reprezentující koš, ve kterém leží"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def _empty_copy(self) -> "LogHistogram":
+        return LogHistogram(self.min_value, self.max_value, self.precision)
+
+
+class _MetricsSnapshot:
+    """Agregované metriky jednoho časového úseku (nebo celé doby běhu)"""
 
     def __init__(self):
-        self.query_times: List[float] = []
-        self.confidence_scores: List[str] = []
-        self.chunk_usage: List[int] = []
-        self.agent_types: List[str] = []
-
-    def track_query(self, duration: float, confidence: str, chunks_used: int, agent_type: str = "general"):
-        """Zaznamenání metriky"""
-        self.query_times.append(duration)
-        self.confidence_scores.append(confidence)
-        self.chunk_usage.append(chunks_used)
-        self.agent_types.append(agent_type)
-
-    def get_stats(self) -> Dict:
-        """Získání statistik"""
-        if not self.query_times:
-            return {}
+        self.response_time = LogHistogram()
+        self.ttft = LogHistogram()
+        self.by_agent_type: Dict[str, LogHistogram] = {}
+        self.by_stage: Dict[str, LogHistogram] = {}
+        self.confidence: Counter = Counter()
+        self.chunks_total = 0
+        self.prompt_tokens_total = 0
+        self.prompt_tokens_count = 0
+        self.last_prompt_tokens: Optional[int] = None
+
+    def merge(self, other: "_MetricsSnapshot"):
+        self.response_time.merge(other.response_time)
+        self.ttft.merge(other.ttft)
+        for target, source in ((self.by_agent_type, other.by_agent_type), (self.by_stage, other.by_stage)):
+            for name, histogram in source.items():
+                target.setdefault(name, histogram._empty_copy()).merge(histogram)
+        self.confidence.update(other.confidence)
+        self.chunks_total += other.chunks_total
+        self.prompt_tokens_total += other.prompt_tokens_total
+        self.prompt_tokens_count += other.prompt_tokens_count
+        if other.last_prompt_tokens is not None:
+            self.last_prompt_tokens = other.last_prompt_tokens
+
+
+class _TraceStages:
+    """
+    Doby dokončených spanů po trace - plní je span listener při dokončení spanu,
+    track_query si vyzvedne jen spany svého dotazu. Drží posledních max_traces trace.
+    """
+
+    def __init__(self, max_traces: int = 1000):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[Tuple[str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, finished: "tracing.Span"):
+        with self._lock:
+            stages = self._traces.get(finished.trace_id)
+            if stages is None:
+                stages = self._traces[finished.trace_id] = []
+                if len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            stages.append((finished.name, finished.duration))
+
+    def pop(self, trace_id: str) -> List[Tuple[str, float]]:
+        with self._lock:
+            return self._traces.pop(trace_id, [])
+
 
+_trace_stages = _TraceStages()
+
+
+class PerformanceMetrics:
+    """
+    Tracking výkonu a kvality odpovědí.
+
+    Místo seznamů všech hodnot drží histogramy s pevnou pamětí - celkové
+    a po časových slotech (slot_seconds) pro okenní pohledy, např. posledních
+    5 minut: get_stats(window_seconds=300).
+    """
+
+    def __init__(self, window_seconds: float = 300, slot_seconds: float = 10):
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self._lifetime = _MetricsSnapshot()
+        self._slots: deque = deque(maxlen=max(1, math.ceil(window_seconds / slot_seconds)))
+        tracing.add_span_listener(_trace_stages)
+
+    def _current_slot(self, now: float) -> _MetricsSnapshot:
+        slot_id = int(now // self.slot_seconds)
+        if not self._slots or self._slots[-1][0] != slot_id:
+            self._slots.append((slot_id, _MetricsSnapshot()))
+        return self._slots[-1][1]
+
+    def track_query(self, duration: float, confidence: str, chunks_used: int, agent_type: str = "general",
+                    prompt_tokens: Optional[int] = None, ttft: Optional[float] = None,
+                    trace_id: Optional[str] = None):
+        """
+        Zaznamenání metriky.
+
+        Args:
+            trace_id: ID trace dotazu (tracing.py) - doby jeho spanů se započítají po fázích
+        """
+        for snapshot in (self._lifetime, self._current_slot(time.time())):
+            snapshot.response_time.record(duration)
+            snapshot.by_agent_type.setdefault(agent_type, LogHistogram()).record(duration)
+            snapshot.confidence[confidence] += 1
+            snapshot.chunks_total += chunks_used
+            if prompt_tokens is not None:
+                snapshot.prompt_tokens_total += prompt_tokens
+                snapshot.prompt_tokens_count += 1
+                snapshot.last_prompt_tokens = prompt_tokens
+            if ttft is not None:
+                snapshot.ttft.record(ttft)
+
+        if trace_id:
+            for stage, stage_duration in _trace_stages.pop(trace_id):
+                self.track_stage(stage, stage_duration)
+
+    def track_stage(self, stage: str, duration: float):
+        """Zaznamenání doby jedné fáze dotazu (embedding, search, llm.completion, ...)"""
+        for snapshot in (self._lifetime, self._current_slot(time.time())):
+            snapshot.by_stage.setdefault(stage, LogHistogram()).record(duration)
+
+    def _window(self, window_seconds: float) -> _MetricsSnapshot:
+        oldest_slot = int((time.time() - window_seconds) // self.slot_seconds)
+        merged = _MetricsSnapshot()
+        for slot_id, snapshot in self._slots:
+            if slot_id >= oldest_slot:
+                merged.merge(snapshot)
+        return merged
+
+    @staticmethod
+    def _percentiles(histogram: LogHistogram, fmt: str = "{:.2f}s") -> Dict[str, str]:
         return {
-            "total_queries": len(self.query_times),
-            "avg_response_time": f"{statistics.mean(self.query_times):.2f}s",
-            "min_response_time": f"{min(self.query_times):.2f}s",
-            "max_response_time": f"{max(self.query_times):.2f}s",
-            "avg_chunks_used": f"{statistics.mean(self.chunk_usage):.1f}",
-            "high_confidence_rate": f"{(self.confidence_scores.count('Vysoká') / len(self.confidence_scores) * 100):.1f}%"
+            "count": histogram.count,
+            "p50": fmt.format(histogram.percentile(50)),
+            "p90": fmt.format(histogram.percentile(90)),
+            "p99": fmt.format(histogram.percentile(99)),
+        }
+
+    def get_stats(self, window_seconds: Optional[float] = None) -> Dict:
+        """
+        Získání statistik.
+
+        Args:
+            window_seconds: jen posledních N sekund (nejvýše window_seconds z konstruktoru);
+                None = celá doba běhu
+        """
+        snapshot = self._lifetime if window_seconds is None else self._window(window_seconds)
+        queries = snapshot.response_time.count
+        if not queries:
+            return {}
+
+        stats = {
+            "total_queries": queries,
+            "avg_response_time": f"{snapshot.response_time.mean:.2f}s",
+            "min_response_time": f"{snapshot.response_time.min:.2f}s",
+            "max_response_time": f"{snapshot.response_time.max:.2f}s",
+            "p50_response_time": f"{snapshot.response_time.percentile(50):.2f}s",
+            "p90_response_time": f"{snapshot.response_time.percentile(90):.2f}s",
+            "p99_response_time": f"{snapshot.response_time.percentile(99):.2f}s",
+            "avg_chunks_used": f"{snapshot.chunks_total / queries:.1f}",
+            "high_confidence_rate": f"{(snapshot.confidence['Vysoká'] / queries * 100):.1f}%",
+            "confidence_counts": dict(snapshot.confidence),
+            "by_agent_type": {
+                agent_type: self._percentiles(histogram)
+                for agent_type, histogram in snapshot.by_agent_type.items()
+            }
         }
 
+        if snapshot.prompt_tokens_count:
+            stats["avg_prompt_tokens"] = f"{snapshot.prompt_tokens_total / snapshot.prompt_tokens_count:.0f}"
+            stats["last_prompt_tokens"] = snapshot.last_prompt_tokens
+
+        if snapshot.ttft.count:
+            stats["avg_time_to_first_token"] = f"{snapshot.ttft.mean:.2f}s"
+            stats["max_time_to_first_token"] = f"{snapshot.ttft.max:.2f}s"
+            stats["p50_time_to_first_token"] = f"{snapshot.ttft.percentile(50):.2f}s"
+            stats["p99_time_to_first_token"] = f"{snapshot.ttft.percentile(99):.2f}s"
+
+        if snapshot.by_stage:
+            stats["stages"] = {
+                stage: self._percentiles(histogram, fmt="{:.3f}s")
+                for stage, histogram in sorted(snapshot.by_stage.items())
+            }
+
+        return stats
+
     def reset(self):
         """Reset všech metrik"""
-        self.query_times.clear()
-        self.confidence_scores.clear()
-        self.chunk_usage.clear()
-        self.agent_types.clear()
+        self._lifetime = _MetricsSnapshot()
+        self._slots.clear()
@@ -0,0 +1,385 @@
+"""
+Procesní registr metrik (čítače, gauge, histogramy) s exportem ve formátu Prometheus.
+
+Zápis je bez zámků: každé vlákno zapisuje do vlastní buňky hodnot a teprve
+čtení (scrape) buňky sečte. Zámek se bere jen při prvním zápisu vlákna
+a při vytvoření nové kombinace labelů.
+
+Doby fází pipeline a volání embeddingů se berou z dokončených spanů (tracing.py),
+tokeny a náklady z ledgeru spotřeby (usage.py), explicitně se měří jen to,
+co span nemá (cache, session, paměť indexu).
+
+    from metrics_registry import registry
+    print(registry.render_prometheus())
+"""
+import bisect
+import math
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import tracing
+
+# Výchozí koše histogramů latence (sekundy)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _ThreadCells:
+    """
+    Hodnoty rozdělené po vláknech - vlákno zapisuje jen do své buňky.
+
+    Buňky skončených vláken (werkzeug vytváří vlákno na každý požadavek)
+    se průběžně přičítají do společného součtu, aby počet buněk nerostl.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._cells: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0.0] * size
+        self._compact_at = 64
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = [0.0] * self._size
+            with self._lock:
+                if len(self._cells) >= self._compact_at:
+                    self._fold_finished()
+                self._cells.append((threading.current_thread(), cell))
+            self._local.cell = cell
+        return cell
+
+    def _fold_finished(self):
+        """Přičte buňky skončených vláken do _retired (volat pod zámkem)"""
+        alive = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                alive.append((thread, cell))
+            else:
+                for i, value in enumerate(cell):
+                    self._retired[i] += value
+        self._cells = alive
+        self._compact_at = max(64, 2 * len(alive))
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            self._fold_finished()
+            rows = [self._retired] + [cell for _, cell in self._cells]
+        return [sum(values) for values in zip(*rows)]
+
+
+class _CounterChild:
+    def __init__(self):
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount: float = 1.0):
+        self._cells.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Hodnota se spočítá až při čtení (např. počet session, paměť indexu)"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # počty po koších (+Inf na konci) a součet hodnot
+        self._cells = _ThreadCells(len(buckets) + 2)
+
+    def observe(self, value: float):
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """(kumulativní počty po koších včetně +Inf, součet, počet)"""
+        totals = self._cells.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1], running
+
+    def quantile(self, q: float) -> float:
+        """Odhad kvantilu (0-1) lineární interpolací v koši, jako histogram_quantile v Prometheu"""
+        cumulative, _, count = self.snapshot()
+        if not count:
+            return 0.0
+        rank = q * count
+        for i, upper_count in enumerate(cumulative):
+            if upper_count >= rank:
+                if i == len(self._buckets):
+                    return self._buckets[-1]
+                lower = self._buckets[i - 1] if i > 0 else 0.0
+                lower_count = cumulative[i - 1] if i > 0 else 0.0
+                in_bucket = upper_count - lower_count
+                fraction = (rank - lower_count) / in_bucket if in_bucket else 0.0
+                return lower + (self._buckets[i] - lower) * fraction
+        return self._buckets[-1]
+
+
+class _Metric:
+    """Rodina metrik jednoho jména; s labely se hodnoty získají přes labels(...)"""
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **labelvalues):
+        key = tuple(str(v) for v in values) or tuple(str(labelvalues[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"Metrika {self.name} očekává labely {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[Dict[str, str], object]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in items]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(int(value)) if value == int(value) else repr(value)
+
+
+class MetricsRegistry:
+    """Registr metrik procesu"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metrika {metric.name} už je registrovaná jako {existing.metric_type}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render_prometheus(self) -> str:
+        """Všechny metriky v textovém formátu Prometheus (verze 0.0.4)"""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for labels, child in metric.children():
+                if isinstance(child, _HistogramChild):
+                    cumulative, total, count = child.snapshot()
+                    for bound, bucket_count in zip(metric.buckets + (math.inf,), cumulative):
+                        bucket_labels = dict(labels, le=_format_value(bound))
+                        lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {_format_value(bucket_count)}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(total)}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {_format_value(count)}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(child.value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> List[Dict]:
+        """
+        Aktuální hodnoty pro zobrazení (např. v Streamlit panelu).
+
+        Returns:
+            řádky {"metric", "type", "labels", "value"}; u histogramů místo value
+            "count", "avg", "p50", "p90", "p99"
+        """
+        rows = []
+        for metric in self.metrics():
+            for labels, child in metric.children():
+                row = {"metric": metric.name, "type": metric.metric_type, "labels": labels}
+                if isinstance(child, _HistogramChild):
+                    _, total, count = child.snapshot()
+                    row.update({
+                        "count": int(count),
+                        "avg": total / count if count else 0.0,
+                        "p50": child.quantile(0.5),
+                        "p90": child.quantile(0.9),
+                        "p99": child.quantile(0.99),
+                    })
+                else:
+                    row["value"] = child.value
+                rows.append(row)
+        return rows
+
+
+registry = MetricsRegistry()
+
+# ---------- Metriky aplikace ----------
+
+REQUESTS = registry.counter("chat_requests_total", "Požadavky na chat API", ["endpoint", "status"])
+REQUEST_SECONDS = registry.histogram("chat_request_duration_seconds", "Doba zpracování požadavku API", ["endpoint"])
+STAGE_SECONDS = registry.histogram("pipeline_stage_duration_seconds", "Doba fází zpracování dotazu", ["stage"])
+FAISS_SEARCH_SECONDS = registry.histogram(
+    "faiss_search_duration_seconds", "Doba vyhledávání ve FAISS indexu",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+LLM_TOKENS = registry.counter("llm_tokens_total", "Tokeny poslané modelu (in) a vygenerované (out)", ["direction"])
+LLM_COST = registry.counter("llm_cost_usd_total", "Odhadované náklady volání API v USD (usage.py)", ["agent"])
+EMBEDDING_CALLS = registry.counter("embedding_calls_total", "Volání embeddings API")
+EMBEDDING_INPUTS = registry.counter("embedding_inputs_total", "Texty poslané do embeddings API")
+CACHE_LOOKUPS = registry.counter("semantic_cache_lookups_total", "Dotazy do sémantické cache", ["result"])
+ACTIVE_SESSIONS = registry.gauge("chat_active_sessions", "Počet držených session chat API")
+INDEX_MEMORY = registry.gauge("faiss_index_memory_bytes", "Paměť FAISS indexů a matic embeddingů v procesu")
+
+_indexed_processors: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def track_index_memory(processor):
+    """Započítá paměť indexu processoru (index + embeddings_array) do faiss_index_memory_bytes"""
+    _indexed_processors.add(processor)
+
+
+def _index_memory_bytes() -> float:
+    total = 0
+    for processor in list(_indexed_processors):
+        index = getattr(processor, "index", None)
+        if index is not None:
+            total += index.ntotal * index.d * 4  # IndexFlatL2 drží float32 vektory
+        embeddings = getattr(processor, "embeddings_array", None)
+        if embeddings is not None:
+            total += embeddings.nbytes
+    return total
+
+
+INDEX_MEMORY.set_function(_index_memory_bytes)
+
+
+def _observe_span(finished: tracing.Span):
+    """Metriky z dokončených spanů (posluchač tracing.py)"""
+    STAGE_SECONDS.labels(stage=finished.name).observe(finished.duration)
+    attributes = finished.attributes
+
+    if finished.name == "faiss.search":
+        FAISS_SEARCH_SECONDS.observe(finished.duration)
+    elif finished.name == "embedding":
+        EMBEDDING_CALLS.inc()
+        EMBEDDING_INPUTS.inc(attributes.get("texts", 1))
+
+    # Kořenové spany API handlerů nesou HTTP status
+    if "status" in attributes and finished.name.startswith("api."):
+        REQUESTS.labels(endpoint=finished.name, status=attributes["status"]).inc()
+        REQUEST_SECONDS.labels(endpoint=finished.name).observe(finished.duration)
+
+
+tracing.add_span_listener(_observe_span)
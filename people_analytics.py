@@ -0,0 +1,319 @@
+"""
+Sloupcová analytika nad databází osob (NumPy).
+
+PeopleColumns drží pole, přes která se agreguje, jako NumPy sloupce
+(oddělení, pozice a lokace slovníkově kódované) - group-by a agregace jsou
+vektorové operace (bincount, lexsort) bez průchodu řádky v Pythonu.
+
+    columns = database.analytics({"location": "Praha"})
+    columns.salary_percentiles(by="department")
+    columns.headcount(rows="location", columns="position")
+
+Výsledkem je AggregateTable (záhlaví + řádky) pro výpis agenta i sidebar.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+GROUP_FIELDS = ("department", "position", "location")
+PERCENTILES = (10, 25, 50, 75, 90)
+COHORT_PERIODS = ("year", "quarter", "month")
+
+# Popisky pro výpis
+FIELD_LABELS = {"department": "oddělení", "position": "pozice", "location": "lokace"}
+TOTAL_LABEL = "celkem"
+
+# Měsíc nástupu u osob bez data nástupu (NaT převedené na int64)
+_UNKNOWN_MONTH = np.iinfo(np.int64).min
+
+
+@dataclass
+class AggregateTable:
+    """Výsledek agregace - záhlaví a řádky (hodnoty str/int/float)"""
+    title: str
+    columns: List[str]
+    rows: List[List[Any]]
+    people: int = 0                   # počet osob, přes které se agregovalo
+    filters: Dict[str, str] = field(default_factory=dict)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Řádky jako slovníky (st.dataframe, JSON)"""
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def to_markdown(self, max_rows: int = 20) -> str:
+        def cell(value: Any) -> str:
+            if isinstance(value, float):
+                return f"{value:,.0f}" if abs(value) >= 100 else f"{value:.1f}"
+            if isinstance(value, int):
+                return f"{value:,}"
+            return str(value)
+
+        lines = [
+            "| " + " | ".join(self.columns) + " |",
+            "|" + "---|" * len(self.columns),
+        ]
+        lines.extend("| " + " | ".join(cell(value) for value in row) + " |" for row in self.rows[:max_rows])
+        if len(self.rows) > max_rows:
+            lines.append(f"\n... a dalších {len(self.rows) - max_rows} řádků")
+        return "\n".join(lines)
+
+
+def _encode(values: Iterable[str], count: int) -> Tuple[np.ndarray, List[str]]:
+    """Slovníkové kódování - kódy a seznam hodnot (kód = index)"""
+    mapping: Dict[str, int] = {}
+    codes = np.fromiter((mapping.setdefault(value, len(mapping)) for value in values), dtype=np.int32, count=count)
+    # int16 kódy řadí stabilní argsort radix sortem (seskupení v lineárním čase)
+    if len(mapping) <= np.iinfo(np.int16).max:
+        codes = codes.astype(np.int16)
+    return codes, list(mapping)
+
+
+def _crosstab(row_codes: np.ndarray, n_rows: int, column_codes: np.ndarray, n_columns: int) -> np.ndarray:
+    """Počty kombinací dvou kódovaných sloupců (matice n_rows × n_columns)"""
+    flat = row_codes.astype(np.int64) * n_columns + column_codes
+    return np.bincount(flat, minlength=n_rows * n_columns).reshape(n_rows, n_columns)
+
+
+class PeopleColumns:
+    """Sloupce databáze osob pro vektorové agregace (řádky v pořadí databáze)"""
+
+    def __init__(self, ids: np.ndarray, salary: np.ndarray, age: np.ndarray, active: np.ndarray,
+                 hire_month: np.ndarray, codes: Dict[str, np.ndarray], labels: Dict[str, List[str]]):
+        self.ids = ids
+        self.salary = salary
+        self.age = age
+        self.active = active
+        self.hire_month = hire_month      # měsíce od 1970-01
+        self.codes = codes
+        self.labels = labels
+        self.filters: Dict[str, str] = {}
+        # Pořadí řádků podle platu - spočítá se jednou, podmnožiny ho převezmou bez řazení
+        self._salary_order: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_records(cls, records: Sequence[tuple]) -> "PeopleColumns":
+        """
+        Sloupce z n-tic (id, department, position, location, salary, age, hire_date, active)
+        - stejný tvar z Python seznamu i z SQL dotazu.
+        """
+        count = len(records)
+        codes, labels = {}, {}
+        for position, group_field in enumerate(GROUP_FIELDS, start=1):
+            codes[group_field], labels[group_field] = _encode((record[position] for record in records), count)
+        return cls(
+            ids=np.fromiter((record[0] for record in records), dtype=np.int64, count=count),
+            salary=np.fromiter((record[4] for record in records), dtype=np.float64, count=count),
+            age=np.fromiter((record[5] for record in records), dtype=np.float64, count=count),
+            active=np.fromiter((bool(record[7]) for record in records), dtype=bool, count=count),
+            hire_month=np.array([record[6] or "NaT" for record in records], dtype="datetime64[D]")
+            .astype("datetime64[M]").astype(np.int64),
+            codes=codes,
+            labels=labels
+        )
+
+    @classmethod
+    def from_people(cls, people: List[Dict]) -> "PeopleColumns":
+        return cls.from_records([
+            (p["id"], p["department"], p["position"], p["location"], p["salary"], p["age"],
+             p.get("hire_date"), p["active"])
+            for p in people
+        ])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, rows: np.ndarray, filters: Optional[Dict[str, str]] = None) -> "PeopleColumns":
+        """Podmnožina řádků (pozice, např. výsledek vyhledávání); slovníky hodnot se sdílí"""
+        subset = PeopleColumns(
+            ids=self.ids[rows], salary=self.salary[rows], age=self.age[rows], active=self.active[rows],
+            hire_month=self.hire_month[rows],
+            codes={name: codes[rows] for name, codes in self.codes.items()},
+            labels=self.labels
+        )
+        subset.filters = dict(filters or {})
+        if self._salary_order is not None:
+            # Pozice v podmnožině pro řádky v pořadí platu (-1 = mimo podmnožinu)
+            subset_position = np.full(len(self), -1, dtype=np.int64)
+            subset_position[rows] = np.arange(len(rows))
+            ordered = subset_position[self._salary_order]
+            subset._salary_order = ordered[ordered >= 0]
+        return subset
+
+    def take_ids(self, ids: Iterable[int], filters: Optional[Dict[str, str]] = None) -> "PeopleColumns":
+        """Podmnožina podle ID osob (sloupce musí být seřazené podle ID)"""
+        ids = np.fromiter(ids, dtype=np.int64)
+        return self.take(np.searchsorted(self.ids, ids), filters)
+
+    # ---------- Seskupení ----------
+
+    def _groups(self, by: Optional[str]) -> Tuple[np.ndarray, List[str]]:
+        """Kódy skupin a jejich popisky; bez seskupení jedna skupina"""
+        if by is None:
+            return np.zeros(len(self), dtype=np.int32), [TOTAL_LABEL]
+        if by not in self.codes:
+            raise ValueError(f"Neznámé pole pro seskupení '{by}' (možnosti: {', '.join(GROUP_FIELDS)})")
+        return self.codes[by], self.labels[by]
+
+    @staticmethod
+    def _present(counts: np.ndarray, labels: List[str]) -> List[int]:
+        """Neprázdné skupiny seřazené podle popisku"""
+        return sorted(np.flatnonzero(counts).tolist(), key=lambda group: labels[group])
+
+    def _salary_by_group(self, groups: np.ndarray) -> np.ndarray:
+        """Platy seřazené podle (skupina, plat) - každá skupina je souvislý úsek"""
+        if self._salary_order is None:
+            self._salary_order = np.argsort(self.salary, kind="stable")
+        order = self._salary_order[np.argsort(groups[self._salary_order], kind="stable")]
+        return self.salary[order]
+
+    def _table(self, title: str, columns: List[str], rows: List[List[Any]]) -> AggregateTable:
+        return AggregateTable(title, columns, rows, people=len(self), filters=self.filters)
+
+    def _by_label(self, by: Optional[str]) -> str:
+        return FIELD_LABELS.get(by, by) if by else "skupina"
+
+    # ---------- Agregace ----------
+
+    def salary_percentiles(self, by: Optional[str] = None, q: Sequence[float] = PERCENTILES) -> AggregateTable:
+        """Percentily platu po skupinách (lineární interpolace jako np.percentile)"""
+        groups, labels = self._groups(by)
+        columns = [self._by_label(by), "počet"] + [f"p{value:g}" for value in q]
+        if not len(self):
+            return self._table("Percentily platu (Kč)", columns, [])
+
+        counts = np.bincount(groups, minlength=len(labels))
+        sorted_salary = self._salary_by_group(groups)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        # Pozice percentilu uvnitř skupiny (prázdné skupiny se nevypisují, jen nesmí indexovat mimo)
+        last = np.maximum(counts, 1)[:, None] - 1
+        position = last * (np.asarray(q, dtype=np.float64)[None, :] / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        end = len(sorted_salary) - 1
+        low_values = sorted_salary[np.minimum(starts[:, None] + lower, end)]
+        high_values = sorted_salary[np.minimum(starts[:, None] + upper, end)]
+        values = low_values + (high_values - low_values) * (position - lower)
+
+        rows = [
+            [labels[group], int(counts[group])] + [float(value) for value in values[group]]
+            for group in self._present(counts, labels)
+        ]
+        return self._table("Percentily platu (Kč)", columns, rows)
+
+    def salary_summary(self, by: Optional[str] = None) -> AggregateTable:
+        """Počet, průměr, minimum a maximum platu po skupinách"""
+        groups, labels = self._groups(by)
+        counts = np.bincount(groups, minlength=len(labels))
+        sums = np.bincount(groups, weights=self.salary, minlength=len(labels))
+        sorted_salary = self._salary_by_group(groups)
+        present = self._present(counts, labels)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rows = [
+            [labels[group], int(counts[group]), float(sums[group] / counts[group]),
+             float(sorted_salary[starts[group]]), float(sorted_salary[starts[group] + counts[group] - 1])]
+            for group in present
+        ]
+        return self._table("Platy (Kč)", [self._by_label(by), "počet", "průměr", "min", "max"], rows)
+
+    def age_histogram(self, bin_width: int = 5, by: Optional[str] = None) -> AggregateTable:
+        """Histogram věku (koše po bin_width letech), volitelně rozpadnutý po skupinách"""
+        bin_width = max(1, int(bin_width))
+        if not len(self):
+            return self._table("Věkové rozložení", ["věk", "počet"], [])
+        ages = self.age.astype(np.int64)
+        first = int(ages.min()) // bin_width * bin_width
+        bins = (ages - first) // bin_width
+        n_bins = int(bins.max()) + 1
+        groups, labels = self._groups(by)
+        matrix = _crosstab(bins, n_bins, groups, len(labels))
+        present = self._present(matrix.sum(axis=0), labels)
+
+        rows = []
+        for bin_index in range(n_bins):
+            low = first + bin_index * bin_width
+            rows.append([f"{low}-{low + bin_width - 1}"] + [int(matrix[bin_index, group]) for group in present])
+        columns = ["věk"] + ([labels[group] for group in present] if by else ["počet"])
+        return self._table("Věkové rozložení", columns, rows)
+
+    def hire_cohorts(self, period: str = "year", by: Optional[str] = None) -> AggregateTable:
+        """
+        Kohorty podle data nástupu (rok, čtvrtletí, měsíc).
+
+        Bez seskupení počet nastoupivších a podíl stále aktivních, se seskupením
+        počty nástupů po skupinách.
+        """
+        if period not in COHORT_PERIODS:
+            raise ValueError(f"Neznámé období '{period}' (možnosti: {', '.join(COHORT_PERIODS)})")
+        known = self.hire_month != _UNKNOWN_MONTH
+        months = self.hire_month[known]
+        if period == "year":
+            keys = months // 12
+            label = lambda key: str(1970 + key)
+        elif period == "quarter":
+            keys = months // 3
+            label = lambda key: f"{1970 + key // 4}-Q{key % 4 + 1}"
+        else:
+            keys = months
+            label = lambda key: f"{1970 + key // 12}-{key % 12 + 1:02d}"
+
+        if not len(keys):
+            return self._table("Kohorty nástupu", ["období", "nastoupilo"], [])
+
+        # Období jako posun od nejstaršího - počty přes bincount místo řazení
+        first = int(keys.min())
+        cohort_codes = keys - first
+        n_cohorts = int(cohort_codes.max()) + 1
+        counts = np.bincount(cohort_codes, minlength=n_cohorts)
+        cohorts = np.flatnonzero(counts).tolist()
+        if by is None:
+            active = np.bincount(cohort_codes, weights=self.active[known], minlength=n_cohorts)
+            rows = [
+                [label(first + i), int(counts[i]), int(active[i]), float(100 * active[i] / counts[i])]
+                for i in cohorts
+            ]
+            return self._table("Kohorty nástupu", ["období", "nastoupilo", "aktivních", "aktivních %"], rows)
+
+        groups, labels = self._groups(by)
+        matrix = _crosstab(cohort_codes, n_cohorts, groups[known], len(labels))
+        present = self._present(matrix.sum(axis=0), labels)
+        rows = [[label(first + i)] + [int(matrix[i, group]) for group in present] for i in cohorts]
+        return self._table("Kohorty nástupu", ["období"] + [labels[group] for group in present], rows)
+
+    def headcount(self, rows: str = "location", columns: str = "position",
+                  active_only: bool = False) -> AggregateTable:
+        """Počty osob v kombinaci dvou polí (např. lokace × pozice) se součty"""
+        row_codes, row_labels = self._groups(rows)
+        column_codes, column_labels = self._groups(columns)
+        if active_only:
+            row_codes, column_codes = row_codes[self.active], column_codes[self.active]
+        matrix = _crosstab(row_codes, len(row_labels), column_codes, len(column_labels))
+        present_rows = self._present(matrix.sum(axis=1), row_labels)
+        present_columns = self._present(matrix.sum(axis=0), column_labels)
+        table_rows = [
+            [row_labels[r]] + [int(matrix[r, c]) for c in present_columns] + [int(matrix[r].sum())]
+            for r in present_rows
+        ]
+        return self._table(
+            f"Počet osob: {FIELD_LABELS.get(rows, rows)} × {FIELD_LABELS.get(columns, columns)}",
+            [FIELD_LABELS.get(rows, rows)] + [column_labels[c] for c in present_columns] + [TOTAL_LABEL],
+            table_rows
+        )
+
+    METRICS = ("salary_percentiles", "salary_summary", "age_histogram", "hire_cohorts", "headcount")
+
+    def aggregate(self, metric: str, by: Optional[str] = None, columns: Optional[str] = None,
+                  period: Optional[str] = None, bin_width: Optional[int] = None) -> AggregateTable:
+        """Spustí agregaci podle jména (parametry nástroje aggregate agenta)"""
+        if metric == "salary_percentiles":
+            return self.salary_percentiles(by)
+        if metric == "salary_summary":
+            return self.salary_summary(by)
+        if metric == "age_histogram":
+            return self.age_histogram(bin_width or 5, by)
+        if metric == "hire_cohorts":
+            return self.hire_cohorts(period or "year", by)
+        if metric == "headcount":
+            return self.headcount(by or "location", columns or "position")
+        raise ValueError(f"Neznámá agregace '{metric}' (možnosti: {', '.join(self.METRICS)})")
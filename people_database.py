@@ -1,161 +1,695 @@
 """Simulovaná databáze osob s dummy daty"""
+import bisect
 import json
-from typing import List, Dict, Optional
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
 from datetime import datetime, timedelta
 import random
+import sys
+
+import numpy as np
+
+from people_analytics import PeopleColumns
+
+# Délka n-gramů indexu pro hledání podřetězců
+NGRAM_SIZE = 3
+
+
+FIRST_NAMES = [
+    "Jan", "Petr", "Pavel", "Martin", "Tomáš", "Jakub", "Lukáš", "Ondřej",
+    "Jana", "Eva", "Anna", "Petra", "Lucie", "Kateřina", "Tereza", "Barbora",
+    "Jiří", "Michal", "David", "Marek"
+]
+
+LAST_NAMES = [
+    "Novák", "Svoboda", "Novotný", "Dvořák", "Černý", "Procházka", "Kučera",
+    "Veselý", "Horák", "Němec", "Pokorný", "Pospíšil", "Hájek", "Král"
+]
+
+POSITIONS = [
+    "Software Developer", "Senior Developer", "Team Lead", "Project Manager",
+    "Data Analyst", "UX Designer", "DevOps Engineer", "QA Tester",
+    "Business Analyst", "Product Owner", "Scrum Master", "Architect"
+]
+
+DEPARTMENTS = [
+    "IT", "Engineering", "Sales", "Marketing", "HR", "Finance", "Operations"
+]
+
+LOCATIONS = [
+    "Praha", "Brno", "Ostrava", "Plzeň", "Liberec", "Olomouc", "Hradec Králové"
+]
+
+SKILLS = [
+    "Python", "Java", "C#", "JavaScript", "React", "Angular", "Vue.js",
+    "Docker", "Kubernetes", "AWS", "Azure", "SQL", "NoSQL", "Machine Learning",
+    "Data Science", "Agile", "Scrum", "Git", "CI/CD"
+]
+
+
+def generate_people(count: int, start_id: int = 1, rng: Optional[random.Random] = None) -> Iterator[Dict]:
+    """
+    Generuje dummy osoby (postupně - i miliony řádků bez držení v paměti).
+
+    Args:
+        count: počet osob
+        start_id: ID první osoby
+        rng: zdroj náhody (pro reprodukovatelná data random.Random(seed))
+    """
+    rng = rng or random
+    now = datetime.now()
+
+    for i in range(start_id - 1, start_id - 1 + count):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+
+        # Generování datumu nástupu (poslední 3 roky)
+        days_ago = rng.randint(0, 1095)
+        hire_date = now - timedelta(days=days_ago)
+
+        yield {
+            "id": i + 1,
+            "first_name": first_name,
+            "last_name": last_name,
+            "full_name": f"{first_name} {last_name}",
+            "email": f"{first_name.lower()}.{last_name.lower()}{i}@company.com",
+            "phone": f"+420 {rng.randint(600, 799)} {rng.randint(100, 999)} {rng.randint(100, 999)}",
+            "position": rng.choice(POSITIONS),
+            "department": rng.choice(DEPARTMENTS),
+            "location": rng.choice(LOCATIONS),
+            "salary": rng.randint(40000, 150000),
+            "hire_date": hire_date.strftime("%Y-%m-%d"),
+            "age": rng.randint(22, 60),
+            "skills": rng.sample(SKILLS, rng.randint(3, 7)),
+            "active": rng.random() > 0.1  # 90% aktivních
+        }
+
+
+class PeopleStatistics:
+    """
+    Statistiky databáze udržované inkrementálně (čítače a průběžné součty).
+
+    add/remove se volají při vložení, změně a smazání osoby - get() je pak O(1)
+    (slovník se sestaví jednou pro každou verzi). version se zvyšuje s každou
+    změnou, podle ní lze cachovat odvozené texty (system prompt agenta). Při
+    přestavbě statistik se předá verze předchozích (after=), aby verze databáze
+    rostla monotónně i přes přestavby.
+    """
+
+    GROUP_FIELDS = ("department", "position", "location")
+
+    def __init__(self, after: Optional["PeopleStatistics"] = None):
+        self.total = 0
+        self.active = 0
+        self.salary_sum = 0
+        self.age_sum = 0
+        self.groups: Dict[str, Dict[str, int]] = {field: {} for field in self.GROUP_FIELDS}
+        self.version = after.version + 1 if after is not None else 0
+        self._cached: Optional[Dict] = None
+
+    @classmethod
+    def from_people(cls, people: Iterable[Dict],
+                    after: Optional["PeopleStatistics"] = None) -> "PeopleStatistics":
+        statistics = cls(after)
+        for person in people:
+            statistics.add(person)
+        return statistics
+
+    def apply(self, groups: Dict[str, str], active: bool, salary: int, age: int, count: int = 1):
+        """Přičte (count > 0) nebo odečte (count < 0) skupinu osob se stejnými hodnotami"""
+        self.total += count
+        self.active += count if active else 0
+        self.salary_sum += salary
+        self.age_sum += age
+        for field, value in groups.items():
+            counts = self.groups[field]
+            remaining = counts.get(value, 0) + count
+            if remaining > 0:
+                counts[value] = remaining
+            else:
+                counts.pop(value, None)
+        self.version += 1
+        self._cached = None
+
+    def add(self, person: Dict):
+        self.apply({field: person[field] for field in self.GROUP_FIELDS},
+                   person["active"], person["salary"], person["age"])
+
+    def remove(self, person: Dict):
+        self.apply({field: person[field] for field in self.GROUP_FIELDS},
+                   person["active"], -person["salary"], -person["age"], count=-1)
+
+    def get(self) -> Dict:
+        """Statistiky ve formátu get_statistics (sdílený slovník - neměnit)"""
+        if self._cached is None:
+            self._cached = {
+                "total_people": self.total,
+                "active_employees": self.active,
+                "inactive_employees": self.total - self.active,
+                "departments": dict(self.groups["department"]),
+                "positions": dict(self.groups["position"]),
+                "locations": dict(self.groups["location"]),
+                "average_salary": int(self.salary_sum / self.total) if self.total else 0,
+                "average_age": int(self.age_sum / self.total) if self.total else 0
+            }
+        return self._cached
+
+
+def _bitmap_from_rows(rows: Iterable[int], size: int) -> int:
+    """Bitmapa (int, bit i = řádek i) z pozic řádků"""
+    bits = np.zeros(size, dtype=bool)
+    bits[np.fromiter(rows, dtype=np.int64)] = True
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+
+def _rows_from_bitmap(bitmap: int, size: int) -> np.ndarray:
+    """Pozice řádků nastavených v bitmapě (vzestupně)"""
+    if not bitmap:
+        return np.empty(0, dtype=np.int64)
+    packed = np.frombuffer(bitmap.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(packed, bitorder="little")[:size])
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class PeopleIndex:
+    """
+    Indexy nad řádky databáze osob (řádek = pozice v seznamu people).
+
+    - id -> pozice řádku
+    - hash indexy oddělení a lokace: hodnota (lowercase) -> bitmapa řádků
+    - invertovaný index dovedností: dovednost (lowercase) -> bitmapa řádků
+    - jméno a pozice: sloupec slovníkově kódovaných lowercase hodnot
+      s n-gramovým indexem (n-gram -> hodnoty, které ho obsahují)
+
+    Bitmapy jsou Python int (bit i = řádek i) - průnik více filtrů je jedno `&`.
+
+    Změny (append, replace, remove) upravují jen položky dotčeného řádku;
+    remove navíc posune pozice řádků za smazaným (bitmapy posunem, seznamy
+    řádků jen od smazané pozice dál).
+    """
+
+    EXACT_FIELDS = ("department", "location")
+    TEXT_FIELDS = ("name", "position")
+
+    def __init__(self, people: List[Dict]):
+        self.size = len(people)
+        self.row_by_id: Dict[int, int] = {person["id"]: row for row, person in enumerate(people)}
+        self.all_rows = (1 << self.size) - 1
+        self.active = _bitmap_from_rows((row for row, p in enumerate(people) if p["active"]), self.size)
+
+        self.exact: Dict[str, Dict[str, int]] = {}
+        for field in self.EXACT_FIELDS:
+            self.exact[field] = self._bitmaps(
+                (row, person[field].lower()) for row, person in enumerate(people)
+            )
+
+        self.skills = self._bitmaps(
+            (row, skill.lower()) for row, person in enumerate(people) for skill in person["skills"]
+        )
+
+        # Textová pole: hodnota -> řádky a n-gram -> hodnoty (distinct hodnot je řádově méně než řádků)
+        self.values: Dict[str, Dict[str, List[int]]] = {}
+        self.grams: Dict[str, Dict[str, Set[str]]] = {}
+        # Sloupec lowercase hodnot po řádcích - ověření podřetězce jen nad kandidáty
+        self.columns: Dict[str, List[str]] = {}
+        # Statistiky pro odhad selektivity: n-gram -> počet řádků, klíč -> počet řádků
+        self.gram_rows: Dict[str, Dict[str, int]] = {}
+        for field in self.TEXT_FIELDS:
+            values: Dict[str, List[int]] = {}
+            column = []
+            for row, person in enumerate(people):
+                # intern - sloupec sdílí řetězce s klíči slovníku hodnot
+                text = sys.intern(self._text(person, field))
+                column.append(text)
+                values.setdefault(text, []).append(row)
+            grams: Dict[str, Set[str]] = {}
+            gram_rows: Dict[str, int] = {}
+            for value, value_rows in values.items():
+                for gram in _ngrams(value):
+                    grams.setdefault(gram, set()).add(value)
+                    gram_rows[gram] = gram_rows.get(gram, 0) + len(value_rows)
+            self.values[field] = values
+            self.grams[field] = grams
+            self.columns[field] = column
+            self.gram_rows[field] = gram_rows
+
+        self.key_rows: Dict[str, Dict[str, int]] = {
+            field: {key: bitmap.bit_count() for key, bitmap in bitmaps.items()}
+            for field, bitmaps in list(self.exact.items()) + [("skill", self.skills)]
+        }
+
+    @staticmethod
+    def _text(person: Dict, field: str) -> str:
+        if field == "name":
+            # Oddělovač brání shodě přes hranici křestního jména a příjmení
+            return "\n".join((person["first_name"], person["last_name"], person["full_name"])).lower()
+        return person[field].lower()
+
+    def _bitmaps(self, pairs: Iterable) -> Dict[str, int]:
+        rows: Dict[str, List[int]] = {}
+        for row, key in pairs:
+            rows.setdefault(key, []).append(row)
+        return {key: _bitmap_from_rows(key_rows, self.size) for key, key_rows in rows.items()}
+
+    def equals(self, field: str, value: str) -> int:
+        """Řádky s hodnotou pole (department, location) rovnou value (bez ohledu na velikost písmen)"""
+        return self.exact[field].get(value.lower(), 0)
+
+    def estimate(self, field: str, value: str) -> int:
+        """
+        Odhad počtu řádků, kde pole obsahuje value - bez vyhodnocení filtru.
+
+        Oddělení a lokace přesně, dovednosti horní mez (osoba může mít více
+        odpovídajících dovedností), text nejméně častý n-gram dotazu.
+        """
+        value = value.lower()
+        if field in self.key_rows:
+            return min(self.size, sum(count for key, count in self.key_rows[field].items() if value in key))
+        grams = _ngrams(value)
+        if not grams:
+            return self.size
+        return min(self.gram_rows[field].get(gram, 0) for gram in grams)
+
+    def contains(self, field: str, value: str, within: Optional[int] = None) -> int:
+        """
+        Řádky, jejichž pole obsahuje value jako podřetězec (bez ohledu na velikost písmen).
+
+        Args:
+            within: bitmapa kandidátů - u textových polí se při malém počtu
+                kandidátů ověří jen jejich řádky místo vyhodnocení celého indexu
+        """
+        value = value.lower()
+        if field == "skill":
+            return self._union(bitmap for skill, bitmap in self.skills.items() if value in skill)
+        if field in self.exact:
+            return self._union(bitmap for key, bitmap in self.exact[field].items() if value in key)
+
+        if within is not None and within.bit_count() < self.estimate(field, value):
+            column = self.columns[field]
+            return _bitmap_from_rows((row for row in self.rows(within) if value in column[row]), self.size)
+
+        values = self.values[field]
+        candidates: Iterable[str] = values
+        grams = _ngrams(value)
+        if grams:
+            # Průnik seznamů hodnot pro všechny n-gramy dotazu, od nejkratšího
+            postings = sorted((self.grams[field].get(gram, set()) for gram in grams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        matched = [values[candidate] for candidate in candidates if value in candidate]
+        return _bitmap_from_rows((row for rows in matched for row in rows), self.size)
+
+    @staticmethod
+    def _union(bitmaps: Iterable[int]) -> int:
+        result = 0
+        for bitmap in bitmaps:
+            result |= bitmap
+        return result
+
+    def rows(self, bitmap: int) -> np.ndarray:
+        return _rows_from_bitmap(bitmap, self.size)
+
+    # ---------- Změny ----------
+
+    def append(self, person: Dict):
+        """Přidá osobu jako nový poslední řádek"""
+        row = self.size
+        self.size += 1
+        self.all_rows |= 1 << row
+        self.row_by_id[person["id"]] = row
+        for field in self.TEXT_FIELDS:
+            self.columns[field].append(sys.intern(self._text(person, field)))
+        self._link(row, person)
+
+    def replace(self, row: int, old: Dict, person: Dict):
+        """Nahradí osobu na řádku novou verzí (stejné ID)"""
+        self._unlink(row, old)
+        for field in self.TEXT_FIELDS:
+            self.columns[field][row] = sys.intern(self._text(person, field))
+        self._link(row, person)
+
+    def remove(self, row: int, old: Dict, people: List[Dict]):
+        """
+        Odebere řádek osoby old; people je seznam už bez ní.
+
+        Řádky za smazaným se posunou o jednu pozici - O(počet řádků za ním).
+        """
+        self._unlink(row, old)
+        del self.row_by_id[old["id"]]
+        self.size -= 1
+
+        def drop(bitmap: int) -> int:
+            return (bitmap & ((1 << row) - 1)) | ((bitmap >> (row + 1)) << row)
+
+        self.all_rows = (1 << self.size) - 1
+        self.active = drop(self.active)
+        for bitmaps in list(self.exact.values()) + [self.skills]:
+            for key, bitmap in bitmaps.items():
+                bitmaps[key] = drop(bitmap)
+
+        for field in self.TEXT_FIELDS:
+            del self.columns[field][row]
+            for value_rows in self.values[field].values():
+                start = bisect.bisect_right(value_rows, row)
+                value_rows[start:] = [value_row - 1 for value_row in value_rows[start:]]
+        for position in range(row, self.size):
+            self.row_by_id[people[position]["id"]] = position
+
+    def _link(self, row: int, person: Dict):
+        """Zapíše hodnoty osoby na řádku do bitmap, slovníků hodnot a statistik"""
+        bit = 1 << row
+        if person["active"]:
+            self.active |= bit
+        for field in self.EXACT_FIELDS:
+            self._link_key(self.exact[field], self.key_rows[field], person[field].lower(), bit)
+        for skill in {skill.lower() for skill in person["skills"]}:
+            self._link_key(self.skills, self.key_rows["skill"], skill, bit)
+
+        for field in self.TEXT_FIELDS:
+            text = self.columns[field][row]
+            grams, gram_rows = self.grams[field], self.gram_rows[field]
+            value_rows = self.values[field].setdefault(text, [])
+            bisect.insort(value_rows, row)
+            for gram in _ngrams(text):
+                if len(value_rows) == 1:
+                    grams.setdefault(gram, set()).add(text)
+                gram_rows[gram] = gram_rows.get(gram, 0) + 1
+
+    def _unlink(self, row: int, person: Dict):
+        """Opak _link - odebere hodnoty osoby na řádku (sloupce ještě drží její text)"""
+        bit = 1 << row
+        self.active &= ~bit
+        for field in self.EXACT_FIELDS:
+            self._unlink_key(self.exact[field], self.key_rows[field], person[field].lower(), bit)
+        for skill in {skill.lower() for skill in person["skills"]}:
+            self._unlink_key(self.skills, self.key_rows["skill"], skill, bit)
+
+        for field in self.TEXT_FIELDS:
+            text = self.columns[field][row]
+            grams, gram_rows = self.grams[field], self.gram_rows[field]
+            values = self.values[field]
+            value_rows = values[text]
+            del value_rows[bisect.bisect_left(value_rows, row)]
+            if not value_rows:
+                del values[text]
+            for gram in _ngrams(text):
+                if not value_rows:
+                    grams[gram].discard(text)
+                    if not grams[gram]:
+                        del grams[gram]
+                gram_rows[gram] -= 1
+                if not gram_rows[gram]:
+                    del gram_rows[gram]
+
+    @staticmethod
+    def _link_key(bitmaps: Dict[str, int], counts: Dict[str, int], key: str, bit: int):
+        bitmaps[key] = bitmaps.get(key, 0) | bit
+        counts[key] = counts.get(key, 0) + 1
+
+    @staticmethod
+    def _unlink_key(bitmaps: Dict[str, int], counts: Dict[str, int], key: str, bit: int):
+        counts[key] -= 1
+        if counts[key]:
+            bitmaps[key] &= ~bit
+        else:
+            del bitmaps[key], counts[key]
+
+
+@dataclass
+class Predicate:
+    """Jeden filtr plánu dotazu s odhadem počtu vyhovujících řádků"""
+    field: str
+    value: str
+    estimate: int
+
+
+class PeopleView(Sequence):
+    """
+    Výsledek dotazu jako líná sekvence osob.
+
+    Drží jen pozice řádků; slovníky osob se vybírají až při indexaci nebo
+    slicingu - výpis prvních N výsledků sáhne jen na N řádků.
+    """
+
+    def __init__(self, people: List[Dict], rows: np.ndarray):
+        self._people = people
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._people[row] for row in self._rows[item]]
+        return self._people[self._rows[item]]
+
+
+class PeopleCursor(Sequence):
+    """
+    Stránkovaný kurzor nad výsledkem dotazu (PeopleView, SQLitePeopleView, seznam).
+
+    Zná celkový počet a velikost stránky; osoby se materializují jen pro
+    stránku, která se zobrazuje (poslední stránka se drží v cache).
+    Jako Sequence deleguje na podkladový výsledek.
+    """
+
+    def __init__(self, results: Sequence, page_size: int = 5):
+        self._results = results
+        self.page_size = max(1, page_size)
+        self.current = 0              # aktuálně zobrazená stránka (výpis, sidebar)
+        self._page_cache: Optional[tuple] = None
+
+    @property
+    def total(self) -> int:
+        return len(self._results)
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+    def page(self, number: Optional[int] = None) -> List[Dict]:
+        """Osoby jedné stránky (0 = první; None = aktuální), mimo rozsah prázdný seznam"""
+        number = self.current if number is None else number
+        if self._page_cache is None or self._page_cache[0] != number:
+            start = number * self.page_size
+            people = list(self._results[start:start + self.page_size]) if number >= 0 else []
+            self._page_cache = (number, people)
+        return self._page_cache[1]
+
+    def seek(self, number: int) -> List[Dict]:
+        """Nastaví aktuální stránku (omezí na platný rozsah) a vrátí její osoby"""
+        self.current = min(max(0, number), self.page_count - 1)
+        return self.page()
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __getitem__(self, item):
+        return self._results[item]
 
 
 class PeopleDatabase:
     """Lokální simulovaná databáze osob"""
 
-    def __init__(self):
-        self.people = self._generate_dummy_data()
+    # Pole smart search - všechna se porovnávají jako podřetězec
+    SEARCH_FIELDS = ("name", "location", "position", "department", "skill")
 
-    def _generate_dummy_data(self) -> List[Dict]:
-        """Generuje dummy data"""
+    def __init__(self, size: int = 50, people: Optional[List[Dict]] = None):
+        """
+        Args:
+            size: počet generovaných osob
+            people: existující osoby místo generovaných (např. pro benchmark)
+        """
+        self.people = people if people is not None else self._generate_dummy_data(size)
+        self.rebuild_index()
 
-        first_names = [
-            "Jan", "Petr", "Pavel", "Martin", "Tomáš", "Jakub", "Lukáš", "Ondřej",
-            "Jana", "Eva", "Anna", "Petra", "Lucie", "Kateřina", "Tereza", "Barbora",
-            "Jiří", "Michal", "David", "Marek"
-        ]
+    def rebuild_index(self):
+        """Přestaví indexy a statistiky (po přímé změně seznamu people)"""
+        self._index: Optional[PeopleIndex] = PeopleIndex(self.people)
+        self._columns: Optional[PeopleColumns] = None
+        self.statistics = PeopleStatistics.from_people(self.people, getattr(self, "statistics", None))
+        self._next_id = max((person["id"] for person in self.people), default=0) + 1
 
-        last_names = [
-            "Novák", "Svoboda", "Novotný", "Dvořák", "Černý", "Procházka", "Kučera",
-            "Veselý", "Horák", "Němec", "Pokorný", "Pospíšil", "Hájek", "Král"
-        ]
+    @property
+    def index(self) -> PeopleIndex:
+        """Indexy - změny přes add/update/delete_person je upravují inkrementálně"""
+        if self._index is None:
+            self._index = PeopleIndex(self.people)
+        return self._index
 
-        positions = [
-            "Software Developer", "Senior Developer", "Team Lead", "Project Manager",
-            "Data Analyst", "UX Designer", "DevOps Engineer", "QA Tester",
-            "Business Analyst", "Product Owner", "Scrum Master", "Architect"
-        ]
+    @property
+    def columns(self) -> PeopleColumns:
+        """Sloupce pro analytiku - sestaví se (O(n)) při prvním použití po změně dat"""
+        if self._columns is None:
+            self._columns = PeopleColumns.from_people(self.people)
+        return self._columns
 
-        departments = [
-            "IT", "Engineering", "Sales", "Marketing", "HR", "Finance", "Operations"
-        ]
+    @property
+    def statistics_version(self) -> int:
+        return self.statistics.version
 
-        locations = [
-            "Praha", "Brno", "Ostrava", "Plzeň", "Liberec", "Olomouc", "Hradec Králové"
-        ]
+    # ---------- Změny ----------
+    # Indexy a statistiky se upravují jen pro dotčený řádek. Vložení přidá osobu
+    # na konec seznamu; změna a smazání seznam nahradí kopií (copy-on-write, jen
+    # kopie odkazů), takže již vrácené výsledky (PeopleView) zůstávají
+    # konzistentní nad původními daty. Změny nejsou souběžné s dotazy.
 
-        skills = [
-            "Python", "Java", "C#", "JavaScript", "React", "Angular", "Vue.js",
-            "Docker", "Kubernetes", "AWS", "Azure", "SQL", "NoSQL", "Machine Learning",
-            "Data Science", "Agile", "Scrum", "Git", "CI/CD"
-        ]
+    def _row_of(self, person_id: int) -> Optional[int]:
+        return self.index.row_by_id.get(person_id)
 
-        people = []
-
-        for i in range(50):
-            first_name = random.choice(first_names)
-            last_name = random.choice(last_names)
-
-            # Generování datumu nástupu (poslední 3 roky)
-            days_ago = random.randint(0, 1095)
-            hire_date = datetime.now() - timedelta(days=days_ago)
-
-            person = {
-                "id": i + 1,
-                "first_name": first_name,
-                "last_name": last_name,
-                "full_name": f"{first_name} {last_name}",
-                "email": f"{first_name.lower()}.{last_name.lower()}{i}@company.com",
-                "phone": f"+420 {random.randint(600, 799)} {random.randint(100, 999)} {random.randint(100, 999)}",
-                "position": random.choice(positions),
-                "department": random.choice(departments),
-                "location": random.choice(locations),
-                "salary": random.randint(40000, 150000),
-                "hire_date": hire_date.strftime("%Y-%m-%d"),
-                "age": random.randint(22, 60),
-                "skills": random.sample(skills, random.randint(3, 7)),
-                "active": random.random() > 0.1  # 90% aktivních
-            }
+    def add_person(self, person: Dict) -> Dict:
+        """Vloží osobu (bez "id" dostane další volné ID), vrací vloženou osobu"""
+        person = dict(person)
+        if person.get("id") is None:
+            person["id"] = self._next_id
+        elif self._row_of(person["id"]) is not None:
+            raise ValueError(f"Osoba s ID {person['id']} už existuje")
+        self._next_id = max(self._next_id, person["id"] + 1)
+        self.people.append(person)
+        self.index.append(person)
+        self.statistics.add(person)
+        self._columns = None
+        return person
+
+    def update_person(self, person_id: int, changes: Dict[str, Any]) -> Optional[Dict]:
+        """Změní údaje osoby, vrací novou verzi osoby (None pokud neexistuje)"""
+        row = self._row_of(person_id)
+        if row is None:
+            return None
+        old = self.people[row]
+        person = {**old, **changes, "id": person_id}
+        if "full_name" not in changes and ("first_name" in changes or "last_name" in changes):
+            person["full_name"] = f"{person['first_name']} {person['last_name']}"
+        people = list(self.people)
+        people[row] = person
+        self.people = people
+        self.index.replace(row, old, person)
+        self.statistics.remove(old)
+        self.statistics.add(person)
+        self._columns = None
+        return person
 
-            people.append(person)
+    def delete_person(self, person_id: int) -> bool:
+        """Smaže osobu, vrací zda existovala"""
+        row = self._row_of(person_id)
+        if row is None:
+            return False
+        old = self.people[row]
+        self.people = self.people[:row] + self.people[row + 1:]
+        self.index.remove(row, old, self.people)
+        self.statistics.remove(old)
+        self._columns = None
+        return True
 
-        return people
+    def _generate_dummy_data(self, size: int = 50) -> List[Dict]:
+        """Generuje dummy data"""
+        return list(generate_people(size))
 
     def get_all_people(self) -> List[Dict]:
         """Vrátí všechny osoby"""
         return self.people
 
+    def _view(self, bitmap: int) -> PeopleView:
+        """Osoby pro řádky bitmapy (v pořadí databáze) jako líná sekvence"""
+        return PeopleView(self.people, self.index.rows(bitmap))
+
     def get_person_by_id(self, person_id: int) -> Optional[Dict]:
         """Najde osobu podle ID"""
-        for person in self.people:
-            if person["id"] == person_id:
-                return person
-        return None
-
-    def search_by_name(self, name: str) -> List[Dict]:
-        """Vyhledá osoby podle jména"""
-        name_lower = name.lower()
-        results = []
-        for person in self.people:
-            if (name_lower in person["first_name"].lower() or
-                name_lower in person["last_name"].lower() or
-                name_lower in person["full_name"].lower()):
-                results.append(person)
-        return results
-
-    def filter_by_department(self, department: str) -> List[Dict]:
+        row = self.index.row_by_id.get(person_id)
+        return self.people[row] if row is not None else None
+
+    def search_by_name(self, name: str) -> PeopleView:
+        """Vyhledá osoby podle jména (podřetězec křestního jména, příjmení nebo celého jména)"""
+        return self._view(self.index.contains("name", name))
+
+    def filter_by_department(self, department: str) -> PeopleView:
         """Filtruje osoby podle oddělení"""
-        return [p for p in self.people if p["department"].lower() == department.lower()]
+        return self._view(self.index.equals("department", department))
 
-    def filter_by_position(self, position: str) -> List[Dict]:
+    def filter_by_position(self, position: str) -> PeopleView:
         """Filtruje osoby podle pozice"""
-        position_lower = position.lower()
-        return [p for p in self.people if position_lower in p["position"].lower()]
+        return self._view(self.index.contains("position", position))
 
-    def filter_by_location(self, location: str) -> List[Dict]:
+    def filter_by_location(self, location: str) -> PeopleView:
         """Filtruje osoby podle lokace"""
-        return [p for p in self.people if p["location"].lower() == location.lower()]
+        return self._view(self.index.equals("location", location))
 
-    def filter_by_skill(self, skill: str) -> List[Dict]:
+    def filter_by_skill(self, skill: str) -> PeopleView:
         """Najde osoby se specifickou skillou"""
-        skill_lower = skill.lower()
-        results = []
-        for person in self.people:
-            if any(skill_lower in s.lower() for s in person["skills"]):
-                results.append(person)
-        return results
-
-    def get_active_employees(self) -> List[Dict]:
+        return self._view(self.index.contains("skill", skill))
+
+    def get_active_employees(self) -> PeopleView:
         """Vrátí pouze aktivní zaměstnance"""
-        return [p for p in self.people if p["active"]]
+        return self._view(self.index.active)
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        department: Optional[str] = None,
+        location: Optional[str] = None,
+        position: Optional[str] = None,
+        skill: Optional[str] = None,
+        active: Optional[bool] = None
+    ) -> PeopleView:
+        """
+        Kombinace filtrů (AND) - průnik bitmap jednotlivých filtrů.
+
+        Oddělení a lokace se porovnávají přesně, jméno, pozice a dovednost jako podřetězec.
+        """
+        bitmap = self.index.all_rows
+        if name:
+            bitmap &= self.index.contains("name", name)
+        if department:
+            bitmap &= self.index.equals("department", department)
+        if location:
+            bitmap &= self.index.equals("location", location)
+        if position:
+            bitmap &= self.index.contains("position", position)
+        if skill:
+            bitmap &= self.index.contains("skill", skill)
+        if active is not None:
+            bitmap &= self.index.active if active else self.index.all_rows & ~self.index.active
+        return self._view(bitmap)
+
+    def plan(self, filters: Dict[str, str]) -> List[Predicate]:
+        """Filtry seřazené od nejselektivnějšího podle statistik indexu"""
+        predicates = [
+            Predicate(field, value, self.index.estimate(field, value))
+            for field, value in filters.items() if field in self.SEARCH_FIELDS
+        ]
+        return sorted(predicates, key=lambda predicate: predicate.estimate)
+
+    def search(self, filters: Dict[str, str]) -> PeopleView:
+        """Kombinace filtrů (AND, podřetězce) - naplánuje a vyhodnotí"""
+        return self.execute(self.plan(filters))
+
+    def execute(self, plan: List[Predicate]) -> PeopleView:
+        """
+        Vyhodnotí plán z plan().
+
+        Nejselektivnější filtr určí kandidáty, další se s nimi protínají (textové
+        filtry ověřují jen kandidáty); prázdný průnik vyhodnocení ukončí.
+        Osoby se materializují až při čtení výsledku.
+        """
+        bitmap = self.index.all_rows
+        for predicate in plan:
+            bitmap &= self.index.contains(predicate.field, predicate.value, within=bitmap)
+            if not bitmap:
+                break
+        return PeopleView(self.people, self.index.rows(bitmap))
 
     def get_statistics(self) -> Dict:
-        """Vrátí statistiky o databázi"""
-        active_count = len([p for p in self.people if p["active"]])
-
-        departments = {}
-        for person in self.people:
-            dept = person["department"]
-            departments[dept] = departments.get(dept, 0) + 1
-
-        positions = {}
-        for person in self.people:
-            pos = person["position"]
-            positions[pos] = positions.get(pos, 0) + 1
-
-        locations = {}
-        for person in self.people:
-            loc = person["location"]
-            locations[loc] = locations.get(loc, 0) + 1
-
-        avg_salary = sum(p["salary"] for p in self.people) / len(self.people)
-        avg_age = sum(p["age"] for p in self.people) / len(self.people)
-
-        return {
-            "total_people": len(self.people),
-            "active_employees": active_count,
-            "inactive_employees": len(self.people) - active_count,
-            "departments": departments,
-            "positions": positions,
-            "locations": locations,
-            "average_salary": int(avg_salary),
-            "average_age": int(avg_age)
-        }
+        """Vrátí statistiky o databázi (udržované inkrementálně, O(1))"""
+        return self.statistics.get()
+
+    def analytics(self, filters: Optional[Dict[str, str]] = None) -> PeopleColumns:
+        """Sloupce pro agregace (people_analytics), volitelně jen osob vyhovujících filtrům smart search"""
+        if not filters:
+            return self.columns
+        return self.columns.take(self.search(filters)._rows, filters)
 
     def export_to_json(self) -> str:
         """Exportuje databázi do JSON"""
@@ -0,0 +1,545 @@
+"""
+Databáze osob nad lokálním SQLite souborem (stejné API jako PeopleDatabase).
+
+- tabulka people s indexy nad lowercase oddělením, lokací a aktivitou
+- FTS5 tabulka s trigram tokenizerem nad jménem, pozicí a dovednostmi
+  (hledání podřetězců), fts5vocab pro odhad selektivity v plan()
+- dotazy jsou konstantní parametrizované SQL - sqlite3 je drží v cache
+  připravených příkazů (cached_statements)
+- hromadné nahrání (generování nebo import JSON/JSONL) přes executemany
+  ve velkých transakcích
+
+Použití:
+    python people_database_sqlite.py people.db --generate 1000000
+    python people_database_sqlite.py people.db --import people.jsonl
+"""
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from people_analytics import PeopleColumns
+from people_database import NGRAM_SIZE, PeopleDatabase, PeopleStatistics, Predicate, generate_people
+
+# Počet řádků na jednu transakci hromadného nahrání
+BULK_BATCH_SIZE = 50000
+
+_COLUMNS = ("id", "first_name", "last_name", "full_name", "email", "phone", "position",
+            "department", "location", "salary", "hire_date", "age", "skills", "active")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS people (
+    id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    email TEXT,
+    phone TEXT,
+    position TEXT NOT NULL,
+    department TEXT NOT NULL,
+    location TEXT NOT NULL,
+    salary INTEGER,
+    hire_date TEXT,
+    age INTEGER,
+    skills TEXT NOT NULL,           -- JSON seznam
+    active INTEGER NOT NULL,
+    department_lc TEXT NOT NULL,
+    location_lc TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS people_fts USING fts5(name, position, skill, tokenize='trigram');
+CREATE VIRTUAL TABLE IF NOT EXISTS people_fts_vocab USING fts5vocab(people_fts, 'col');
+"""
+
+# Indexy se zakládají až po hromadném nahrání (rychlejší než údržba při každém INSERT)
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS people_department_lc ON people(department_lc);
+CREATE INDEX IF NOT EXISTS people_location_lc ON people(location_lc);
+CREATE INDEX IF NOT EXISTS people_active ON people(active);
+"""
+
+_INSERT_PERSON = f"INSERT INTO people VALUES ({', '.join('?' * (len(_COLUMNS) + 2))})"
+_INSERT_FTS = "INSERT INTO people_fts(rowid, name, position, skill) VALUES (?, ?, ?, ?)"
+_SELECT_PERSON = f"SELECT {', '.join(_COLUMNS)} FROM people WHERE id = ?"
+_SELECT_PAGE = f"SELECT {', '.join(_COLUMNS)} FROM people ORDER BY id LIMIT ? OFFSET ?"
+_DELETE_PERSON = "DELETE FROM people WHERE id = ?"
+_DELETE_FTS = "DELETE FROM people_fts WHERE rowid = ?"
+
+# Podmínky filtrů - podřetězec (smart search) a přesná shoda (filter_by_department/location)
+_FTS_CONTAINS = "id IN (SELECT rowid FROM people_fts WHERE people_fts MATCH ?)"
+_FTS_LIKE = "id IN (SELECT rowid FROM people_fts WHERE {field} LIKE ? ESCAPE '\\')"
+
+
+def _person_rows(person: Dict) -> tuple:
+    """Řádky pro tabulku people a FTS tabulku"""
+    person_row = (
+        person["id"], person["first_name"], person["last_name"], person["full_name"],
+        person.get("email"), person.get("phone"), person["position"], person["department"],
+        person["location"], person.get("salary"), person.get("hire_date"), person.get("age"),
+        json.dumps(person["skills"], ensure_ascii=False), int(bool(person["active"])),
+        person["department"].lower(), person["location"].lower()
+    )
+    # Lowercase texty - LIKE v SQLite porovnává bez ohledu na velikost jen ASCII
+    fts_row = (
+        person["id"],
+        "\n".join((person["first_name"], person["last_name"], person["full_name"])).lower(),
+        person["position"].lower(),
+        "\n".join(person["skills"]).lower()
+    )
+    return person_row, fts_row
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join("?" * count)
+
+
+def _like_pattern(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SQLitePeopleView(Sequence):
+    """Výsledek dotazu - ID osob, řádky se načtou až při indexaci nebo slicingu"""
+
+    def __init__(self, database: "SQLitePeopleDatabase", ids: List[int]):
+        self._database = database
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self._database._fetch(self._ids[item])
+        return self._database.get_person_by_id(self._ids[item])
+
+
+class SQLiteTableView(Sequence):
+    """Celá tabulka jako líná sekvence - stránky přes LIMIT/OFFSET, bez načtení všech ID"""
+
+    def __init__(self, database: "SQLitePeopleDatabase"):
+        self._database = database
+        self._total = len(database)
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self._total)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._database._fetch_range(start, max(0, stop - start))
+        if item < 0:
+            item += self._total
+        if not 0 <= item < self._total:
+            raise IndexError(item)
+        return self._database._fetch_range(item, 1)[0]
+
+
+class SQLitePeopleDatabase:
+    """
+    Databáze osob v SQLite souboru - data přetrvávají mezi běhy a session.
+
+    Rozhraní odpovídá PeopleDatabase (včetně plan/execute pro smart search),
+    výsledky seznamů jsou líné sekvence SQLitePeopleView.
+    """
+
+    SEARCH_FIELDS = PeopleDatabase.SEARCH_FIELDS
+    FTS_FIELDS = ("name", "position", "skill")
+
+    def __init__(self, path: str, generate_if_empty: int = 0):
+        """
+        Args:
+            path: cesta k SQLite souboru (":memory:" pro dočasnou databázi)
+            generate_if_empty: počet osob vygenerovaných do prázdné databáze
+        """
+        self.path = path
+        # Jedno spojení sdílené vlákny (Streamlit, Flask) - přístup serializuje zámek
+        # (reentrantní - změny čtou původní osobu pod stejným zámkem)
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.executescript(_INDEXES)
+
+        # Počty řádků podle hodnoty oddělení a lokace (lowercase) - pro odhady a rozvinutí podřetězce
+        self._key_counts: Optional[Dict[str, Dict[str, int]]] = None
+        # Sloupce pro analytiku s verzí statistik, ze které vznikly
+        self._columns: Optional[PeopleColumns] = None
+        self._columns_version: Optional[int] = None
+        self.refresh_statistics()
+
+        if generate_if_empty and not len(self):
+            self.bulk_load(generate_people(generate_if_empty))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM people").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    # ---------- Hromadné nahrání ----------
+
+    def bulk_load(self, people: Iterable[Dict], batch_size: int = BULK_BATCH_SIZE) -> int:
+        """
+        Nahraje osoby po dávkách (executemany, jedna transakce na dávku).
+
+        Indexy se během nahrávání neudržují a založí se znovu na konci.
+        Vrací počet nahraných osob.
+        """
+        loaded = 0
+        with self._lock:
+            conn = self._conn
+            conn.execute("PRAGMA synchronous=OFF")
+            for name in ("people_department_lc", "people_location_lc", "people_active"):
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            try:
+                batch = []
+                for person in people:
+                    batch.append(_person_rows(person))
+                    self.statistics.add(person)
+                    if len(batch) >= batch_size:
+                        loaded += self._insert_batch(batch)
+                        batch = []
+                if batch:
+                    loaded += self._insert_batch(batch)
+            except BaseException:
+                # Statistiky mohou obsahovat osoby z nenahrané dávky
+                self.refresh_statistics()
+                raise
+            finally:
+                self._key_counts = None
+                conn.executescript(_INDEXES)
+                conn.execute("ANALYZE")
+                conn.execute("PRAGMA synchronous=NORMAL")
+        return loaded
+
+    def _insert_batch(self, batch: List[tuple]) -> int:
+        with self._conn:
+            self._conn.executemany(_INSERT_PERSON, [person_row for person_row, _ in batch])
+            self._conn.executemany(_INSERT_FTS, [fts_row for _, fts_row in batch])
+        return len(batch)
+
+    def import_json(self, path: str, batch_size: int = BULK_BATCH_SIZE) -> int:
+        """Import z JSON pole (export_to_json) nebo JSON lines (osoba na řádek)"""
+        def read() -> Iterator[Dict]:
+            with open(path, encoding="utf-8") as f:
+                first = f.read(1)
+                while first and first.isspace():
+                    first = f.read(1)
+                f.seek(0)
+                if first == "[":
+                    yield from json.load(f)
+                else:
+                    yield from (json.loads(line) for line in f if line.strip())
+
+        return self.bulk_load(read(), batch_size)
+
+    # ---------- Změny ----------
+
+    def add_person(self, person: Dict) -> Dict:
+        """Vloží osobu (bez "id" dostane další volné ID), vrací vloženou osobu"""
+        person = dict(person)
+        with self._lock:
+            if person.get("id") is None:
+                person["id"] = self._conn.execute("SELECT coalesce(max(id), 0) + 1 FROM people").fetchone()[0]
+            person_row, fts_row = _person_rows(person)
+            try:
+                with self._conn:
+                    self._conn.execute(_INSERT_PERSON, person_row)
+                    self._conn.execute(_INSERT_FTS, fts_row)
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Osoba s ID {person['id']} už existuje") from None
+            self._changed(added=person)
+        return person
+
+    def update_person(self, person_id: int, changes: Dict[str, Any]) -> Optional[Dict]:
+        """Změní údaje osoby, vrací novou verzi osoby (None pokud neexistuje)"""
+        with self._lock:
+            old = self.get_person_by_id(person_id)
+            if old is None:
+                return None
+            person = {**old, **changes, "id": person_id}
+            if "full_name" not in changes and ("first_name" in changes or "last_name" in changes):
+                person["full_name"] = f"{person['first_name']} {person['last_name']}"
+            person_row, fts_row = _person_rows(person)
+            with self._conn:
+                self._conn.execute(_DELETE_PERSON, (person_id,))
+                self._conn.execute(_DELETE_FTS, (person_id,))
+                self._conn.execute(_INSERT_PERSON, person_row)
+                self._conn.execute(_INSERT_FTS, fts_row)
+            self._changed(added=person, removed=old)
+        return person
+
+    def delete_person(self, person_id: int) -> bool:
+        """Smaže osobu, vrací zda existovala"""
+        with self._lock:
+            old = self.get_person_by_id(person_id)
+            if old is None:
+                return False
+            with self._conn:
+                self._conn.execute(_DELETE_PERSON, (person_id,))
+                self._conn.execute(_DELETE_FTS, (person_id,))
+            self._changed(removed=old)
+        return True
+
+    def _changed(self, added: Optional[Dict] = None, removed: Optional[Dict] = None):
+        if removed is not None:
+            self.statistics.remove(removed)
+        if added is not None:
+            self.statistics.add(added)
+        self._key_counts = None
+
+    # ---------- Čtení ----------
+
+    @staticmethod
+    def _to_person(row: tuple) -> Dict:
+        person = dict(zip(_COLUMNS, row))
+        person["skills"] = json.loads(person["skills"])
+        person["active"] = bool(person["active"])
+        return person
+
+    def _fetch(self, ids: List[int]) -> List[Dict]:
+        """Osoby podle ID v zadaném pořadí"""
+        if not ids:
+            return []
+        found: Dict[int, Dict] = {}
+        with self._lock:
+            # Po dávkách kvůli limitu počtu parametrů SQLite
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                sql = f"SELECT {', '.join(_COLUMNS)} FROM people WHERE id IN ({_placeholders(len(chunk))})"
+                for row in self._conn.execute(sql, chunk):
+                    found[row[0]] = self._to_person(row)
+        return [found[person_id] for person_id in ids if person_id in found]
+
+    def _fetch_range(self, offset: int, limit: int) -> List[Dict]:
+        """Osoby v pořadí ID od pozice offset"""
+        with self._lock:
+            rows = self._conn.execute(_SELECT_PAGE, (limit, offset)).fetchall()
+        return [self._to_person(row) for row in rows]
+
+    def _ids(self, conditions: List[str], params: List) -> SQLitePeopleView:
+        where = " AND ".join(conditions) or "1"
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(f"SELECT id FROM people WHERE {where} ORDER BY id", params)]
+        return SQLitePeopleView(self, ids)
+
+    def _keys(self, field: str) -> Dict[str, int]:
+        """Lowercase hodnoty oddělení/lokace s počty řádků (z indexu, cache do dalšího nahrání)"""
+        with self._lock:
+            if self._key_counts is None:
+                self._key_counts = {
+                    key_field: dict(self._conn.execute(
+                        f"SELECT {key_field}_lc, count(*) FROM people GROUP BY {key_field}_lc"
+                    ).fetchall())
+                    for key_field in ("department", "location")
+                }
+            return self._key_counts[field]
+
+    def _condition(self, field: str, value: str, exact: bool = False):
+        """
+        SQL podmínka a parametry filtru (podřetězec, u oddělení a lokace volitelně přesná shoda).
+
+        Podřetězec oddělení/lokace se rozvine na seznam odpovídajících hodnot,
+        takže dotaz použije index místo LIKE přes celou tabulku.
+        """
+        value = value.lower()
+        if field in self.FTS_FIELDS:
+            if len(value) >= NGRAM_SIZE:
+                phrase = value.replace('"', '""')
+                return _FTS_CONTAINS, [f'{field} : "{phrase}"']
+            # Kratší dotaz trigram index nepokryje - LIKE nad lowercase textem
+            return _FTS_LIKE.format(field=field), [_like_pattern(value)]
+        keys = [value] if exact else [key for key in self._keys(field) if value in key]
+        return f"{field}_lc IN ({_placeholders(len(keys))})", keys
+
+    def get_all_people(self) -> SQLiteTableView:
+        """Vrátí všechny osoby (líně - řádky až pro čtený rozsah)"""
+        return SQLiteTableView(self)
+
+    def get_person_by_id(self, person_id: int) -> Optional[Dict]:
+        """Najde osobu podle ID"""
+        with self._lock:
+            row = self._conn.execute(_SELECT_PERSON, (person_id,)).fetchone()
+        return self._to_person(row) if row else None
+
+    def _filter(self, field: str, value: str, exact: bool = False) -> SQLitePeopleView:
+        condition, params = self._condition(field, value, exact)
+        return self._ids([condition], params)
+
+    def search_by_name(self, name: str) -> SQLitePeopleView:
+        """Vyhledá osoby podle jména (podřetězec křestního jména, příjmení nebo celého jména)"""
+        return self._filter("name", name)
+
+    def filter_by_department(self, department: str) -> SQLitePeopleView:
+        """Filtruje osoby podle oddělení"""
+        return self._filter("department", department, exact=True)
+
+    def filter_by_position(self, position: str) -> SQLitePeopleView:
+        """Filtruje osoby podle pozice"""
+        return self._filter("position", position)
+
+    def filter_by_location(self, location: str) -> SQLitePeopleView:
+        """Filtruje osoby podle lokace"""
+        return self._filter("location", location, exact=True)
+
+    def filter_by_skill(self, skill: str) -> SQLitePeopleView:
+        """Najde osoby se specifickou skillou"""
+        return self._filter("skill", skill)
+
+    def get_active_employees(self) -> SQLitePeopleView:
+        """Vrátí pouze aktivní zaměstnance"""
+        return self._ids(["active = 1"], [])
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        department: Optional[str] = None,
+        location: Optional[str] = None,
+        position: Optional[str] = None,
+        skill: Optional[str] = None,
+        active: Optional[bool] = None
+    ) -> SQLitePeopleView:
+        """Kombinace filtrů (AND) - oddělení a lokace přesně, ostatní jako podřetězec"""
+        conditions, params = [], []
+        for field, value, exact in (("name", name, False), ("department", department, True),
+                                    ("location", location, True), ("position", position, False),
+                                    ("skill", skill, False)):
+            if value:
+                condition, values = self._condition(field, value, exact)
+                conditions.append(condition)
+                params.extend(values)
+        if active is not None:
+            conditions.append("active = ?")
+            params.append(int(active))
+        return self._ids(conditions, params)
+
+    # ---------- Smart search ----------
+
+    def estimate(self, field: str, value: str) -> int:
+        """Odhad počtu řádků filtru z fts5vocab (nejméně častý trigram) nebo počtů hodnot"""
+        value = value.lower()
+        if field not in self.FTS_FIELDS:
+            return sum(count for key, count in self._keys(field).items() if value in key)
+        grams = {value[i:i + NGRAM_SIZE] for i in range(len(value) - NGRAM_SIZE + 1)}
+        if not grams:
+            return len(self)
+        with self._lock:
+            counts = dict(self._conn.execute(
+                f"SELECT term, doc FROM people_fts_vocab WHERE col = ? AND term IN ({_placeholders(len(grams))})",
+                [field, *grams]
+            ).fetchall())
+        return min(counts.get(gram, 0) for gram in grams)
+
+    def plan(self, filters: Dict[str, str]) -> List[Predicate]:
+        """Filtry seřazené od nejselektivnějšího (odhady viz estimate)"""
+        predicates = [
+            Predicate(field, value, self.estimate(field, value))
+            for field, value in filters.items() if field in self.SEARCH_FIELDS
+        ]
+        return sorted(predicates, key=lambda predicate: predicate.estimate)
+
+    def execute(self, plan: List[Predicate]) -> SQLitePeopleView:
+        """
+        Vyhodnotí plán jedním dotazem (podmínky v pořadí plánu).
+
+        Filtr s nulovým odhadem nic nenajde - dotaz se vůbec neprovede.
+        """
+        if any(predicate.estimate == 0 for predicate in plan):
+            return SQLitePeopleView(self, [])
+        conditions, params = [], []
+        for predicate in plan:
+            condition, values = self._condition(predicate.field, predicate.value)
+            conditions.append(condition)
+            params.extend(values)
+        return self._ids(conditions, params)
+
+    def search(self, filters: Dict[str, str]) -> SQLitePeopleView:
+        """Kombinace filtrů (AND, podřetězce) - naplánuje a vyhodnotí"""
+        return self.execute(self.plan(filters))
+
+    # ---------- Statistiky ----------
+
+    def refresh_statistics(self):
+        """
+        Načte statistiky jedním seskupeným průchodem tabulkou.
+
+        Dál se udržují inkrementálně při změnách přes toto spojení; po změně
+        souboru jiným procesem je potřeba zavolat znovu.
+        """
+        statistics = PeopleStatistics(getattr(self, "statistics", None))
+        with self._lock:
+            groups = self._conn.execute(
+                "SELECT department, position, location, active, count(*), sum(salary), sum(age) "
+                "FROM people GROUP BY department, position, location, active ORDER BY min(id)"
+            ).fetchall()
+        for department, position, location, active, count, salary, age in groups:
+            statistics.apply({"department": department, "position": position, "location": location},
+                             bool(active), salary or 0, age or 0, count)
+        self.statistics = statistics
+        self._columns = None
+
+    @property
+    def statistics_version(self) -> int:
+        return self.statistics.version
+
+    def get_statistics(self) -> Dict:
+        """Vrátí statistiky o databázi (udržované inkrementálně, O(1))"""
+        return self.statistics.get()
+
+    def analytics(self, filters: Optional[Dict[str, str]] = None) -> PeopleColumns:
+        """
+        Sloupce pro agregace (people_analytics), volitelně jen osob vyhovujících filtrům.
+
+        Načítají se jedním dotazem a drží v paměti do další změny dat.
+        """
+        with self._lock:
+            if self._columns is None or self._columns_version != self.statistics.version:
+                records = self._conn.execute(
+                    "SELECT id, department, position, location, salary, age, hire_date, active FROM people ORDER BY id"
+                ).fetchall()
+                self._columns = PeopleColumns.from_records(records)
+                self._columns_version = self.statistics.version
+            columns = self._columns
+        if not filters:
+            return columns
+        return columns.take_ids(self.search(filters)._ids, filters)
+
+    def export_to_json(self) -> str:
+        """Exportuje databázi do JSON"""
+        return json.dumps(self.get_all_people()[:], ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hromadné nahrání databáze osob do SQLite")
+    parser.add_argument("path", help="SQLite soubor")
+    parser.add_argument("--generate", type=int, default=0, help="vygenerovat N osob")
+    parser.add_argument("--import", dest="import_path", help="importovat JSON pole nebo JSON lines")
+    parser.add_argument("--seed", type=int, help="seed generátoru (reprodukovatelná data)")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    database = SQLitePeopleDatabase(args.path)
+    start = time.perf_counter()
+    if args.import_path:
+        loaded = database.import_json(args.import_path, args.batch_size)
+    elif args.generate:
+        rng = random.Random(args.seed) if args.seed is not None else None
+        loaded = database.bulk_load(generate_people(args.generate, start_id=len(database) + 1, rng=rng),
+                                    args.batch_size)
+    else:
+        parser.error("zadejte --generate nebo --import")
+    elapsed = time.perf_counter() - start
+    print(f"✅ Nahráno {loaded} osob za {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):,.0f} řádků/s), "
+          f"celkem {len(database)}")
+
+
+if __name__ == "__main__":
+    main()
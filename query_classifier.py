@@ -0,0 +1,224 @@
+"""Lokální klasifikátor typu dotazu pro multi-agent routing (bez LLM volání)"""
+import json
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+QUERY_TYPES = ["summary", "analysis", "extraction", "explanation"]
+
+# Výchozí trénovací příklady - klasifikátor funguje i bez zalogovaných rozhodnutí
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    "summary": [
+        "Shrň obsah dokumentu",
+        "Udělej stručné shrnutí zákona",
+        "Jaký je celkový přehled dokumentu?",
+        "O čem je tento zákon?",
+        "Dej mi přehled hlavních bodů",
+        "Stručně shrň tuto část",
+        "Celkový obsah v několika větách",
+    ],
+    "analysis": [
+        "Porovnej tyto dva paragrafy",
+        "Analyzuj dopady tohoto ustanovení",
+        "Vyhodnoť výhody a nevýhody",
+        "Jaký je rozdíl mezi odstavcem 1 a 2?",
+        "Zhodnoť, zda je úprava konzistentní",
+        "Proveď analýzu rizik",
+        "Srovnej povinnosti obou stran",
+    ],
+    "extraction": [
+        "Jaká je lhůta pro podání?",
+        "Vypiš všechny částky a pokuty",
+        "Kolik dní má úřad na rozhodnutí?",
+        "Najdi všechna data a termíny",
+        "Které orgány jsou zmíněny?",
+        "Jaká je výše sankce?",
+        "Uveď všechna jména a instituce",
+    ],
+    "explanation": [
+        "Vysvětli, co znamená tento pojem",
+        "Proč je tato povinnost stanovena?",
+        "Jak funguje odvolání?",
+        "Co se rozumí pojmem veřejná zakázka?",
+        "Vysvětli mi jednoduše tento paragraf",
+        "Jak mám postupovat při podání žádosti?",
+        "Co to znamená v praxi?",
+    ],
+}
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase, bez diakritiky, hrubý stemming na prvních 5 znaků"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    ascii_text = "".join(c for c in normalized if not unicodedata.combining(c))
+    return [word[:5] for word in re.findall(r"\w+", ascii_text) if len(word) > 1]
+
+
+class QueryTypeClassifier:
+    """
+    Lokální klasifikátor typu dotazu (summary/analysis/extraction/explanation).
+
+    - nearest-centroid nad embeddingem dotazu, pokud jsou k dispozici centroidy
+      (z rozhodnutí zalogovaných s embeddingem)
+    - jinak malý Naive Bayes model nad klíčovými slovy (seed příklady + log)
+    - LLM se volá jen jako volitelný fallback při nízké jistotě
+    """
+
+    def __init__(
+        self,
+        llm_fallback: Optional[Callable[[str], str]] = None,
+        confidence_threshold: float = 0.55,
+        log_path: Optional[str] = None,
+        min_centroid_examples: int = 3
+    ):
+        """
+        Args:
+            llm_fallback: funkce question -> label, volá se při nízké jistotě
+            confidence_threshold: pod touto jistotou se použije llm_fallback
+            log_path: JSONL soubor pro logování a načtení routing rozhodnutí
+            min_centroid_examples: minimální počet embeddingů na třídu pro nearest-centroid
+        """
+        self.llm_fallback = llm_fallback
+        self.confidence_threshold = confidence_threshold
+        self.log_path = Path(log_path) if log_path else None
+        self.min_centroid_examples = min_centroid_examples
+
+        self._lock = threading.Lock()
+        self._word_counts: Dict[str, Counter] = {label: Counter() for label in QUERY_TYPES}
+        self._total_words: Dict[str, int] = {label: 0 for label in QUERY_TYPES}
+        self._vocabulary: set = set()
+        self._embedding_sums: Dict[str, np.ndarray] = {}
+        self._embedding_counts: Dict[str, int] = defaultdict(int)
+
+        for label, examples in SEED_EXAMPLES.items():
+            for example in examples:
+                self._learn(example, label)
+
+        if self.log_path and self.log_path.exists():
+            self.load_log(self.log_path)
+
+    # ---------- Trénování ----------
+
+    def _learn(self, question: str, label: str, embedding: Optional[List[float]] = None):
+        if label not in self._word_counts:
+            return
+        with self._lock:
+            tokens = _tokenize(question)
+            self._word_counts[label].update(tokens)
+            self._total_words[label] += len(tokens)
+            self._vocabulary.update(tokens)
+
+            if embedding is not None:
+                vector = self._normalize(np.asarray(embedding, dtype=np.float32))
+                if label in self._embedding_sums:
+                    self._embedding_sums[label] += vector
+                else:
+                    self._embedding_sums[label] = vector.copy()
+                self._embedding_counts[label] += 1
+
+    def record(self, question: str, label: str, embedding: Optional[List[float]] = None):
+        """Zaloguje routing rozhodnutí a doučí z něj model"""
+        label = label.strip().lower()
+        if label not in QUERY_TYPES:
+            return
+        self._learn(question, label, embedding)
+
+        if self.log_path:
+            entry = {"question": question, "label": label}
+            if embedding is not None:
+                entry["embedding"] = [float(x) for x in embedding]
+            with self._lock, self.log_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def load_log(self, path) -> int:
+        """Načte zalogovaná rozhodnutí (JSONL: question, label, volitelně embedding)"""
+        count = 0
+        with Path(path).open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._learn(entry["question"], entry["label"], entry.get("embedding"))
+                count += 1
+        return count
+
+    # ---------- Klasifikace ----------
+
+    def predict(self, question: str, embedding: Optional[List[float]] = None) -> Tuple[str, float, str]:
+        """
+        Lokální predikce bez fallbacku.
+
+        Returns:
+            (label, jistota 0-1, metoda "centroid" | "keywords")
+        """
+        if embedding is not None:
+            centroid_result = self._predict_centroid(embedding)
+            if centroid_result is not None:
+                return centroid_result
+        return self._predict_keywords(question)
+
+    def classify(self, question: str, embedding: Optional[List[float]] = None) -> Tuple[str, float, str]:
+        """
+        Klasifikace s LLM fallbackem při nízké jistotě.
+
+        Výsledek fallbacku se zaloguje, takže se model průběžně doučuje.
+
+        Returns:
+            (label, jistota 0-1, metoda "centroid" | "keywords" | "llm")
+        """
+        label, confidence, method = self.predict(question, embedding)
+
+        if confidence < self.confidence_threshold and self.llm_fallback is not None:
+            llm_label = self.llm_fallback(question).strip().lower()
+            if llm_label in QUERY_TYPES:
+                self.record(question, llm_label, embedding)
+                return llm_label, 1.0, "llm"
+
+        return label, confidence, method
+
+    def _predict_keywords(self, question: str) -> Tuple[str, float, str]:
+        tokens = _tokenize(question)
+        with self._lock:
+            vocabulary_size = len(self._vocabulary) + 1
+            log_probs = {}
+            for label in QUERY_TYPES:
+                counts = self._word_counts[label]
+                denominator = self._total_words[label] + vocabulary_size
+                log_probs[label] = sum(math.log((counts[token] + 1) / denominator) for token in tokens)
+
+        return self._best(log_probs, "keywords")
+
+    def _predict_centroid(self, embedding: List[float]) -> Optional[Tuple[str, float, str]]:
+        with self._lock:
+            centroids = {
+                label: self._normalize(self._embedding_sums[label])
+                for label in QUERY_TYPES
+                if self._embedding_counts[label] >= self.min_centroid_examples
+            }
+        if len(centroids) < 2:
+            return None
+
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+        # Škálování kosinové podobnosti - rozdíly mezi centroidy jsou malé
+        scores = {label: float(np.dot(query, centroid)) * 20.0 for label, centroid in centroids.items()}
+        return self._best(scores, "centroid")
+
+    @staticmethod
+    def _best(scores: Dict[str, float], method: str) -> Tuple[str, float, str]:
+        """Softmax nad skóre, vrací nejlepší třídu a její pravděpodobnost"""
+        max_score = max(scores.values())
+        exp_scores = {label: math.exp(score - max_score) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        label = max(exp_scores, key=exp_scores.get)
+        return label, exp_scores[label] / total, method
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
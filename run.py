@@ -47,12 +47,38 @@ class ServerThread(threading.Thread):
         self.server.shutdown()
 
 
+class AsgiServerThread(threading.Thread):
+    """Vlákno pro ASGI server (chatbot_api_async) se stejným rozhraním jako ServerThread"""
+
+    def __init__(self, server):
+        threading.Thread.__init__(self)
+        self.server = server
+        self.daemon = True
+
+    def run(self):
+        """Spustí ASGI server"""
+        print("ASGI API běží na http://localhost:5000")
+        self.server.run()
+
+    def shutdown(self):
+        """Elegantně ukončí ASGI server"""
+        print("Ukončuji ASGI server...")
+        self.server.should_exit = True
+
+
 def start_flask():
-    """Vytvoří a spustí Flask server"""
+    """Vytvoří a spustí API server - Flask, nebo ASGI při CHAT_API_SERVER=asgi"""
     global flask_server, flask_thread
 
-    flask_server = make_server('localhost', 5000, app, threaded=True)
-    flask_thread = ServerThread(flask_server)
+    if os.getenv("CHAT_API_SERVER", "flask").lower() == "asgi":
+        import uvicorn
+        from chatbot_api_async import app as asgi_app
+
+        flask_server = uvicorn.Server(uvicorn.Config(asgi_app, host='localhost', port=5000, backlog=4096))
+        flask_thread = AsgiServerThread(flask_server)
+    else:
+        flask_server = make_server('localhost', 5000, app, threaded=True)
+        flask_thread = ServerThread(flask_server)
     flask_thread.start()
 
 
@@ -1,55 +1,97 @@
 import numpy as np
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional
 import hashlib
+import threading
+
+from metrics_registry import CACHE_LOOKUPS
 
 
 class SemanticCache:
-    """Cache s sémantickým vyhledáváním pro rychlejší odpovědi"""
+    """
+    Cache s sémantickým vyhledáváním pro rychlejší odpovědi.
+
+    - velikost je omezená max_size; při překročení se odstraní nejdéle
+      nepoužitá položka (LRU - zásah i nové vložení ji posouvají na konec)
+    - embeddingy se normalizují při vložení, vyhledávání je jeden maticový
+      součin nad všemi položkami místo smyčky v Pythonu
+    """
 
-    def __init__(self, similarity_threshold: float = 0.95):
-        self.cache: Dict[str, Dict] = {}
+    def __init__(self, similarity_threshold: float = 0.95, max_size: int = 1000):
+        """
+        Args:
+            similarity_threshold: minimální kosinová podobnost pro zásah
+            max_size: maximální počet držených odpovědí
+        """
+        self.cache: "OrderedDict[str, Dict]" = OrderedDict()
         self.threshold = similarity_threshold
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # Matice normalizovaných embeddingů v pořadí klíčů, sestaví se líně po změně
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
 
     def _get_key(self, question: str) -> str:
         """Vytvoří hash klíč pro otázku"""
         return hashlib.md5(question.encode()).hexdigest()
 
+    @staticmethod
+    def _normalize(embedding: list) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
     def add(self, question: str, embedding: list, response: Dict):
-        """Přidá odpověď do cache"""
+        """Přidá odpověď do cache, nejdéle nepoužité položky nad max_size zahodí"""
         key = self._get_key(question)
-        self.cache[key] = {
-            "question": question,
-            "embedding": embedding,
-            "response": response
-        }
+        with self._lock:
+            self.cache[key] = {
+                "question": question,
+                "embedding": self._normalize(embedding),
+                "response": response
+            }
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+            self._matrix = None
 
     def get(self, question: str, embedding: list) -> Optional[Dict]:
-        """Zkusí najít podobnou otázku v cache"""
-        if not self.cache:
-            return None
+        """Zkusí najít nejpodobnější otázku v cache"""
+        with self._lock:
+            if not self.cache:
+                CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
 
-        query_emb = np.array(embedding)
+            if self._matrix is None:
+                self._keys = list(self.cache)
+                self._matrix = np.stack([self.cache[key]["embedding"] for key in self._keys])
 
-        for key, cached in self.cache.items():
-            cached_emb = np.array(cached["embedding"])
+            # Cosine similarity vůči všem položkám najednou
+            similarities = self._matrix @ self._normalize(embedding)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
 
-            # Cosine similarity
-            similarity = np.dot(query_emb, cached_emb) / (
-                np.linalg.norm(query_emb) * np.linalg.norm(cached_emb)
-            )
+            if similarity < self.threshold:
+                CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
 
-            if similarity >= self.threshold:
-                return {
-                    **cached["response"],
-                    "from_cache": True,
-                    "cache_similarity": float(similarity)
-                }
+            key = self._keys[best]
+            cached = self.cache[key]
+            # Posun na konec mění jen pořadí vyřazování, matice (pořadí _keys) zůstává platná
+            self.cache.move_to_end(key)
 
-        return None
+        CACHE_LOOKUPS.labels(result="hit").inc()
+        return {
+            **cached["response"],
+            "from_cache": True,
+            "cache_similarity": similarity
+        }
 
     def clear(self):
         """Vymaže cache"""
-        self.cache.clear()
+        with self._lock:
+            self.cache.clear()
+            self._matrix = None
 
     def size(self) -> int:
         """Vrátí počet položek v cache"""
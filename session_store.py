@@ -0,0 +1,98 @@
+"""Omezené úložiště konverzačních session pro API (LRU + TTL)"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Tuple
+
+# Jak klient předává ID session (sdíleno Flask i ASGI API)
+SESSION_HEADER = 'X-Session-ID'
+SESSION_COOKIE = 'chat_session_id'
+
+
+@dataclass
+class Session:
+    """Jedna session návštěvníka - vlastní instance asistenta a zámek"""
+    session_id: str
+    assistant: Any
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # Zámek pro ASGI server - čekání na něj neblokuje event loop
+    async_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_access: float = field(default_factory=time.monotonic)
+
+
+class SessionStore:
+    """
+    Úložiště session s omezenou velikostí.
+
+    - každý návštěvník má vlastní instanci asistenta (vlastní historii)
+    - nejdéle nepoužité session se odstraňují při překročení max_sessions (LRU)
+    - session neaktivní déle než ttl_seconds vyprší
+    - per-session zámek serializuje souběžné požadavky téhož návštěvníka,
+      globální zámek se drží jen po dobu práce se slovníkem
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_sessions: int = 10000,
+        ttl_seconds: float = 1800
+    ):
+        """
+        Args:
+            factory: vytvoří novou instanci asistenta pro novou session
+            max_sessions: maximální počet současně držených session
+            ttl_seconds: doba neaktivity, po které session vyprší
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Tuple[Session, bool]:
+        """
+        Vrátí existující session, nebo vytvoří novou.
+
+        Returns:
+            (session, created) - created je True, pokud session vznikla nově
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_expired(now)
+
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None:
+                session.last_access = now
+                self._sessions.move_to_end(session_id)
+                return session, False
+
+        # Asistent se vytváří mimo globální zámek
+        session = Session(session_id=uuid.uuid4().hex, assistant=self.factory(), last_access=now)
+
+        with self._lock:
+            self._sessions[session.session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+        return session, True
+
+    def delete(self, session_id: str):
+        """Odstraní session"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict_expired(self, now: float):
+        """Odstraní vypršelé session (volat pod zámkem); nejstarší jsou na začátku"""
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_access <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
@@ -0,0 +1,299 @@
+"""
+Lehký tracing fází zpracování dotazu (embedding, vyhledávání, prompt, completion).
+
+Span je časovač ve tvaru context manageru; vnořené spany tvoří strom v rámci
+jednoho trace (jednoho požadavku). Aktuální span se drží v contextvars, takže
+vnoření funguje ve vláknech i v asyncio úlohách (asyncio.to_thread i gather
+kontext přenáší).
+
+    with span("search", k=5) as s:
+        ...
+        s.set("results", len(chunks))
+
+Dokončené spany se drží v omezeném bufferu (TRACE_BUFFER_SIZE) a volitelně
+se připisují jako JSON lines do TRACE_EXPORT_PATH. TRACING=0 vypne jen buffer
+a export - spany se měří dál a posluchači (metrics_registry) je dostávají vždy.
+Agregace po fázích: stage_stats() nebo `python tracing.py traces.jsonl`.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+TRACE_HEADER = "X-Trace-ID"
+
+TRACING_ENABLED: bool = os.getenv("TRACING", "1").lower() not in ("0", "false", "no")
+TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_BUFFER_SIZE: int = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+
+
+@dataclass
+class Span:
+    """Jedna měřená fáze požadavku"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = 0.0                  # wall-clock začátku (epoch)
+    duration: Optional[float] = None    # sekundy, doplní se při ukončení
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default=0.0, repr=False)
+
+    def set(self, key: str, value: Any):
+        """Přidá atribut spanu (např. počet tokenů, počet výsledků)"""
+        self.attributes[key] = value
+
+    def mark(self, key: str):
+        """Uloží čas od začátku spanu (např. mark("ttft") při prvním tokenu)"""
+        self.attributes[key] = time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("_started")
+        return data
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_span_listeners: List[Callable[[Span], None]] = []
+
+
+class SpanCollector:
+    """Omezený buffer dokončených spanů s volitelným exportem do JSON lines"""
+
+    def __init__(self, max_spans: int = TRACE_BUFFER_SIZE, export_path: str = TRACE_EXPORT_PATH):
+        self._spans: deque = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self.export_path = export_path
+
+    def record(self, finished: Span):
+        line = json.dumps(finished.to_dict(), ensure_ascii=False, default=str) if self.export_path else None
+        with self._lock:
+            self._spans.append(finished)
+            if line is not None:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        _notify(finished)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        """Dokončené spany (volitelně jen jednoho trace)"""
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [s for s in spans if s.trace_id == trace_id]
+        return spans
+
+    def export_jsonl(self, path: str) -> int:
+        """Zapíše obsah bufferu do souboru jako JSON lines, vrací počet spanů"""
+        spans = self.spans()
+        with open(path, "w", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n")
+        return len(spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+collector = SpanCollector()
+
+
+def _notify(finished: Span):
+    for listener in _span_listeners:
+        listener(finished)
+
+
+def add_span_listener(listener: Callable[[Span], None]):
+    """Zaregistruje funkci volanou s každým dokončeným spanem (např. metrics_registry)"""
+    if listener not in _span_listeners:
+        _span_listeners.append(listener)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes) -> Iterator[Span]:
+    """
+    Změří blok kódu jako span.
+
+    Uvnitř jiného spanu vznikne potomek ve stejném trace; jinak nový trace
+    (trace_id lze předat, např. z hlavičky X-Trace-ID příchozího požadavku).
+    Výjimka se zaznamená do error a propaguje dál.
+    Při vypnutém tracingu se span neukládá ani neexportuje, posluchači ho dostanou.
+    """
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else (trace_id or new_trace_id()),
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        start=time.time(),
+        attributes=attributes,
+        _started=time.perf_counter()
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.duration = time.perf_counter() - current._started
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Generátor dokončený v jiném kontextu (např. streamovaná odpověď)
+            _current_span.set(parent)
+        if TRACING_ENABLED:
+            collector.record(current)
+        else:
+            _notify(current)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Dekorátor - celé volání funkce (sync i async) jako span"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def isolated_generator(func: Callable) -> Callable:
+    """
+    Dekorátor generátoru se spany (streamované odpovědi) - každý krok běží ve
+    vlastní kopii kontextu z okamžiku volání.
+
+    Aktivní span ani usage_scope generátoru tak mezi yieldy neprosakují ke
+    konzumentovi a span rodiče odpovídá místu volání. Opuštěný generátor se
+    při zavření ukončí ve stejném kontextu, jeho spany se zaznamenají.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        context = contextvars.copy_context()
+        generator = func(*args, **kwargs)
+        try:
+            while True:
+                try:
+                    item = context.run(next, generator)
+                except StopIteration:
+                    return
+                yield item
+        finally:
+            context.run(generator.close)
+    return wrapper
+
+
+def set_usage(target, response):
+    """Zapíše do spanu spotřebu tokenů z odpovědi OpenAI API (pokud ji API vrátilo)"""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        target.set("prompt_tokens", usage.prompt_tokens)
+        target.set("completion_tokens", usage.completion_tokens)
+
+
+# ---------- Agregace ----------
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def stage_stats(spans: Optional[Iterable] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Percentily doby trvání po fázích (jménech spanů).
+
+    Args:
+        spans: Span objekty nebo slovníky z JSON lines (výchozí: buffer collectoru)
+
+    Returns:
+        {jméno: {"count", "errors", "p50", "p90", "p99", "max", "total"}}, doby v sekundách;
+        u spanů s atributem ttft navíc "ttft_p50" a "ttft_p99"
+    """
+    durations: Dict[str, List[float]] = {}
+    ttfts: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+
+    for s in (collector.spans() if spans is None else spans):
+        data = s if isinstance(s, dict) else s.to_dict()
+        if data.get("duration") is None:
+            continue
+        durations.setdefault(data["name"], []).append(data["duration"])
+        if data.get("error"):
+            errors[data["name"]] = errors.get(data["name"], 0) + 1
+        ttft = (data.get("attributes") or {}).get("ttft")
+        if ttft is not None:
+            ttfts.setdefault(data["name"], []).append(ttft)
+
+    stats = {}
+    for name, values in sorted(durations.items()):
+        values.sort()
+        stats[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "p50": _percentile(values, 50),
+            "p90": _percentile(values, 90),
+            "p99": _percentile(values, 99),
+            "max": values[-1],
+            "total": sum(values),
+        }
+        if name in ttfts:
+            ttft_values = sorted(ttfts[name])
+            stats[name]["ttft_p50"] = _percentile(ttft_values, 50)
+            stats[name]["ttft_p99"] = _percentile(ttft_values, 99)
+    return stats
+
+
+def load_jsonl(path: str) -> List[Dict[str, Any]]:
+    """Načte spany exportované do JSON lines"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    # python tracing.py traces.jsonl - tabulka percentilů po fázích
+    if len(sys.argv) != 2:
+        print("Použití: python tracing.py <traces.jsonl>")
+        sys.exit(1)
+
+    print(f"{'fáze':<28}{'počet':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, row in stage_stats(load_jsonl(sys.argv[1])).items():
+        print(f"{stage:<28}{row['count']:>7}{row['p50'] * 1000:>10.1f}{row['p90'] * 1000:>10.1f}"
+              f"{row['p99'] * 1000:>10.1f}{row['max'] * 1000:>10.1f}")
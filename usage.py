@@ -0,0 +1,557 @@
+"""
+Spotřeba tokenů a náklady volání OpenAI API.
+
+Klienti z registru (clients.py) jsou obalení UsageTrackedClient - každé volání
+chat.completions.create a embeddings.create se zapíše do procesního ledgeru
+(response.usage, u streamu závěrečný chunk s usage). Spotřeba se agreguje
+po session, agentovi, fázi (jméno aktuálního spanu z tracing.py) a modelu
+a oceňuje se podle tabulky cen (USAGE_PRICES).
+
+    with usage_scope(session=session_id):
+        assistant.chat(message)
+    ledger.by("agent")          # {"webpage_assistant": UsageTotals(...), ...}
+
+Rozpočty (USAGE_SESSION_BUDGET_USD, USAGE_BUDGET_USD) hlásí alarmy posluchačům
+a agenti podle budget_level() zkracují historii nebo odpovídají nejdřív z cache.
+"""
+import contextvars
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Dict, Iterator, List, Optional
+
+import openai
+
+import tracing
+from metrics_registry import LLM_COST, LLM_TOKENS
+
+# Ceny v USD za 1M tokenů; klíčem je deployment (Azure) nebo prefix jména modelu
+DEFAULT_PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "models-gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "text-embedding-ada-002": {"input": 0.10},
+    "text-embedding-3-small": {"input": 0.02},
+    "text-embedding-3-large": {"input": 0.13},
+    "models-ada-002": {"input": 0.10},
+}
+
+# JSON se stejnou strukturou jako DEFAULT_PRICES - cesta k souboru nebo přímo JSON
+USAGE_PRICES: str = os.getenv("USAGE_PRICES", "")
+USAGE_SESSION_BUDGET_USD: float = float(os.getenv("USAGE_SESSION_BUDGET_USD", "0"))
+USAGE_BUDGET_USD: float = float(os.getenv("USAGE_BUDGET_USD", "0"))
+USAGE_BUDGET_WARNING: float = float(os.getenv("USAGE_BUDGET_WARNING", "0.8"))
+# stream_options.include_usage - starší API verze Azure ho nepodporují (pak se usage odhaduje)
+USAGE_STREAM_OPTIONS: bool = os.getenv("USAGE_STREAM_OPTIONS", "1").lower() not in ("0", "false", "no")
+
+BUDGET_LEVELS = ("ok", "warning", "exceeded")
+
+
+def _load_prices(source: str) -> Dict[str, Dict[str, float]]:
+    prices = {model: dict(price) for model, price in DEFAULT_PRICES.items()}
+    if not source:
+        return prices
+    try:
+        if os.path.isfile(source):
+            with open(source, encoding="utf-8") as f:
+                overrides = json.load(f)
+        else:
+            overrides = json.loads(source)
+        for model, price in overrides.items():
+            prices.setdefault(model, {}).update(price)
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"⚠️ Neplatná tabulka cen USAGE_PRICES ({e}) - používají se výchozí ceny")
+    return prices
+
+
+@dataclass
+class UsageRecord:
+    """Spotřeba jednoho volání API"""
+    kind: str                       # "chat" nebo "embedding"
+    model: str
+    session: str = ""
+    agent: str = ""
+    stage: str = ""
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+    history_tokens: int = 0         # odhad tokenů přehrané historie konverzace v promptu
+    cost_usd: float = 0.0
+    estimated: bool = False         # API usage nevrátilo, tokeny jsou odhad
+
+
+@dataclass
+class UsageTotals:
+    """Součet spotřeby za skupinu volání"""
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+    history_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, record: UsageRecord):
+        self.calls += 1
+        self.prompt_tokens += record.prompt_tokens
+        self.cached_prompt_tokens += record.cached_prompt_tokens
+        self.completion_tokens += record.completion_tokens
+        self.history_tokens += record.history_tokens
+        self.cost_usd += record.cost_usd
+
+    def merge(self, other: "UsageTotals"):
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class BudgetAlarm:
+    """Změna úrovně rozpočtu (scope "session" nebo "global")"""
+    scope: str
+    key: str
+    level: str
+    spent_usd: float
+    limit_usd: float
+
+
+class _SessionUsage:
+    __slots__ = ("totals", "level")
+
+    def __init__(self):
+        self.totals = UsageTotals()
+        self.level = "ok"
+
+
+class UsageLedger:
+    """
+    Thread-safe agregace spotřeby po (agent, fáze, model) a po session.
+
+    Session se drží v LRU omezeném max_sessions, ostatní dimenze mají malou
+    kardinalitu. Při překročení USAGE_BUDGET_WARNING (podíl) nebo celého
+    rozpočtu se zavolají posluchači alarmů - každá úroveň jednou.
+    """
+
+    def __init__(
+        self,
+        prices: Optional[Dict[str, Dict[str, float]]] = None,
+        session_budget_usd: float = USAGE_SESSION_BUDGET_USD,
+        budget_usd: float = USAGE_BUDGET_USD,
+        warning_ratio: float = USAGE_BUDGET_WARNING,
+        max_sessions: int = 10000
+    ):
+        self.prices = prices if prices is not None else _load_prices(USAGE_PRICES)
+        self.session_budget_usd = session_budget_usd
+        self.budget_usd = budget_usd
+        self.warning_ratio = warning_ratio
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._by_key: Dict[tuple, UsageTotals] = {}
+        self._sessions: "OrderedDict[str, _SessionUsage]" = OrderedDict()
+        self._total = UsageTotals()
+        self._level = "ok"
+        self._alarm_listeners: List[Callable[[BudgetAlarm], None]] = []
+        self._unpriced: set = set()
+
+    # ---------- Ceny ----------
+
+    def set_price(self, model: str, input: float, output: float = 0.0, cached_input: Optional[float] = None):
+        """Nastaví cenu modelu v USD za 1M tokenů"""
+        price = {"input": input, "output": output}
+        if cached_input is not None:
+            price["cached_input"] = cached_input
+        self.prices[model] = price
+
+    def _price(self, model: str) -> Optional[Dict[str, float]]:
+        price = self.prices.get(model)
+        if price is None:
+            # Verze modelu z odpovědi (gpt-4o-2024-08-06) - nejdelší shodný prefix
+            matches = [name for name in self.prices if model.startswith(name)]
+            price = self.prices[max(matches, key=len)] if matches else None
+        return price
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int = 0, cached_prompt_tokens: int = 0) -> float:
+        """Cena volání v USD (0 pro model bez ceny)"""
+        price = self._price(model)
+        if price is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                print(f"⚠️ Model {model} nemá cenu v USAGE_PRICES - náklady se nezapočítají")
+            return 0.0
+        cached_price = price.get("cached_input", price.get("input", 0.0))
+        return (
+            (prompt_tokens - cached_prompt_tokens) * price.get("input", 0.0)
+            + cached_prompt_tokens * cached_price
+            + completion_tokens * price.get("output", 0.0)
+        ) / 1_000_000
+
+    # ---------- Záznam ----------
+
+    def record(self, record: UsageRecord):
+        """Započítá volání API (cena se doplní podle tabulky cen)"""
+        record.cost_usd = self.cost(record.model, record.prompt_tokens, record.completion_tokens,
+                                    record.cached_prompt_tokens)
+        alarms = []
+        with self._lock:
+            self._by_key.setdefault((record.agent, record.stage, record.model), UsageTotals()).add(record)
+            self._total.add(record)
+
+            level = self._budget_level(self._total.cost_usd, self.budget_usd)
+            if BUDGET_LEVELS.index(level) > BUDGET_LEVELS.index(self._level):
+                self._level = level
+                alarms.append(BudgetAlarm("global", "", level, self._total.cost_usd, self.budget_usd))
+
+            if record.session:
+                session = self._sessions.get(record.session)
+                if session is None:
+                    session = self._sessions[record.session] = _SessionUsage()
+                    while len(self._sessions) > self.max_sessions:
+                        self._sessions.popitem(last=False)
+                else:
+                    self._sessions.move_to_end(record.session)
+                session.totals.add(record)
+                level = self._budget_level(session.totals.cost_usd, self.session_budget_usd)
+                if BUDGET_LEVELS.index(level) > BUDGET_LEVELS.index(session.level):
+                    session.level = level
+                    alarms.append(BudgetAlarm("session", record.session, level,
+                                              session.totals.cost_usd, self.session_budget_usd))
+
+        if record.kind == "chat":
+            LLM_TOKENS.labels(direction="in").inc(record.prompt_tokens)
+            LLM_TOKENS.labels(direction="out").inc(record.completion_tokens)
+        LLM_COST.labels(agent=record.agent or "other").inc(record.cost_usd)
+
+        for alarm in alarms:
+            for listener in self._alarm_listeners:
+                listener(alarm)
+
+    # ---------- Rozpočty ----------
+
+    def _budget_level(self, spent: float, limit: float) -> str:
+        if limit <= 0:
+            return "ok"
+        if spent >= limit:
+            return "exceeded"
+        if spent >= limit * self.warning_ratio:
+            return "warning"
+        return "ok"
+
+    @property
+    def budgets_enabled(self) -> bool:
+        return self.session_budget_usd > 0 or self.budget_usd > 0
+
+    def budget_level(self, session: Optional[str] = None) -> str:
+        """Horší z úrovní globálního rozpočtu a rozpočtu session ("ok", "warning", "exceeded")"""
+        with self._lock:
+            level = self._level
+            entry = self._sessions.get(session) if session else None
+            if entry is not None and BUDGET_LEVELS.index(entry.level) > BUDGET_LEVELS.index(level):
+                level = entry.level
+        return level
+
+    def add_alarm_listener(self, listener: Callable[[BudgetAlarm], None]):
+        """Zaregistruje funkci volanou při dosažení úrovně "warning" nebo "exceeded" """
+        if listener not in self._alarm_listeners:
+            self._alarm_listeners.append(listener)
+
+    # ---------- Čtení ----------
+
+    def totals(self) -> UsageTotals:
+        with self._lock:
+            total = UsageTotals()
+            total.merge(self._total)
+        return total
+
+    def session_totals(self, session: str) -> UsageTotals:
+        total = UsageTotals()
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry is not None:
+                total.merge(entry.totals)
+        return total
+
+    def by(self, dimension: str) -> Dict[str, UsageTotals]:
+        """Součty po dimenzi "agent", "stage", "model", "agent/stage" nebo "session" """
+        grouped: Dict[str, UsageTotals] = {}
+        with self._lock:
+            if dimension == "session":
+                items = [(key, entry.totals) for key, entry in self._sessions.items()]
+            else:
+                items = []
+                for (agent, stage, model), totals in self._by_key.items():
+                    key = {"agent": agent, "stage": stage, "model": model,
+                           "agent/stage": f"{agent}/{stage}"}[dimension]
+                    items.append((key, totals))
+            for key, totals in items:
+                grouped.setdefault(key, UsageTotals()).merge(totals)
+        return grouped
+
+    def reset(self):
+        with self._lock:
+            self._by_key.clear()
+            self._sessions.clear()
+            self._total = UsageTotals()
+            self._level = "ok"
+
+
+ledger = UsageLedger()
+
+
+def _print_alarm(alarm: BudgetAlarm):
+    target = f"session {alarm.key}" if alarm.scope == "session" else "proces"
+    print(f"⚠️ Rozpočet API ({target}): {alarm.level} - ${alarm.spent_usd:.4f} z ${alarm.limit_usd:.4f}")
+
+
+ledger.add_alarm_listener(_print_alarm)
+
+
+# ---------- Kontext volání ----------
+
+@dataclass(frozen=True)
+class UsageScope:
+    session: str = ""
+    agent: str = ""
+    stage: str = ""
+    history_tokens: int = 0
+
+
+_current_scope: contextvars.ContextVar[UsageScope] = contextvars.ContextVar("usage_scope", default=UsageScope())
+
+
+@contextmanager
+def usage_scope(
+    session: Optional[str] = None,
+    agent: Optional[str] = None,
+    stage: Optional[str] = None,
+    history_tokens: Optional[int] = None
+) -> Iterator[UsageScope]:
+    """
+    Přiřadí volání API v bloku k session/agentovi/fázi.
+
+    Nezadané hodnoty se dědí z vnějšího bloku; history_tokens platí jen pro blok.
+    """
+    outer = _current_scope.get()
+    scope = UsageScope(
+        session=outer.session if session is None else session,
+        agent=outer.agent if agent is None else agent,
+        stage=outer.stage if stage is None else stage,
+        history_tokens=history_tokens or 0
+    )
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        try:
+            _current_scope.reset(token)
+        except ValueError:
+            # Generátor dokončený v jiném kontextu (např. streamovaná odpověď)
+            _current_scope.set(outer)
+
+
+def current_usage_scope() -> UsageScope:
+    return _current_scope.get()
+
+
+def current_budget_level() -> str:
+    """Úroveň rozpočtu pro session aktuálního bloku usage_scope"""
+    return ledger.budget_level(_current_scope.get().session)
+
+
+# ---------- Obalení klienta ----------
+
+class _Call:
+    """Kontext jednoho volání zachycený při jeho zahájení (stream se dokončí jinde)"""
+
+    def __init__(self, kind: str, kwargs: Dict, default_agent: str):
+        scope = _current_scope.get()
+        active = tracing.current_span()
+        self.kind = kind
+        self.model = kwargs.get("model", "")
+        self.session = scope.session
+        self.agent = scope.agent or default_agent
+        self.stage = scope.stage or (active.name if active else kind)
+        self.history_tokens = scope.history_tokens
+        self.span = active
+        self.messages = kwargs.get("messages") or []
+
+    def record(self, usage, model: Optional[str] = None, estimated_completion: int = 0):
+        record = UsageRecord(kind=self.kind, model=self.model or model or "", session=self.session,
+                             agent=self.agent, stage=self.stage, history_tokens=self.history_tokens)
+        if usage is not None:
+            record.prompt_tokens = usage.prompt_tokens or 0
+            record.completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            details = getattr(usage, "prompt_tokens_details", None)
+            record.cached_prompt_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        else:
+            from conversation_history import estimate_messages_tokens
+
+            record.prompt_tokens = estimate_messages_tokens(self.messages)
+            record.completion_tokens = estimated_completion
+            record.estimated = True
+        ledger.record(record)
+
+
+def _is_usage_chunk(chunk) -> bool:
+    return not chunk.choices and getattr(chunk, "usage", None) is not None
+
+
+class _TrackedStream:
+    """Obal sync streamu - zapíše usage ze závěrečného chunku a ten chunk nevrací"""
+
+    def __init__(self, stream, call: _Call, hide_usage_chunk: bool):
+        self._stream = stream
+        self._call = call
+        self._hide_usage_chunk = hide_usage_chunk
+        self._recorded = False
+        self._chunks = 0
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def _observe(self, chunk) -> bool:
+        """Zpracuje chunk; vrací False, pokud se nemá předat volajícímu"""
+        if _is_usage_chunk(chunk):
+            self._finish(chunk.usage, chunk.model)
+            return not self._hide_usage_chunk
+        if chunk.choices and chunk.choices[0].delta.content:
+            self._chunks += 1
+        return True
+
+    def _finish(self, usage=None, model: Optional[str] = None):
+        if self._recorded:
+            return
+        self._recorded = True
+        self._call.record(usage, model, estimated_completion=self._chunks)
+        if usage is not None and self._call.span is not None:
+            # Skutečné hodnoty místo odhadu, který span nastavil během streamu
+            self._call.span.set("prompt_tokens", usage.prompt_tokens)
+            self._call.span.set("completion_tokens", usage.completion_tokens)
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                if self._observe(chunk):
+                    yield chunk
+        finally:
+            self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._finish()
+        self._stream.close()
+
+
+class _AsyncTrackedStream(_TrackedStream):
+    """Obal async streamu"""
+
+    def __iter__(self):
+        raise TypeError("Async stream - použijte async for")
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                if self._observe(chunk):
+                    yield chunk
+        finally:
+            self._finish()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        self._finish()
+        await self._stream.close()
+
+
+class _Resource:
+    """Společný základ obalů chat.completions a embeddings"""
+    kind = ""
+
+    def __init__(self, resource, tracked: "UsageTrackedClient"):
+        self._resource = resource
+        self._tracked = tracked
+
+    def __getattr__(self, name):
+        return getattr(self._resource, name)
+
+    def _prepare(self, kwargs: Dict) -> bool:
+        """Doplní stream_options; vrací True, pokud chunk s usage přidal obal (a má ho skrýt)"""
+        if self.kind != "chat" or not kwargs.get("stream") or not USAGE_STREAM_OPTIONS:
+            return False
+        if "stream_options" in kwargs:
+            return False
+        kwargs["stream_options"] = {"include_usage": True}
+        return True
+
+    def _wrap(self, response, call: _Call, hide_usage_chunk: bool):
+        if isinstance(response, (openai.Stream, openai.AsyncStream)):
+            stream_class = _AsyncTrackedStream if self._tracked.is_async else _TrackedStream
+            return stream_class(response, call, hide_usage_chunk)
+        call.record(getattr(response, "usage", None), getattr(response, "model", None))
+        return response
+
+    def create(self, **kwargs):
+        hide_usage_chunk = self._prepare(kwargs)
+        call = _Call(self.kind, kwargs, self._tracked.agent)
+
+        if self._tracked.is_async:
+            async def run():
+                response = await self._resource.create(**kwargs)
+                return self._wrap(response, call, hide_usage_chunk)
+            return run()
+
+        return self._wrap(self._resource.create(**kwargs), call, hide_usage_chunk)
+
+
+class _ChatCompletions(_Resource):
+    kind = "chat"
+
+
+class _Chat:
+    def __init__(self, chat, tracked: "UsageTrackedClient"):
+        self._chat = chat
+        self.completions = _ChatCompletions(chat.completions, tracked)
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+class _Embeddings(_Resource):
+    kind = "embedding"
+
+
+class UsageTrackedClient:
+    """
+    Obal OpenAI klienta (sync i async), který zapisuje spotřebu do ledgeru.
+
+    Ostatní atributy a metody se předávají původnímu klientovi.
+    """
+
+    def __init__(self, client, agent: str = ""):
+        self._client = client
+        self.agent = agent
+        self.is_async = isinstance(client, openai.AsyncOpenAI)
+        self.chat = _Chat(client.chat, self)
+        self.embeddings = _Embeddings(client.embeddings, self)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def track_usage(client, agent: str = "") -> UsageTrackedClient:
+    """Obalí klienta sledováním spotřeby (už obalený klient se jen přeznačí)"""
+    if isinstance(client, UsageTrackedClient):
+        client = client._client
+    return UsageTrackedClient(client, agent)
@@ -1,48 +1,50 @@
-from typing import Dict, List
-from akkodis_clients import client_gpt_4o
+from typing import AsyncIterator, Dict, List
+from functools import lru_cache
+from akkodis_clients import client_gpt_4o, async_client_gpt_4o
+from conversation_history import estimate_messages_tokens
+from tracing import isolated_generator, set_usage, span
+from usage import current_budget_level, usage_scope
 import json
 
+# Při dosažení rozpočtu API (usage.py) se posílá jen posledních N zpráv historie
+BUDGET_HISTORY_MESSAGES = 3
 
-class WebpageAssistant:
-    """AI asistent pro pomoc s obsahem webové stránky"""
 
-    def __init__(self, page_content: Dict):
-        """
-        Args:
-            page_content: Dictionary s obsahem stránky
-        """
-        self.client, self.deployment = client_gpt_4o()
-        self.page_content = page_content
-        self.conversation_history: List[Dict[str, str]] = []
+@lru_cache(maxsize=32)
+def _build_system_prompt(page_content_json: str) -> str:
+    """
+    Sestaví system prompt pro daný obsah stránky.
 
-    def get_system_prompt(self) -> str:
-        """Vytvoří system prompt s kontextem stránky"""
+    Memoizováno podle obsahu - prompt je pro stejnou stránku byte-identický,
+    takže ho provider může cachovat a nesestavuje se znovu pro každou zprávu.
+    """
+    page_content = json.loads(page_content_json)
 
-        content_summary = f"""INFORMACE O SPOLEČNOSTI:
-Název: {self.page_content.get('company_name', 'N/A')}
-Popis: {self.page_content.get('company_description', 'N/A')}
+    content_summary = f"""INFORMACE O SPOLEČNOSTI:
+Název: {page_content.get('company_name', 'N/A')}
+Popis: {page_content.get('company_description', 'N/A')}
 
 NABÍZENÉ SLUŽBY:
 """
-        for service in self.page_content.get('services', []):
-            content_summary += f"- {service['name']}: {service['description']}\n"
+    for service in page_content.get('services', []):
+        content_summary += f"- {service['name']}: {service['description']}\n"
 
-        content_summary += f"""\nKONTAKTNÍ INFORMACE:
-Email: {self.page_content.get('contact', {}).get('email', 'N/A')}
-Telefon: {self.page_content.get('contact', {}).get('phone', 'N/A')}
-Adresa: {self.page_content.get('contact', {}).get('address', 'N/A')}
+    content_summary += f"""\nKONTAKTNÍ INFORMACE:
+Email: {page_content.get('contact', {}).get('email', 'N/A')}
+Telefon: {page_content.get('contact', {}).get('phone', 'N/A')}
+Adresa: {page_content.get('contact', {}).get('address', 'N/A')}
 
 PRODUKTY:
 """
-        for product in self.page_content.get('products', []):
-            content_summary += f"- {product['name']}: {product['price']} - {product['description']}\n"
+    for product in page_content.get('products', []):
+        content_summary += f"- {product['name']}: {product['price']} - {product['description']}\n"
 
-        content_summary += f"""\nČASTO KLADENÉ OTÁZKY (FAQ):
+    content_summary += f"""\nČASTO KLADENÉ OTÁZKY (FAQ):
 """
-        for faq in self.page_content.get('faq', []):
-            content_summary += f"Q: {faq['question']}\nA: {faq['answer']}\n\n"
+    for faq in page_content.get('faq', []):
+        content_summary += f"Q: {faq['question']}\nA: {faq['answer']}\n\n"
 
-        prompt = f"""Jsi přátelský AI asistent na webové stránce. Pomáháš návštěvníkům najít informace a odpovídáš na jejich otázky.
+    prompt = f"""Jsi přátelský AI asistent na webové stránce. Pomáháš návštěvníkům najít informace a odpovídáš na jejich otázky.
 
 {content_summary}
 
@@ -62,7 +64,28 @@ PŘÍKLADY DOBRÝCH ODPOVĚDÍ:
 
 Buď proaktivní a nabízej další informace!
 """
-        return prompt
+    return prompt
+
+
+class WebpageAssistant:
+    """AI asistent pro pomoc s obsahem webové stránky"""
+
+    def __init__(self, page_content: Dict, max_history_messages: int = 20):
+        """
+        Args:
+            page_content: Dictionary s obsahem stránky
+            max_history_messages: maximální počet zpráv historie posílaných do API
+        """
+        self.client, self.deployment = client_gpt_4o("webpage_assistant")
+        self.page_content = page_content
+        # Kanonická podoba obsahu - klíč pro memoizaci system promptu
+        self._page_content_key = json.dumps(page_content, ensure_ascii=False, sort_keys=True)
+        self.max_history_messages = max_history_messages
+        self.conversation_history: List[Dict[str, str]] = []
+
+    def get_system_prompt(self) -> str:
+        """Vytvoří system prompt s kontextem stránky"""
+        return _build_system_prompt(self._page_content_key)
 
     def start_conversation(self) -> str:
         """Zahájí konverzaci"""
@@ -84,26 +107,43 @@ Jak vám mohu pomoci?"""
 
         return greeting
 
-    def chat(self, user_message: str) -> str:
-        """Zpracuje zprávu od uživatele"""
-        # Přidání zprávy do historie
+    def _trim_history(self):
+        """Udržuje historii na max_history_messages - velikost promptu je konstantní"""
+        if len(self.conversation_history) > self.max_history_messages:
+            self.conversation_history = self.conversation_history[-self.max_history_messages:]
+
+    def _prepare_messages(self, user_message: str) -> List[Dict[str, str]]:
+        """Přidá zprávu uživatele do historie a sestaví zprávy pro API"""
         self.conversation_history.append({
             "role": "user",
             "content": user_message
         })
+        self._trim_history()
+
+        history = self.conversation_history
+        if current_budget_level() != "ok":
+            # Rozpočet API dochází - do API jde jen konec historie (uložená historie zůstává)
+            history = history[-BUDGET_HISTORY_MESSAGES:]
 
-        # Vytvoření promptu
-        system_prompt = self.get_system_prompt()
+        return [{"role": "system", "content": self.get_system_prompt()}] + history
 
-        # Zavolání API
-        messages = [{"role": "system", "content": system_prompt}] + self.conversation_history
+    @staticmethod
+    def _history_scope(messages: List[Dict[str, str]]):
+        """usage_scope s odhadem tokenů přehrané historie (vše mezi system promptem a novou zprávou)"""
+        return usage_scope(history_tokens=estimate_messages_tokens(messages[1:-1]))
 
-        response = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=400
-        )
+    def chat(self, user_message: str) -> str:
+        """Zpracuje zprávu od uživatele"""
+        messages = self._prepare_messages(user_message)
+
+        with span("llm.completion", model=self.deployment) as completion_span, self._history_scope(messages):
+            response = self.client.chat.completions.create(
+                model=self.deployment,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=400
+            )
+            set_usage(completion_span, response)
 
         assistant_message = response.choices[0].message.content
 
@@ -115,6 +155,119 @@ Jak vám mohu pomoci?"""
 
         return assistant_message
 
+    @isolated_generator
+    def chat_streaming(self, user_message: str):
+        """
+        Streamovaná varianta chat - vrací části odpovědi, jak je model generuje.
+
+        Celá odpověď se na konci uloží do historie (i když klient stream přeruší,
+        uloží se to, co bylo vygenerováno; viz _store_streamed_answer).
+        """
+        messages = self._prepare_messages(user_message)
+
+        with span("llm.completion", model=self.deployment, stream=True) as completion_span, \
+                self._history_scope(messages):
+            streamed_chunks = 0
+            full_message = ""
+            try:
+                stream = self.client.chat.completions.create(
+                    model=self.deployment,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=400,
+                    stream=True
+                )
+
+                # Průběžný odhad (vstup, počet streamovaných částí ~ tokenů); skutečné usage
+                # ze závěrečného chunku streamu doplní obal klienta (usage.py)
+                completion_span.set("prompt_tokens", estimate_messages_tokens(messages))
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        content = chunk.choices[0].delta.content
+                        if not full_message:
+                            completion_span.mark("ttft")
+                        full_message += content
+                        streamed_chunks += 1
+                        completion_span.set("completion_tokens", streamed_chunks)
+                        yield content
+            finally:
+                self._store_streamed_answer(full_message)
+
+    def _store_streamed_answer(self, message: str):
+        """
+        Uloží streamovanou odpověď do historie. Bez jediného tokenu (chyba API,
+        přerušení) se místo prázdné odpovědi odebere nezodpovězená otázka.
+        """
+        if message:
+            self.conversation_history.append({
+                "role": "assistant",
+                "content": message
+            })
+        elif self.conversation_history and self.conversation_history[-1]["role"] == "user":
+            self.conversation_history.pop()
+
+    # ---------- Async varianty (ASGI server, chatbot_api_async.py) ----------
+
+    def _get_async_client(self):
+        # Sdílený klient z registru - vázaný na aktuální event loop
+        client, _ = async_client_gpt_4o("webpage_assistant")
+        return client
+
+    async def chat_async(self, user_message: str) -> str:
+        """Async varianta chat - během čekání na model neblokuje vlákno"""
+        messages = self._prepare_messages(user_message)
+
+        with span("llm.completion", model=self.deployment) as completion_span, self._history_scope(messages):
+            response = await self._get_async_client().chat.completions.create(
+                model=self.deployment,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=400
+            )
+            set_usage(completion_span, response)
+
+        assistant_message = response.choices[0].message.content
+
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": assistant_message
+        })
+
+        return assistant_message
+
+    async def chat_streaming_async(self, user_message: str) -> AsyncIterator[str]:
+        """Async varianta chat_streaming - odpověď se uloží do historie i při přerušení"""
+        messages = self._prepare_messages(user_message)
+
+        with span("llm.completion", model=self.deployment, stream=True) as completion_span, \
+                self._history_scope(messages):
+            stream = None
+            streamed_chunks = 0
+            full_message = ""
+            try:
+                stream = await self._get_async_client().chat.completions.create(
+                    model=self.deployment,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=400,
+                    stream=True
+                )
+
+                completion_span.set("prompt_tokens", estimate_messages_tokens(messages))
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        content = chunk.choices[0].delta.content
+                        if not full_message:
+                            completion_span.mark("ttft")
+                        full_message += content
+                        streamed_chunks += 1
+                        completion_span.set("completion_tokens", streamed_chunks)
+                        yield content
+            finally:
+                if stream is not None:
+                    await stream.close()
+                self._store_streamed_answer(full_message)
+
     def reset(self):
         """Resetuje konverzaci"""
         self.conversation_history = []